@@ -2,19 +2,48 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-from gym_tool_use.trap_tube_env import BaseTrapTubeEnv, TrapTubeConfig, ACTIONS
-from gym_tool_use.transfers import (
-    PerceptualTrapTubeEnv,
-    StructuralTrapTubeEnv,
-    SymbolicTrapTubeEnv,
-    StructuralSymbolicTrapTubeEnv,
-    PerceptualStructuralTrapTubeEnv,
-    PerceptualSymbolicTrapTubeEnv,
-    PerceptualStructuralSymbolicTrapTubeEnv)
+import sys
+import importlib
 
 from gym.envs.registration import register
 
 
+# Public names, imported from their module on first access so that importing
+# the package only registers the environments. pycolab and the environment
+# classes load with the first `gym.make`.
+_LAZY_ATTRIBUTES = {
+    'BaseTrapTubeEnv': 'gym_tool_use.trap_tube_env',
+    'TrapTubeConfig': 'gym_tool_use.trap_tube_env',
+    'ACTIONS': 'gym_tool_use.trap_tube_env',
+    'PerceptualTrapTubeEnv': 'gym_tool_use.transfers',
+    'StructuralTrapTubeEnv': 'gym_tool_use.transfers',
+    'SymbolicTrapTubeEnv': 'gym_tool_use.transfers',
+    'StructuralSymbolicTrapTubeEnv': 'gym_tool_use.transfers',
+    'PerceptualStructuralTrapTubeEnv': 'gym_tool_use.transfers',
+    'PerceptualSymbolicTrapTubeEnv': 'gym_tool_use.transfers',
+    'PerceptualStructuralSymbolicTrapTubeEnv': 'gym_tool_use.transfers',
+}
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        module_name = _LAZY_ATTRIBUTES.get(name)
+        if module_name is None:
+            raise AttributeError(
+                'module {!r} has no attribute {!r}'.format(__name__, name))
+        value = getattr(importlib.import_module(module_name), name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+else:
+    # Module `__getattr__` needs Python 3.7, import everything up front.
+    for _name, _module_name in _LAZY_ATTRIBUTES.items():
+        globals()[_name] = getattr(
+            importlib.import_module(_module_name), _name)
+
+
 register(
     id='TrapTube-v0',
     entry_point='gym_tool_use.transfers:TrapTubeEnv')
@@ -0,0 +1,128 @@
+"""Per-level annotations for normalized scores."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import json
+import collections
+
+import gym
+
+from gym_tool_use import dynamics
+from gym_tool_use import lru
+from gym_tool_use import solver
+from gym_tool_use import trap_tube_env
+
+
+Annotation = collections.namedtuple(
+    'Annotation', ['optimal_length', 'num_reachable_states'])
+
+
+# Stable string key identifying a TrapTubeConfig.
+config_key = trap_tube_env.config_key
+
+
+def annotate(config):
+    """Computes the annotation of a TrapTubeConfig.
+
+    Args:
+        config: TrapTubeConfig.
+
+    Returns:
+        Annotation. `optimal_length` is None if the food cannot be reached.
+    """
+    level, state = dynamics.make_level(config)
+    actions = solver.solve(level, state)
+    return Annotation(
+        optimal_length=None if actions is None else len(actions),
+        num_reachable_states=solver.count_reachable_states(level, state))
+
+
+class AnnotationCache(object):
+    """Annotations computed once per level, with LRU eviction.
+
+    Annotations can be persisted to a JSON file, e.g. next to a level pack,
+    which is loaded when the cache is created and merged into on `save`.
+    """
+
+    def __init__(self, max_size=1024, path=None):
+        """Creates a new AnnotationCache.
+
+        Args:
+            max_size: maximum number of annotations held in memory.
+            path: optional JSON file to load and save annotations.
+        """
+        self.max_size = max_size
+        self.path = path
+        self._annotations = lru.LRUCache(max_size)
+        if path is not None and os.path.exists(path):
+            for key, value in _load(path).items():
+                self._annotations.put(key, value)
+
+    def __len__(self):
+        return len(self._annotations)
+
+    def get(self, config):
+        """Returns the Annotation of a TrapTubeConfig, computing it once."""
+        key = config_key(config)
+        annotation = self._annotations.get(key)
+        if annotation is None:
+            annotation = annotate(config)
+            self._annotations.put(key, annotation)
+        return annotation
+
+    def save(self, path=None):
+        """Merge the cached annotations into a JSON file.
+
+        Args:
+            path: JSON file, defaults to the path the cache was created with.
+        """
+        path = path or self.path
+        assert path is not None, 'no path to save annotations to.'
+        annotations = _load(path) if os.path.exists(path) else {}
+        annotations.update(self._annotations.items())
+        with open(path + '.tmp', 'w') as fp:
+            json.dump(
+                dict((key, list(value))
+                     for key, value in annotations.items()),
+                fp, sort_keys=True)
+        os.rename(path + '.tmp', path)
+
+
+def _load(path):
+    with open(path, 'r') as fp:
+        return dict(
+            (key, Annotation(*value)) for key, value in json.load(fp).items())
+
+
+class AnnotateLevels(gym.Wrapper):
+    """Exposes the annotation of each level after reset.
+
+    The annotation is available as `reset_info` after `reset` and is merged
+    into the `info` of every step.
+    """
+
+    def __init__(self, env, cache=None):
+        """Creates a new AnnotateLevels.
+
+        Args:
+            env: BaseTrapTubeEnv or a wrapper of one.
+            cache: optional AnnotationCache shared between environments.
+        """
+        super(AnnotateLevels, self).__init__(env)
+        self.cache = cache if cache is not None else AnnotationCache()
+        self.reset_info = {}
+
+    def reset(self, **kwargs):
+        state = self.env.reset(**kwargs)
+        annotation = self.cache.get(self.env.unwrapped.config)
+        self.reset_info = dict(annotation._asdict())
+        return state
+
+    def step(self, action):
+        state, reward, done, info = self.env.step(action)
+        info = dict(info)
+        info.update(self.reset_info)
+        return state, reward, done, info
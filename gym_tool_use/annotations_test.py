@@ -0,0 +1,81 @@
+"""Tests for level annotations."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+from absl.testing import absltest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from gym_tool_use import annotations
+from gym_tool_use import trap_tube_env
+from gym_tool_use import transfers
+
+
+class AnnotationsTest(absltest.TestCase):
+
+    def setUp(self):
+        super(AnnotationsTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def testAnnotateBaseLevel(self):
+        annotation = annotations.annotate(trap_tube_env.base_config)
+        self.assertEqual(annotation.optimal_length, 11)
+        self.assertEqual(annotation.num_reachable_states, 1535192)
+
+    def testCacheEvictsAndPersists(self):
+        configs = []
+        env = transfers.PerceptualTrapTubeEnv()
+        for seed in range(3):
+            env.seed(seed)
+            env.reset()
+            configs.append(env.config)
+        fake = annotations.Annotation(optimal_length=1, num_reachable_states=2)
+        path = os.path.join(self.directory, 'annotations.json')
+        with mock.patch.object(
+                annotations, 'annotate', return_value=fake) as annotate:
+            cache = annotations.AnnotationCache(max_size=2, path=path)
+            cache.get(configs[0])
+            cache.get(configs[1])
+            cache.get(configs[0])
+            self.assertEqual(annotate.call_count, 2)
+            # configs[1] is the least recently used.
+            cache.get(configs[2])
+            self.assertLen(cache, 2)
+            cache.save()
+            cache.get(configs[0])
+            self.assertEqual(annotate.call_count, 3)
+            cache.get(configs[1])
+            self.assertEqual(annotate.call_count, 4)
+            # Saving merges into the annotations saved before.
+            cache.save()
+
+            cache = annotations.AnnotationCache(max_size=8, path=path)
+            self.assertLen(cache, 3)
+            for config in configs:
+                self.assertEqual(cache.get(config), fake)
+            self.assertEqual(annotate.call_count, 4)
+
+    def testWrapperResetInfo(self):
+        fake = annotations.Annotation(optimal_length=1, num_reachable_states=2)
+        with mock.patch.object(annotations, 'annotate', return_value=fake):
+            env = annotations.AnnotateLevels(transfers.TrapTubeEnv())
+            env.reset()
+            self.assertEqual(
+                env.reset_info,
+                {'optimal_length': 1, 'num_reachable_states': 2})
+            _, _, _, info = env.step(trap_tube_env.ACTION_LIST[0])
+            self.assertEqual(info['optimal_length'], 1)
+
+
+if __name__ == '__main__':
+    absltest.main()
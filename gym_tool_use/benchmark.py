@@ -0,0 +1,302 @@
+"""Throughput benchmarks of the trap tube environments."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import sys
+import json
+import timeit
+import platform
+import subprocess
+import datetime
+import collections
+import multiprocessing
+
+import numpy as np
+
+import gym
+
+from gym_tool_use import transfers
+from gym_tool_use import trap_tube_env
+
+
+# Ids registered in `gym_tool_use/__init__.py`.
+ENV_IDS = (
+    'TrapTube-v0',
+    'PerceptualTrapTube-v0',
+    'StructuralTrapTube-v0',
+    'SymbolicTrapTube-v0',
+    'PerceptualStructuralTrapTube-v0',
+    'PerceptualSymbolicTrapTube-v0',
+    'PerceptualStructuralSymbolicTrapTube-v0',
+    'StructuralSymbolicTrapTube-v0',
+)
+
+# 'human' needs a display and sleeps for `delay` after every frame.
+RENDER_MODES = ('rgb_array',)
+
+# Level generation functions, applied to the base config or colors.
+CONFIG_TRANSFERS = (
+    transfers.perceptual_config_transfer,
+    transfers.symbolic_config_transfer,
+)
+COLOR_TRANSFERS = (
+    transfers.structural_color_transfer,
+)
+
+# A scenario calls `run()` until its wall-clock budget is spent. `run`
+# returns the seconds to count, so setup such as resets between steps is
+# left out of the measurement.
+Scenario = collections.namedtuple('Scenario', ['name', 'run'])
+
+
+def _random_actions(np_random):
+    while True:
+        yield trap_tube_env.ACTION_LIST[
+            np_random.randint(len(trap_tube_env.ACTION_LIST))]
+
+
+def _timed(fn, *args):
+    start = timeit.default_timer()
+    fn(*args)
+    return timeit.default_timer() - start
+
+
+def _make_env(env_id, seed):
+    env = gym.make(env_id).unwrapped
+    env.seed(seed)
+    env.reset()
+    return env
+
+
+def _step_scenario(env_id, seed):
+    env = _make_env(env_id, seed)
+    actions = _random_actions(np.random.RandomState(seed))
+
+    def run():
+        if env.current_game is None:
+            env.reset()
+        return _timed(env.step, next(actions))
+    return Scenario('{}/step'.format(env_id), run)
+
+
+def _reset_scenario(env_id, seed):
+    env = _make_env(env_id, seed)
+    return Scenario(
+        '{}/reset'.format(env_id), lambda: _timed(env.reset))
+
+
+def _render_scenario(env_id, seed, mode):
+    env = _make_env(env_id, seed)
+    actions = _random_actions(np.random.RandomState(seed))
+
+    def run():
+        if env.current_game is None:
+            env.reset()
+        env.step(next(actions))
+        return _timed(env.render, mode)
+    return Scenario('{}/render_{}'.format(env_id, mode), run)
+
+
+def _episode_scenario(env_id, seed):
+    env = _make_env(env_id, seed)
+    actions = _random_actions(np.random.RandomState(seed))
+
+    def run():
+        start = timeit.default_timer()
+        env.reset()
+        done = False
+        while not done:
+            _, _, done, _ = env.step(next(actions))
+        return timeit.default_timer() - start
+    return Scenario('{}/episode'.format(env_id), run)
+
+
+def _transfer_scenario(transfer, initial, seed):
+    np_random = np.random.RandomState(seed)
+    return Scenario(
+        'transfer/{}'.format(transfer.__name__),
+        lambda: _timed(transfer, initial, np_random))
+
+
+# Code timed in a fresh interpreter by the `import/<name>` scenarios.
+IMPORT_STATEMENTS = collections.OrderedDict([
+    ('gym_tool_use', 'import gym_tool_use'),
+    ('gym_make', 'import gym, gym_tool_use; gym.make("TrapTube-v0")'),
+])
+
+
+def _import_scenario(name, statement):
+    code = (
+        'import timeit; start = timeit.default_timer(); {}; '
+        'print(timeit.default_timer() - start)').format(statement)
+    # Run next to the package, so the timed import is the benchmarked tree.
+    directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def run():
+        with open(os.devnull, 'w') as devnull:
+            output = subprocess.check_output(
+                [sys.executable, '-c', code], cwd=directory, stderr=devnull)
+        return float(output.decode('utf-8').strip().splitlines()[-1])
+    return Scenario('import/{}'.format(name), run)
+
+
+def make_scenarios(env_ids=ENV_IDS, render_modes=RENDER_MODES, seed=0):
+    """Creates the benchmark scenarios.
+
+    Every environment gets `step`, `reset`, `render_<mode>` and `episode`
+    scenarios, followed by one `transfer/<function>` scenario per level
+    generation function and the `import/<name>` scenarios, which time
+    importing the package and making a first environment in a new
+    interpreter.
+
+    Args:
+        env_ids: ids of registered trap tube environments.
+        render_modes: modes passed to `env.render`.
+        seed: seed of the environments and of the random actions.
+
+    Returns:
+        list of Scenario.
+    """
+    scenarios = []
+    for env_id in env_ids:
+        scenarios.append(_step_scenario(env_id, seed))
+        scenarios.append(_reset_scenario(env_id, seed))
+        for mode in render_modes:
+            scenarios.append(_render_scenario(env_id, seed, mode))
+        scenarios.append(_episode_scenario(env_id, seed))
+    for transfer in CONFIG_TRANSFERS:
+        scenarios.append(
+            _transfer_scenario(transfer, trap_tube_env.base_config, seed))
+    for transfer in COLOR_TRANSFERS:
+        scenarios.append(
+            _transfer_scenario(transfer, trap_tube_env.base_colors, seed))
+    for name, statement in IMPORT_STATEMENTS.items():
+        scenarios.append(_import_scenario(name, statement))
+    return scenarios
+
+
+def run_scenario(scenario, duration=1.):
+    """Runs a Scenario for `duration` seconds of wall-clock time.
+
+    Args:
+        scenario: Scenario.
+        duration: wall-clock budget in seconds, always at least one call.
+
+    Returns:
+        dictionary with the number of `calls`, the measured `seconds`, the
+            mean `ms_per_call` and the throughput `per_second`.
+    """
+    calls = 0
+    seconds = 0.
+    start = timeit.default_timer()
+    while calls == 0 or timeit.default_timer() - start < duration:
+        seconds += scenario.run()
+        calls += 1
+    return {
+        'calls': calls,
+        'seconds': seconds,
+        'ms_per_call': 1e3 * seconds / calls,
+        'per_second': calls / seconds if seconds else 0.,
+    }
+
+
+def _version(module_name):
+    try:
+        module = __import__(module_name)
+    except ImportError:
+        return None
+    version = getattr(module, '__version__', None)
+    if version is None:
+        try:
+            import pkg_resources
+            version = pkg_resources.get_distribution(
+                module_name.replace('_', '-')).version
+        except Exception:  # pylint: disable=broad-except
+            pass
+    return version
+
+
+def metadata():
+    """Describes the machine and the package versions of a run."""
+    return {
+        'time': datetime.datetime.utcnow().isoformat() + 'Z',
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': multiprocessing.cpu_count(),
+        'versions': dict(
+            (name, _version(name))
+            for name in ['numpy', 'gym', 'pycolab', 'gym_pycolab',
+                         'gym_tool_use']),
+    }
+
+
+def run(env_ids=ENV_IDS, render_modes=RENDER_MODES, duration=1., seed=0,
+        verbose=False):
+    """Runs every benchmark scenario.
+
+    Args:
+        env_ids: ids of registered trap tube environments.
+        render_modes: modes passed to `env.render`.
+        duration: wall-clock budget in seconds per scenario.
+        seed: seed of the environments and of the random actions.
+        verbose: print each result as it finishes.
+
+    Returns:
+        dictionary with the run `metadata` and the `results` of each
+            scenario by name.
+    """
+    results = collections.OrderedDict()
+    for scenario in make_scenarios(
+            env_ids=env_ids, render_modes=render_modes, seed=seed):
+        results[scenario.name] = run_scenario(scenario, duration=duration)
+        if verbose:
+            print('{:<56} {:>12.1f}/s'.format(
+                scenario.name, results[scenario.name]['per_second']))
+    run_metadata = metadata()
+    run_metadata.update(
+        duration=duration, seed=seed, render_modes=list(render_modes))
+    return {'metadata': run_metadata, 'results': results}
+
+
+def save(path, benchmark):
+    """Writes the output of `run` as JSON."""
+    with open(path + '.tmp', 'w') as fp:
+        json.dump(benchmark, fp, indent=2)
+    os.rename(path + '.tmp', path)
+
+
+def load(path):
+    with open(path, 'r') as fp:
+        return json.load(fp)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', type=str)
+    parser.add_argument(
+        '--env-ids', nargs='+', choices=ENV_IDS, default=list(ENV_IDS))
+    parser.add_argument(
+        '--render-modes', nargs='+', choices=['human', 'rgb_array'],
+        default=list(RENDER_MODES))
+    parser.add_argument('--duration', type=float, default=1.)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    benchmark = run(
+        env_ids=args.env_ids,
+        render_modes=args.render_modes,
+        duration=args.duration,
+        seed=args.seed,
+        verbose=True)
+    if args.output:
+        save(args.output, benchmark)
+    else:
+        print(json.dumps(benchmark, indent=2))
@@ -0,0 +1,60 @@
+"""Tests for environment benchmarks."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+from absl.testing import absltest
+
+from gym_tool_use import benchmark
+from gym_tool_use import trap_tube_env
+
+
+class BenchmarkTest(absltest.TestCase):
+
+    def setUp(self):
+        super(BenchmarkTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def testScenarioNames(self):
+        names = [
+            scenario.name for scenario in benchmark.make_scenarios(
+                env_ids=['TrapTube-v0'])]
+        self.assertEqual(names, [
+            'TrapTube-v0/step',
+            'TrapTube-v0/reset',
+            'TrapTube-v0/render_rgb_array',
+            'TrapTube-v0/episode',
+            'transfer/perceptual_config_transfer',
+            'transfer/symbolic_config_transfer',
+            'transfer/structural_color_transfer',
+            'import/gym_tool_use',
+            'import/gym_make',
+        ])
+
+    def testRunAndSave(self):
+        base_colors = dict(trap_tube_env.base_colors)
+        results = benchmark.run(
+            env_ids=['PerceptualTrapTube-v0'], duration=0.01)
+        # The transfer scenarios must not change the module level colors.
+        self.assertEqual(trap_tube_env.base_colors, base_colors)
+        self.assertEqual(results['metadata']['duration'], 0.01)
+        self.assertIn('numpy', results['metadata']['versions'])
+        for name, result in results['results'].items():
+            self.assertGreaterEqual(result['calls'], 1, name)
+            self.assertGreater(result['per_second'], 0., name)
+
+        path = os.path.join(self.directory, 'benchmark.json')
+        benchmark.save(path, results)
+        loaded = benchmark.load(path)
+        self.assertEqual(
+            list(loaded['results']), list(results['results']))
+
+
+if __name__ == '__main__':
+    absltest.main()
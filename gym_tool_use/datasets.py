@@ -0,0 +1,309 @@
+"""Memory-mapped demonstration datasets."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import json
+
+import numpy as np
+
+from gym_tool_use import trap_tube_env
+from gym_tool_use import trials
+
+
+_METADATA = 'metadata.json'
+_OFFSETS = 'offsets'
+
+
+def _field_path(directory, name, per_episode):
+    prefix = 'episode_' if per_episode else ''
+    return os.path.join(directory, '{}{}.bin'.format(prefix, name))
+
+
+def _memmap(path, dtype, shape):
+    if shape[0] == 0:
+        return np.zeros(shape, dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=shape)
+
+
+class DatasetWriter(object):
+    """Appends episodes to a dataset directory.
+
+    Every field is concatenated across episodes into its own flat binary
+    file, so the dataset can be memory mapped by `Dataset` and grows without
+    holding episodes in memory. The metadata is rewritten after each episode,
+    so a crash only loses the episode being written.
+    """
+
+    def __init__(self, directory):
+        """Creates a new DatasetWriter, appending to an existing dataset.
+
+        Args:
+            directory: dataset directory, created if missing.
+        """
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        path = os.path.join(directory, _METADATA)
+        if os.path.exists(path):
+            with open(path, 'r') as fp:
+                self._metadata = json.load(fp)
+        else:
+            self._metadata = {
+                'num_steps': 0,
+                'num_episodes': 0,
+                'step_fields': {},
+                'episode_fields': {},
+            }
+        self._truncate()
+
+    def _truncate(self):
+        """Drop data past the metadata, left over by an interrupted write.
+
+        Every `.bin` file of the directory is trimmed, and files of fields
+        that are not in the metadata are emptied.
+        """
+        sizes = {_field_path(self.directory, _OFFSETS, True): (
+            self._metadata['num_episodes'] * np.dtype(np.int64).itemsize)}
+        for per_episode, key, count in [
+                (False, 'step_fields', self._metadata['num_steps']),
+                (True, 'episode_fields', self._metadata['num_episodes'])]:
+            for name, spec in self._metadata[key].items():
+                path = _field_path(self.directory, name, per_episode)
+                sizes[path] = count * np.dtype(spec['dtype']).itemsize * int(
+                    np.prod(spec['shape']))
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.bin'):
+                continue
+            path = os.path.join(self.directory, filename)
+            with open(path, 'r+b') as fp:
+                fp.truncate(sizes.get(path, 0))
+
+    def _validate(self, fields, key, num_rows, per_episode):
+        """Checks fields against the dataset without changing anything.
+
+        Returns:
+            list of `(key, name, spec, path, value)` to write.
+        """
+        specs = self._metadata[key]
+        if self._metadata['num_episodes']:
+            assert set(fields) == set(specs), (
+                'fields must match the dataset: {}.'.format(sorted(specs)))
+        writes = []
+        for name, value in fields.items():
+            value = np.asarray(value)
+            if per_episode:
+                value = value[None]
+            assert len(value) == num_rows, (
+                '`{}` must have {} rows.'.format(name, num_rows))
+            spec = {'dtype': value.dtype.str, 'shape': list(value.shape[1:])}
+            assert specs.get(name, spec) == spec, '`{}` must be {}.'.format(
+                name, specs[name])
+            path = _field_path(self.directory, name, per_episode)
+            writes.append((key, name, spec, path, value))
+        return writes
+
+    def add_episode(self, steps, episode=None):
+        """Append an episode.
+
+        Args:
+            steps: dictionary mapping field name to np.array with shape
+                [T, ...], one row per step.
+            episode: optional dictionary mapping field name to np.array
+                holding a single value for the whole episode.
+        """
+        num_steps = len(next(iter(steps.values())))
+        # Every field is checked before any is written, so a bad field
+        # leaves neither bytes nor specs behind.
+        writes = (
+            self._validate(steps, 'step_fields', num_steps, False) +
+            self._validate(episode or {}, 'episode_fields', 1, True))
+        for key, name, spec, path, value in writes:
+            self._metadata[key].setdefault(name, spec)
+            with open(path, 'ab') as fp:
+                fp.write(np.ascontiguousarray(value).tobytes())
+        self._metadata['num_steps'] += num_steps
+        self._metadata['num_episodes'] += 1
+        with open(_field_path(self.directory, _OFFSETS, True), 'ab') as fp:
+            fp.write(np.int64(self._metadata['num_steps']).tobytes())
+
+        path = os.path.join(self.directory, _METADATA)
+        with open(path + '.tmp', 'w') as fp:
+            json.dump(self._metadata, fp, indent=2, sort_keys=True)
+        os.rename(path + '.tmp', path)
+
+
+class Dataset(object):
+    """Random access to a dataset written by `DatasetWriter`.
+
+    Fields are memory mapped, so opening a dataset reads only its metadata
+    and sampling touches only the sampled rows.
+    """
+
+    def __init__(self, directory):
+        """Opens a dataset.
+
+        Args:
+            directory: dataset directory.
+        """
+        self.directory = directory
+        with open(os.path.join(directory, _METADATA), 'r') as fp:
+            metadata = json.load(fp)
+        self.num_steps = metadata['num_steps']
+        self.num_episodes = metadata['num_episodes']
+
+        self.steps = {}
+        for name, spec in metadata['step_fields'].items():
+            self.steps[name] = _memmap(
+                _field_path(directory, name, False), spec['dtype'],
+                tuple([self.num_steps] + spec['shape']))
+        self.episodes = {}
+        for name, spec in metadata['episode_fields'].items():
+            self.episodes[name] = _memmap(
+                _field_path(directory, name, True), spec['dtype'],
+                tuple([self.num_episodes] + spec['shape']))
+
+        # `offsets[i]:offsets[i + 1]` are the steps of episode `i`.
+        ends = _memmap(
+            _field_path(directory, _OFFSETS, True), np.int64,
+            (self.num_episodes,))
+        self.offsets = np.concatenate([[0], ends]).astype(np.int64)
+        self._episode_ids = None
+        self._window_starts = {}
+
+    def episode(self, index):
+        """Returns the steps of an episode as memory mapped views.
+
+        Args:
+            index: episode index.
+
+        Returns:
+            dictionary mapping step field name to np.array with shape
+                [T, ...], plus the episode fields.
+        """
+        start, end = self.offsets[index], self.offsets[index + 1]
+        fields = dict(
+            (name, value[start:end]) for name, value in self.steps.items())
+        for name, value in self.episodes.items():
+            fields[name] = value[index]
+        return fields
+
+    def episode_ids(self):
+        """Returns the episode index of every step."""
+        if self._episode_ids is None:
+            self._episode_ids = np.repeat(
+                np.arange(self.num_episodes, dtype=np.int32),
+                np.diff(self.offsets))
+        return self._episode_ids
+
+    def _gather(self, indices, episode_ids):
+        batch = dict(
+            (name, value[indices]) for name, value in self.steps.items())
+        for name, value in self.episodes.items():
+            batch[name] = value[episode_ids]
+        return batch
+
+    def sample_transitions(self, batch_size, np_random=np.random):
+        """Sample steps uniformly across the dataset.
+
+        Args:
+            batch_size: number of steps.
+            np_random: np random state.
+
+        Returns:
+            dictionary mapping field name to np.array with shape
+                [batch_size, ...].
+        """
+        indices = np_random.randint(self.num_steps, size=batch_size)
+        return self._gather(indices, self.episode_ids()[indices])
+
+    def _valid_window_starts(self, length):
+        """Returns every step index that starts a window inside an episode."""
+        if length not in self._window_starts:
+            lengths = np.diff(self.offsets)
+            steps_in_episode = np.arange(self.num_steps) - np.repeat(
+                self.offsets[:-1], lengths)
+            remaining = np.repeat(lengths, lengths) - steps_in_episode
+            index_dtype = np.int32 if self.num_steps < 2 ** 31 else np.int64
+            self._window_starts[length] = np.flatnonzero(
+                remaining >= length).astype(index_dtype)
+        return self._window_starts[length]
+
+    def sample_sequences(self, batch_size, length, np_random=np.random):
+        """Sample fixed length windows that do not cross episodes.
+
+        The valid window starts are computed once per `length`, after which
+        each sample costs O(1).
+
+        Args:
+            batch_size: number of windows.
+            length: number of steps per window.
+            np_random: np random state.
+
+        Returns:
+            dictionary mapping field name to np.array with shape
+                [batch_size, length, ...] (episode fields are
+                [batch_size, ...]).
+        """
+        starts = self._valid_window_starts(length)
+        assert len(starts), 'no episode has {} steps.'.format(length)
+        starts = starts[np_random.randint(len(starts), size=batch_size)]
+        indices = starts[:, None] + np.arange(length)[None]
+        return self._gather(indices, self.episode_ids()[starts])
+
+
+def import_trial(directory, writer):
+    """Import a trial recorded by `play.py` into a dataset.
+
+    Both the per-episode trial directories written by `trials.TrialWriter`
+    and the legacy single `.npz` files of RGB states are supported.
+
+    Args:
+        directory: trial directory or legacy `.npz` file.
+        writer: DatasetWriter.
+
+    Returns:
+        number of imported episodes.
+    """
+    if os.path.isdir(directory):
+        num_episodes = 0
+        for episode in trials.TrialReader(directory):
+            writer.add_episode(
+                steps={
+                    'boards': episode.boards,
+                    'actions': _action_indices(episode.actions),
+                    'rewards': episode.rewards,
+                    'dones': episode.dones,
+                    'weights': episode.weights,
+                },
+                episode={
+                    'seeds': np.int64(episode.seed),
+                    'palettes': episode.palette,
+                })
+            num_episodes += 1
+        return num_episodes
+
+    with np.load(directory, allow_pickle=True) as data:
+        trial = dict((key, data[key]) for key in data.files)
+    # Legacy weights were computed with `~done` on Python bools, so they are
+    # all -1. They are rebuilt from `dones` as `not done` of the step before.
+    for states, actions, rewards, dones in zip(
+            trial['states'], trial['actions'], trial['rewards'],
+            trial['dones']):
+        dones = np.asarray(dones, np.bool_)
+        weights = np.concatenate([[True], ~dones[:-1]]).astype(np.float32)
+        writer.add_episode(steps={
+            'observations': np.asarray(states).astype(np.uint8),
+            'actions': _action_indices(actions),
+            'rewards': np.asarray(rewards, np.float32),
+            'dones': dones,
+            'weights': weights,
+        })
+    return len(trial['states'])
+
+
+def _action_indices(actions):
+    return np.array(
+        [trap_tube_env.action_index(action) for action in actions], np.uint8)
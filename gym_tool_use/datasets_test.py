@@ -0,0 +1,146 @@
+"""Tests for memory-mapped datasets."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from absl.testing import absltest
+
+from gym_tool_use import datasets
+from gym_tool_use import trap_tube_env
+from gym_tool_use import trials
+
+
+class DatasetsTest(absltest.TestCase):
+
+    def setUp(self):
+        super(DatasetsTest, self).setUp()
+        self._directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._directory)
+
+    def _write(self, directory, lengths, start=0):
+        writer = datasets.DatasetWriter(directory)
+        for episode, length in enumerate(lengths, start):
+            writer.add_episode(
+                steps={
+                    'episodes': np.full([length], episode, np.int32),
+                    'steps': np.arange(length, dtype=np.int32),
+                    'boards': np.zeros([length, 12, 12], np.uint8),
+                },
+                episode={'seeds': np.int64(episode)})
+
+    def testSampleSequencesStayInEpisodes(self):
+        directory = os.path.join(self._directory, 'dataset')
+        self._write(directory, [5, 1, 8])
+        self._write(directory, [3], start=3)
+
+        dataset = datasets.Dataset(directory)
+        self.assertEqual(dataset.num_episodes, 4)
+        self.assertEqual(dataset.num_steps, 17)
+        np.testing.assert_array_equal(dataset.offsets, [0, 5, 6, 14, 17])
+        np.testing.assert_array_equal(
+            dataset.episode(2)['steps'], np.arange(8))
+
+        np_random = np.random.RandomState(0)
+        batch = dataset.sample_sequences(256, 4, np_random=np_random)
+        self.assertEqual(batch['boards'].shape, (256, 4, 12, 12))
+        np.testing.assert_array_equal(
+            batch['episodes'], np.repeat(batch['episodes'][:, :1], 4, 1))
+        np.testing.assert_array_equal(
+            np.diff(batch['steps'], axis=1), np.ones([256, 3]))
+        np.testing.assert_array_equal(batch['seeds'], batch['episodes'][:, 0])
+        self.assertEqual(set(batch['episodes'][:, 0]), set([0, 2]))
+
+        batch = dataset.sample_transitions(64, np_random=np_random)
+        np.testing.assert_array_equal(batch['seeds'], batch['episodes'])
+
+    def testFailedWritesLeaveNoData(self):
+        directory = os.path.join(self._directory, 'dataset')
+        writer = datasets.DatasetWriter(directory)
+        with self.assertRaises(AssertionError):
+            writer.add_episode(steps={
+                'actions': np.zeros([3], np.uint8),
+                'rewards': np.zeros([2], np.float32)})
+        self.assertEqual(writer._metadata['step_fields'], {})
+        self.assertFalse(os.listdir(directory))
+        self._write(directory, [4])
+        with self.assertRaises(AssertionError):
+            writer = datasets.DatasetWriter(directory)
+            writer.add_episode(
+                steps={
+                    'episodes': np.zeros([2], np.int32),
+                    'steps': np.zeros([2], np.int32),
+                    'boards': np.zeros([2, 12, 11], np.uint8),
+                },
+                episode={'seeds': np.int64(1)})
+
+        # Bytes of an interrupted write, also of a field that is not in
+        # the metadata yet, are dropped when the dataset is reopened.
+        for name in ['steps', 'extra']:
+            with open(os.path.join(directory, name + '.bin'), 'ab') as fp:
+                fp.write(b'garbage')
+        self._write(directory, [2], start=1)
+        self.assertEqual(
+            os.path.getsize(os.path.join(directory, 'extra.bin')), 0)
+        dataset = datasets.Dataset(directory)
+        np.testing.assert_array_equal(
+            dataset.steps['steps'], [0, 1, 2, 3, 0, 1])
+        np.testing.assert_array_equal(dataset.episodes['seeds'], [0, 1])
+
+    def testImportTrials(self):
+        trial_directory = os.path.join(self._directory, 'trial')
+        writer = trials.TrialWriter(trial_directory)
+        for seed, length in [(3, 4), (4, 2)]:
+            writer.write_episode(trials.Episode(
+                env_id='TrapTube-v0',
+                seed=seed,
+                boards=np.zeros([length, 12, 12], np.uint8),
+                palette=np.zeros([256, 3], np.uint8),
+                actions=np.array([trap_tube_env.ACTIONS.up.left] * length),
+                rewards=np.zeros([length], np.float32),
+                dones=np.arange(length) == (length - 1),
+                weights=np.ones([length], np.float32)))
+
+        legacy_path = os.path.join(self._directory, 'legacy.npz')
+        legacy = dict(
+            states=np.empty([2], object),
+            actions=np.empty([2], object),
+            rewards=np.empty([2], object),
+            dones=np.empty([2], object),
+            weights=np.empty([2], object))
+        for index, length in enumerate([3, 6]):
+            legacy['states'][index] = np.full(
+                [length, 12, 12, 3], 208., np.float32)
+            legacy['actions'][index] = np.array(
+                [trap_tube_env.ACTIONS.right.down] * length)
+            legacy['rewards'][index] = np.zeros([length], np.float32)
+            legacy['dones'][index] = np.arange(length) == (length - 1)
+            # The old `play.py` wrote `~done` of Python bools.
+            legacy['weights'][index] = np.full([length], -1., np.float32)
+        np.savez(legacy_path, **legacy)
+
+        dataset_directory = os.path.join(self._directory, 'dataset')
+        self.assertEqual(datasets.import_trial(
+            trial_directory, datasets.DatasetWriter(dataset_directory)), 2)
+        dataset = datasets.Dataset(dataset_directory)
+        np.testing.assert_array_equal(dataset.episodes['seeds'], [3, 4])
+        np.testing.assert_array_equal(dataset.steps['actions'], [2] * 6)
+
+        legacy_directory = os.path.join(self._directory, 'legacy')
+        self.assertEqual(datasets.import_trial(
+            legacy_path, datasets.DatasetWriter(legacy_directory)), 2)
+        dataset = datasets.Dataset(legacy_directory)
+        self.assertEqual(dataset.steps['observations'].shape, (9, 12, 12, 3))
+        self.assertEqual(dataset.steps['observations'].dtype, np.uint8)
+        np.testing.assert_array_equal(dataset.steps['actions'], [13] * 9)
+        np.testing.assert_array_equal(dataset.steps['weights'], [1.] * 9)
+
+
+if __name__ == '__main__':
+    absltest.main()
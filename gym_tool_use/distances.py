@@ -0,0 +1,192 @@
+"""Static distance fields of trap tube levels for reward shaping."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+import numpy as np
+
+import gym
+
+from gym_tool_use import dynamics
+from gym_tool_use import lru
+from gym_tool_use import trap_tube_env
+
+
+# Distance fields of a level, -1 where unreachable:
+#   pairs: [H * W, H, W], the number of agent steps from each cell to every
+#       cell, walking around the tubes, traps and exits (which count as
+#       reached, but are never crossed).
+#   food_to_exit: [H, W], the number of pushes from each cell to an exit for
+#       food that only the tubes and traps block.
+LevelDistances = collections.namedtuple(
+    'LevelDistances', ['pairs', 'food_to_exit'])
+
+
+def _shift(mask, delta_row, delta_col):
+    shifted = np.zeros_like(mask)
+    height, width = mask.shape[-2:]
+    shifted[...,
+            max(delta_row, 0):height + min(delta_row, 0),
+            max(delta_col, 0):width + min(delta_col, 0)] = mask[
+                ...,
+                max(-delta_row, 0):height + min(-delta_row, 0),
+                max(-delta_col, 0):width + min(-delta_col, 0)]
+    return shifted
+
+
+def distance_field(passable, sources):
+    """Multi-source breadth first search over a grid.
+
+    Every source expands at once with array shifts, so the cost is one
+    array operation per distance instead of one per cell. Impassable cells
+    are given a distance when they are reached, but are not expanded.
+
+    Args:
+        passable: np.array of bools with shape [..., H, W].
+        sources: np.array of bools with shape [..., H, W], broadcastable to
+            `passable`.
+
+    Returns:
+        np.array of int32 with shape [..., H, W], -1 where unreachable.
+    """
+    sources, passable = np.broadcast_arrays(sources, passable)
+    distances = np.where(sources, 0, -1).astype(np.int32)
+    frontier = sources & passable
+    distance = 0
+    while frontier.any():
+        distance += 1
+        reached = np.zeros_like(frontier)
+        for delta_row, delta_col in dynamics.DELTAS:
+            reached |= _shift(frontier, delta_row, delta_col)
+        reached &= distances < 0
+        distances[reached] = distance
+        frontier = reached & passable
+    return distances
+
+
+def compute_distances(config):
+    """Computes the LevelDistances of a TrapTubeConfig."""
+    level, _ = dynamics.make_level(config)
+    shape = [level.height, level.width]
+    num_cells = level.height * level.width
+    agent_passable = ~np.reshape(level.agent_blocked, shape)
+    food_passable = ~np.reshape(level.food_blocked, shape)
+    exits = np.array([list(row) for row in config.art]) == trap_tube_env.EXIT
+    return LevelDistances(
+        pairs=distance_field(
+            agent_passable, np.eye(num_cells, dtype=np.bool_).reshape(
+                [num_cells] + shape)),
+        food_to_exit=distance_field(food_passable, exits))
+
+
+class DistanceCache(object):
+    """LevelDistances computed once per level, with LRU eviction."""
+
+    def __init__(self, max_size=128):
+        """Creates a new DistanceCache.
+
+        Args:
+            max_size: maximum number of levels held in memory.
+        """
+        self.max_size = max_size
+        self._distances = lru.LRUCache(max_size)
+
+    def __len__(self):
+        return len(self._distances)
+
+    def get(self, config):
+        """Returns the LevelDistances of a TrapTubeConfig."""
+        key = trap_tube_env.config_key(config)
+        distances = self._distances.get(key)
+        if distances is None:
+            distances = compute_distances(config)
+            self._distances.put(key, distances)
+        return distances
+
+
+def _min_distance(field, positions):
+    """Minimum reachable distance of `field` over `positions`, or None."""
+    values = [field[position] for position in positions]
+    values = [value for value in values if value >= 0]
+    return min(values) if values else None
+
+
+class DistanceShaping(gym.Wrapper):
+    """Potential-based reward shaping from static distance fields.
+
+    The potential is minus the agent-to-tool distance plus the food-to-exit
+    distance, and `discount * potential(s') - potential(s)` is added to the
+    reward, which does not change the optimal policies. Unreachable
+    distances count as the number of cells on the board. The potential of
+    terminal states, where the food was eaten, is zero. Episodes truncated
+    by `max_iterations` keep the potential of their last state.
+    """
+
+    def __init__(self, env, scale=0.01, discount=0.99, cache=None,
+                 shape_rewards=True):
+        """Creates a new DistanceShaping.
+
+        Args:
+            env: BaseTrapTubeEnv or a wrapper of one.
+            scale: scale of the potential.
+            discount: discount factor of the shaping term.
+            cache: optional DistanceCache shared between environments.
+            shape_rewards: add the shaping term to the reward. Otherwise it
+                is only reported in `info['shaping']`.
+        """
+        super(DistanceShaping, self).__init__(env)
+        self.scale = scale
+        self.discount = discount
+        self.cache = cache if cache is not None else DistanceCache()
+        self.shape_rewards = shape_rewards
+        self.distances = None
+        self._potential = 0.
+
+    def agent_to_tool(self, state):
+        """Agent steps to the tool in a TrapTubeState, or None."""
+        config = self.env.unwrapped.config
+        row, col = state.tool_position
+        cells = [
+            ((row + offset, col), (row, col + offset))[config.tool_direction]
+            for offset in range(config.tool_size)]
+        num_cols = self.distances.pairs.shape[-1]
+        agent_cell = state.agent_position[0] * num_cols + (
+            state.agent_position[1])
+        return _min_distance(self.distances.pairs[agent_cell], cells)
+
+    def food_to_exit(self, state):
+        """Pushes from the food in a TrapTubeState to an exit, or None."""
+        return _min_distance(
+            self.distances.food_to_exit, [state.food_position])
+
+    def potential(self, state):
+        if state.food_position is None:
+            return 0.
+        unreachable = self.distances.food_to_exit.size
+        agent_to_tool = self.agent_to_tool(state)
+        food_to_exit = self.food_to_exit(state)
+        return -self.scale * (
+            (unreachable if agent_to_tool is None else agent_to_tool) +
+            (unreachable if food_to_exit is None else food_to_exit))
+
+    def reset(self, **kwargs):
+        observation = self.env.reset(**kwargs)
+        self.distances = self.cache.get(self.env.unwrapped.config)
+        self._potential = self.potential(self.env.unwrapped.get_state())
+        return observation
+
+    def step(self, action):
+        observation, reward, done, info = self.env.step(action)
+        # Eating the food is the only terminal state, and its potential is
+        # zero, so `done` from the time limit leaves the potential as is.
+        potential = self.potential(self.env.unwrapped.get_state())
+        shaping = self.discount * potential - self._potential
+        self._potential = potential
+        info = dict(info)
+        info['shaping'] = shaping
+        if self.shape_rewards:
+            reward += shaping
+        return observation, reward, done, info
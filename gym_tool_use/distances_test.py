@@ -0,0 +1,124 @@
+"""Tests for distance fields and reward shaping."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+import numpy as np
+
+from absl.testing import absltest
+
+from gym_tool_use import distances
+from gym_tool_use import solver
+from gym_tool_use import trap_tube_env
+from gym_tool_use import transfers
+
+
+def _bfs(passable, source):
+    height, width = passable.shape
+    field = np.full([height, width], -1, np.int32)
+    field[source] = 0
+    queue = collections.deque([source])
+    while queue:
+        row, col = queue.popleft()
+        if not passable[row, col]:
+            continue
+        for next_row, next_col in [
+                (row - 1, col), (row + 1, col), (row, col - 1),
+                (row, col + 1)]:
+            if (0 <= next_row < height and 0 <= next_col < width and
+                    field[next_row, next_col] < 0):
+                field[next_row, next_col] = field[row, col] + 1
+                queue.append((next_row, next_col))
+    return field
+
+
+class DistancesTest(absltest.TestCase):
+
+    def testDistanceFieldMatchesBFS(self):
+        np_random = np.random.RandomState(0)
+        passable = np_random.uniform(size=[7, 9]) < 0.7
+        sources = np.zeros_like(passable)
+        sources[2, 3] = True
+        field = distances.distance_field(passable, sources)
+        np.testing.assert_array_equal(field, _bfs(passable, (2, 3)))
+
+    def testLevelDistances(self):
+        level_distances = distances.compute_distances(
+            trap_tube_env.base_config)
+        art = np.array([list(row) for row in trap_tube_env.base_config.art])
+        exits = np.argwhere(art == trap_tube_env.EXIT)
+        for row, col in exits:
+            self.assertEqual(level_distances.food_to_exit[row, col], 0)
+        # The food starts in the middle of the tube, next to the exit side.
+        food_row, food_col = trap_tube_env.base_config.food_position
+        self.assertGreater(level_distances.food_to_exit[food_row, food_col], 0)
+        # Pairwise distances are symmetric between passable cells.
+        pairs = level_distances.pairs.reshape([art.size, art.size])
+        passable = np.flatnonzero(art.ravel() == ' ')
+        np.testing.assert_array_equal(
+            pairs[np.ix_(passable, passable)],
+            pairs[np.ix_(passable, passable)].T)
+
+    def testCacheEvicts(self):
+        cache = distances.DistanceCache(max_size=2)
+        env = transfers.PerceptualTrapTubeEnv()
+        for seed in range(3):
+            env.seed(seed)
+            env.reset()
+            cache.get(env.config)
+        self.assertLen(cache, 2)
+
+    def testShapingIsPotentialBased(self):
+        env = distances.DistanceShaping(
+            transfers.TrapTubeEnv(), discount=1.)
+        env.seed(0)
+        env.reset()
+        initial_potential = env.potential(env.unwrapped.get_state())
+        self.assertLess(initial_potential, 0.)
+        np_random = np.random.RandomState(0)
+        total_shaping = 0.
+        for _ in range(10):
+            action = trap_tube_env.ACTION_LIST[np_random.randint(16)]
+            _, _, done, info = env.step(action)
+            total_shaping += info['shaping']
+            if done:
+                break
+        # With no discount, the shaping terms telescope.
+        self.assertAlmostEqual(
+            total_shaping,
+            env.potential(env.unwrapped.get_state()) - initial_potential)
+
+    def testTruncationKeepsPotential(self):
+        env = distances.DistanceShaping(
+            transfers.TrapTubeEnv(max_iterations=3), discount=1.)
+        env.seed(0)
+        env.reset()
+        initial_potential = env.potential(env.unwrapped.get_state())
+        total_shaping = 0.
+        done = False
+        while not done:
+            _, _, done, info = env.step(trap_tube_env.ACTIONS.up.up)
+            total_shaping += info['shaping']
+        self.assertNotIn('reached_food', info)
+        # The agent moved towards the tool, which truncation must not undo.
+        final_potential = env.potential(env.unwrapped.get_state())
+        self.assertLess(final_potential, 0.)
+        self.assertGreater(total_shaping, 0.)
+        self.assertAlmostEqual(
+            total_shaping, final_potential - initial_potential)
+
+        solution = solver.solve_config(env.unwrapped.config)
+        env = distances.DistanceShaping(transfers.TrapTubeEnv(), discount=1.)
+        env.seed(0)
+        env.reset()
+        for action in solution:
+            _, _, done, info = env.step(action)
+        self.assertTrue(info['reached_food'])
+        self.assertEqual(env.potential(env.unwrapped.get_state()), 0.)
+
+
+if __name__ == '__main__':
+    absltest.main()
@@ -0,0 +1,428 @@
+"""Pure Python trap tube dynamics over compact states.
+
+These functions mirror the update rules of `FoodDrape`, `ToolDrape`,
+`AgentSprite` and `TaskDrape` in the order of the `update_schedule` of
+`BaseTrapTubeEnv.make_game`, without building a pycolab engine. Cells are
+flat indices `row * width + col` and a compact state is the tuple
+`(agent_cell, tool_cell, food_cell)`, where the tool cell is the first cell
+of the tool and the food cell is `NO_FOOD` once the food is eaten.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+import numpy as np
+
+from gym_tool_use import trap_tube_env
+
+
+# The static parts of a level as lookup tables indexed by cell:
+#   agent_blocked, food_blocked: cells the agent (food) can never enter.
+#   neighbors[movement][cell]: the cell one step away, or -1 off the board.
+#   tool_cells[tool_cell]: the cells covered by the tool.
+#   grasp_cells[direction][tool_cell]: the cells touching the tool from the
+#       side opposite to `direction` (`ToolDrape.check_adjacent`).
+#   tool_at_edge[movement][tool_cell]: whether the tool is stopped by the
+#       edge of the board.
+Level = collections.namedtuple(
+    'Level',
+    ['height', 'width', 'tool_size', 'tool_direction', 'agent_blocked',
+     'food_blocked', 'neighbors', 'tool_cells', 'grasp_cells',
+     'tool_at_edge'])
+
+NO_FOOD = -1
+
+DELTAS = (
+    (-1, 0),  # NORTH
+    (1, 0),  # SOUTH
+    (0, -1),  # WEST
+    (0, 1),  # EAST
+)
+
+INVERSE = (
+    trap_tube_env.SOUTH,
+    trap_tube_env.NORTH,
+    trap_tube_env.EAST,
+    trap_tube_env.WEST,
+)
+
+
+# Tables that only depend on the board and tool shape, shared by levels.
+_shape_tables = {}
+
+
+def _make_shape_tables(height, width, tool_size, tool_direction):
+    """Returns `(neighbors, tool_cells, grasp_cells, tool_at_edge)`."""
+    key = (height, width, tool_size, tool_direction)
+    if key in _shape_tables:
+        return _shape_tables[key]
+    positions = [(row, col) for row in range(height) for col in range(width)]
+
+    neighbors = []
+    for delta_row, delta_col in DELTAS:
+        neighbors.append(tuple(
+            (row + delta_row) * width + col + delta_col
+            if (0 <= row + delta_row < height and
+                0 <= col + delta_col < width) else -1
+            for row, col in positions))
+
+    vertical = int(tool_direction == 0)
+    edges = (
+        lambda row, col: row == 0,
+        lambda row, col: row == height - 1 - (tool_size - 1) * vertical,
+        lambda row, col: col == 0,
+        lambda row, col: col == width - 1 - (tool_size - 1) * (1 - vertical),
+    )
+
+    tool_cells = []
+    grasp_cells = [[] for _ in DELTAS]
+    for row, col in positions:
+        cells = _tool_cells(row, col, tool_size, vertical)
+        tool_cells.append(_flatten(cells, height, width))
+        for direction, cells_by_tool in enumerate(grasp_cells):
+            delta_row, delta_col = DELTAS[INVERSE[direction]]
+            cells_by_tool.append(_flatten(
+                [(row + delta_row, col + delta_col)
+                 for row, col in cells
+                 if (row + delta_row, col + delta_col) not in cells],
+                height, width))
+
+    _shape_tables[key] = (
+        tuple(neighbors),
+        tuple(tool_cells),
+        tuple(tuple(cells) for cells in grasp_cells),
+        tuple(
+            tuple(edge(row, col) for row, col in positions)
+            for edge in edges))
+    return _shape_tables[key]
+
+
+def make_level(config):
+    """Extracts the level and the initial state of a config.
+
+    Args:
+        config: TrapTubeConfig.
+
+    Returns:
+        (Level, compact initial state).
+    """
+    height, width = len(config.art), len(config.art[0])
+    tool_size = int(config.tool_size)
+    tool_direction = int(config.tool_direction)
+    agent_impassables = set([
+        trap_tube_env.TUBE1, trap_tube_env.TUBE2, trap_tube_env.TRAP,
+        trap_tube_env.EXIT])
+    food_impassables = set([
+        trap_tube_env.TUBE1, trap_tube_env.TUBE2, trap_tube_env.TRAP])
+    characters = ''.join(config.art)
+    neighbors, tool_cells, grasp_cells, tool_at_edge = _make_shape_tables(
+        height, width, tool_size, tool_direction)
+
+    level = Level(
+        height=height,
+        width=width,
+        tool_size=tool_size,
+        tool_direction=tool_direction,
+        agent_blocked=tuple(
+            character in agent_impassables for character in characters),
+        food_blocked=tuple(
+            character in food_impassables for character in characters),
+        neighbors=neighbors,
+        tool_cells=tool_cells,
+        grasp_cells=grasp_cells,
+        tool_at_edge=tool_at_edge)
+
+    # A symbolic transfer can paint over the agent, and pycolab then places
+    # the agent sprite in the top left corner.
+    agent = max(characters.find(trap_tube_env.AGENT), 0)
+    state = (
+        agent,
+        int(config.tool_position[0]) * width + int(config.tool_position[1]),
+        int(config.food_position[0]) * width + int(config.food_position[1]))
+    return level, state
+
+
+def to_trap_tube_state(level, state):
+    """Converts a compact state tuple to a TrapTubeState."""
+    agent, tool, food = state
+    return trap_tube_env.TrapTubeState(
+        agent_position=divmod(agent, level.width),
+        tool_position=divmod(tool, level.width),
+        food_position=None if food == NO_FOOD else divmod(food, level.width))
+
+
+def from_trap_tube_state(level, state):
+    """Converts a TrapTubeState to a compact state tuple."""
+    food = NO_FOOD
+    if state.food_position is not None:
+        food = state.food_position[0] * level.width + state.food_position[1]
+    return (
+        state.agent_position[0] * level.width + state.agent_position[1],
+        state.tool_position[0] * level.width + state.tool_position[1],
+        food)
+
+
+def _tool_cells(tool_row, tool_col, tool_size, vertical):
+    return [
+        (tool_row + i * vertical, tool_col + i * (1 - vertical))
+        for i in range(tool_size)]
+
+
+def _flatten(cells, height, width):
+    return frozenset(
+        row * width + col for row, col in cells
+        if 0 <= row < height and 0 <= col < width)
+
+
+def step(level, state, action):
+    """Applies an action to a compact state.
+
+    Args:
+        level: Level.
+        state: compact state tuple.
+        action: `ACTIONS` entry, `(grasp, movement)`.
+
+    Returns:
+        (next compact state, reward, done).
+    """
+    agent, tool, food = state
+    grasp, movement = action
+    inverse = INVERSE[movement]
+    next_cells = level.neighbors[movement]
+
+    target = next_cells[agent]
+    agent_can_move = target >= 0 and not level.agent_blocked[target]
+    grasped = agent in level.grasp_cells[grasp][tool]
+
+    # FoodDrape: the food is pushed if it is in front of a moving tool.
+    food_moved = False
+    if (grasped and agent_can_move and food != NO_FOOD and
+            food in level.grasp_cells[inverse][tool]):
+        next_food = next_cells[food]
+        if (next_food >= 0 and not level.food_blocked[next_food] and
+                next_food not in level.tool_cells[tool]):
+            food = next_food
+            food_moved = True
+
+    # ToolDrape: the tool moves with the agent unless something blocks it.
+    dont_move = False
+    if grasped:
+        if not agent_can_move:
+            dont_move = True
+        elif (not food_moved and food != NO_FOOD and
+              food in level.grasp_cells[inverse][tool]):
+            dont_move = True
+        elif level.tool_at_edge[movement][tool]:
+            dont_move = True
+        else:
+            tool = next_cells[tool]
+
+    # AgentSprite: the board shows the tool above the food above the tubes.
+    if not dont_move and target >= 0:
+        if target in level.tool_cells[tool]:
+            blocked = True
+        elif target == food:
+            blocked = False
+        else:
+            blocked = level.agent_blocked[target]
+        if not blocked:
+            agent = target
+
+    # TaskDrape: reaching the food ends the episode.
+    if agent == food:
+        return (agent, tool, NO_FOOD), trap_tube_env.REWARD, True
+    return (agent, tool, food), 0., False
+
+
+def distinct_actions(level, state):
+    """Returns the actions with distinct outcomes in `state`.
+
+    Grasping has no effect unless the agent touches the tool from that side,
+    so all non-grasping actions with the same movement are equivalent.
+
+    Args:
+        level: Level.
+        state: compact state tuple.
+
+    Returns:
+        list of `ACTIONS` entries.
+    """
+    agent, tool, _ = state
+    grasps = []
+    free_grasp = None
+    for grasp in range(len(trap_tube_env.Grasps._fields)):
+        if agent in level.grasp_cells[grasp][tool]:
+            grasps.append(grasp)
+        elif free_grasp is None:
+            free_grasp = grasp
+    if free_grasp is not None:
+        grasps.append(free_grasp)
+    return [
+        trap_tube_env.ACTIONS[grasp][movement]
+        for grasp in grasps
+        for movement in range(len(trap_tube_env.Movements._fields))]
+
+
+# `Level` tables of a batch of levels as arrays for `step_batch`. Cell
+# `num_cells` stands for "off the board" or "no food": it is blocked and
+# never covered or grasped. Levels share the board size, and the tool tables
+# are stored once per distinct tool shape, `tool_shapes[level]`.
+BatchLevel = collections.namedtuple(
+    'BatchLevel',
+    ['num_cells', 'neighbors', 'agent_blocked', 'food_blocked', 'tool_shapes',
+     'tool_cells', 'grasp_cells', 'tool_at_edge'])
+
+# Array versions of `_shape_tables`.
+_batch_shape_tables = {}
+
+
+def _make_batch_shape_tables(height, width, tool_size, tool_direction):
+    """Returns `(tool_cells, grasp_cells, tool_at_edge)` as arrays."""
+    key = (height, width, tool_size, tool_direction)
+    if key in _batch_shape_tables:
+        return _batch_shape_tables[key]
+    _, tool_cells, grasp_cells, tool_at_edge = _make_shape_tables(*key)
+    num_cells = height * width
+    tool_array = np.zeros([num_cells, num_cells + 1], np.bool_)
+    grasp_array = np.zeros(
+        [len(DELTAS), num_cells, num_cells + 1], np.bool_)
+    for tool in range(num_cells):
+        tool_array[tool, list(tool_cells[tool])] = True
+        for direction, cells_by_tool in enumerate(grasp_cells):
+            grasp_array[direction, tool, list(cells_by_tool[tool])] = True
+    _batch_shape_tables[key] = (
+        tool_array, grasp_array, np.array(tool_at_edge, np.bool_))
+    return _batch_shape_tables[key]
+
+
+def make_batch_levels(levels):
+    """Stacks Levels with the same board size into a BatchLevel."""
+    height, width = levels[0].height, levels[0].width
+    num_cells = height * width
+    neighbors = np.full([len(DELTAS), num_cells + 1], num_cells, np.int32)
+    neighbors[:, :num_cells] = levels[0].neighbors
+    neighbors[neighbors < 0] = num_cells
+    agent_blocked = np.ones([len(levels), num_cells + 1], np.bool_)
+    food_blocked = np.ones([len(levels), num_cells + 1], np.bool_)
+    shapes = []
+    tool_shapes = np.zeros([len(levels)], np.int32)
+    for index, level in enumerate(levels):
+        assert (level.height, level.width) == (height, width), (
+            'levels must have the same board size.')
+        agent_blocked[index, :num_cells] = level.agent_blocked
+        food_blocked[index, :num_cells] = level.food_blocked
+        shape = (level.tool_size, level.tool_direction)
+        if shape not in shapes:
+            shapes.append(shape)
+        tool_shapes[index] = shapes.index(shape)
+    tables = [
+        _make_batch_shape_tables(height, width, tool_size, tool_direction)
+        for tool_size, tool_direction in shapes]
+    tool_cells, grasp_cells, tool_at_edge = [
+        np.stack(arrays) for arrays in zip(*tables)]
+    return BatchLevel(
+        num_cells=num_cells,
+        neighbors=neighbors,
+        agent_blocked=agent_blocked,
+        food_blocked=food_blocked,
+        tool_shapes=tool_shapes,
+        tool_cells=tool_cells,
+        grasp_cells=grasp_cells,
+        tool_at_edge=tool_at_edge)
+
+
+def make_batch_level(level):
+    """Converts a single Level to a BatchLevel."""
+    return make_batch_levels([level])
+
+
+def step_batch(level, agents, tools, foods, grasps, movements,
+               level_ids=None):
+    """Applies a batch of actions to a batch of compact states.
+
+    Vectorized `step`: the same rules, applied with array gathers.
+
+    Args:
+        level: BatchLevel.
+        agents, tools, foods: np.array with shape [B] of state cells,
+            `foods` is `NO_FOOD` once the food is eaten.
+        grasps, movements: np.array with shape [B] of action components.
+        level_ids: optional np.array with shape [B] of the level of each
+            state in `level`, defaults to the first level.
+
+    Returns:
+        (agents, tools, foods, rewards, dones) with shape [B].
+    """
+    none = level.num_cells
+    if level_ids is None:
+        level_ids = np.zeros_like(agents)
+    shapes = level.tool_shapes[level_ids]
+    agent_blocked = level.agent_blocked
+    foods = np.where(foods == NO_FOOD, none, foods)
+    inverses = np.take(INVERSE, movements)
+
+    targets = level.neighbors[movements, agents]
+    agent_can_move = ~agent_blocked[level_ids, targets]
+    grasped = level.grasp_cells[shapes, grasps, tools, agents]
+
+    food_in_front = level.grasp_cells[shapes, inverses, tools, foods]
+    next_foods = level.neighbors[movements, foods]
+    food_moved = (
+        grasped & agent_can_move & food_in_front &
+        ~level.food_blocked[level_ids, next_foods] &
+        ~level.tool_cells[shapes, tools, next_foods])
+    foods = np.where(food_moved, next_foods, foods)
+
+    dont_move = grasped & (
+        ~agent_can_move |
+        (food_in_front & ~food_moved) |
+        level.tool_at_edge[shapes, movements, tools])
+    tools = np.where(
+        grasped & ~dont_move, level.neighbors[movements, tools], tools)
+
+    blocked = np.where(
+        level.tool_cells[shapes, tools, targets], True,
+        np.where(
+            targets == foods, False, agent_blocked[level_ids, targets]))
+    agents = np.where(
+        ~dont_move & (targets != none) & ~blocked, targets, agents)
+
+    dones = (agents == foods) & (foods != none)
+    foods = np.where(dones | (foods == none), NO_FOOD, foods)
+    rewards = np.where(dones, trap_tube_env.REWARD, 0.).astype(np.float32)
+    return agents, tools, foods, rewards, dones
+
+
+def distinct_actions_batch(level, agents, tools, level_ids=None):
+    """Vectorized `distinct_actions`.
+
+    Args:
+        level: BatchLevel.
+        agents, tools: np.array with shape [B] of state cells.
+        level_ids: optional np.array with shape [B] of the level of each
+            state in `level`, defaults to the first level.
+
+    Returns:
+        (indices, grasps, movements): np.arrays with the index into the
+            batch of each distinct action and its components.
+    """
+    if level_ids is None:
+        level_ids = np.zeros_like(agents)
+    num_grasps = len(trap_tube_env.Grasps._fields)
+    num_movements = len(trap_tube_env.Movements._fields)
+    adjacent = level.grasp_cells[
+        level.tool_shapes[level_ids][:, None],
+        np.arange(num_grasps)[None],
+        tools[:, None],
+        agents[:, None]]
+    free_grasps = np.argmin(adjacent, axis=1)
+    expanded = adjacent.copy()
+    expanded[np.arange(len(agents)), free_grasps] = True
+    indices, grasps = np.nonzero(expanded)
+    return (
+        np.repeat(indices, num_movements),
+        np.repeat(grasps, num_movements),
+        np.tile(np.arange(num_movements), len(indices)))
@@ -0,0 +1,91 @@
+"""Tests for the compact trap tube dynamics."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+from gym_tool_use import dynamics
+from gym_tool_use import trap_tube_env
+from gym_tool_use import transfers
+
+
+class DynamicsTest(parameterized.TestCase):
+
+    @parameterized.parameters(
+        (transfers.TrapTubeEnv,),
+        (transfers.PerceptualTrapTubeEnv,),
+        (transfers.StructuralTrapTubeEnv,),
+        (transfers.SymbolicTrapTubeEnv,))
+    def testStepMatchesEngine(self, constructor):
+        env = constructor()
+        np_random = np.random.RandomState(0)
+        for seed in range(5):
+            env.seed(seed)
+            env.reset()
+            level, state = dynamics.make_level(env.config)
+            self.assertEqual(
+                dynamics.to_trap_tube_state(level, state), env.get_state())
+            done = False
+            while not done:
+                action = trap_tube_env.ACTION_LIST[np_random.randint(16)]
+                state, reward, compact_done = dynamics.step(
+                    level, state, action)
+                _, expected_reward, done, _ = env.step(action)
+                self.assertEqual(reward, expected_reward)
+                if compact_done:
+                    self.assertTrue(done)
+                    break
+                self.assertEqual(
+                    dynamics.to_trap_tube_state(level, state),
+                    env.get_state())
+
+    def testStepBatchMatchesStep(self):
+        env = transfers.PerceptualTrapTubeEnv()
+        np_random = np.random.RandomState(0)
+        for seed in range(3):
+            env.seed(seed)
+            env.reset()
+            level, state = dynamics.make_level(env.config)
+            states = [state]
+            for _ in range(500):
+                action = trap_tube_env.ACTION_LIST[np_random.randint(16)]
+                state, _, done = dynamics.step(level, state, action)
+                states.append(state)
+                if done:
+                    state = states[0]
+            states = np.array(states)
+            actions = np_random.randint(16, size=len(states))
+
+            outputs = dynamics.step_batch(
+                dynamics.make_batch_level(level),
+                states[:, 0], states[:, 1], states[:, 2],
+                actions // 4, actions % 4)
+            for i, (state, action) in enumerate(zip(states, actions)):
+                next_state, reward, done = dynamics.step(
+                    level, tuple(state), trap_tube_env.ACTION_LIST[action])
+                self.assertEqual(
+                    (next_state, reward, done),
+                    (tuple(output[i] for output in outputs[:3]),
+                     outputs[3][i], outputs[4][i]))
+
+    def testDistinctActions(self):
+        env = transfers.TrapTubeEnv()
+        env.seed(0)
+        env.reset()
+        level, state = dynamics.make_level(env.config)
+        actions = dynamics.distinct_actions(level, state)
+        outcomes = set(
+            dynamics.step(level, state, action)
+            for action in trap_tube_env.ACTION_LIST)
+        self.assertEqual(
+            outcomes,
+            set(dynamics.step(level, state, action) for action in actions))
+
+
+if __name__ == '__main__':
+    absltest.main()
@@ -0,0 +1,217 @@
+"""Generate sharded offline trap tube datasets."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import json
+import multiprocessing
+
+import numpy as np
+
+import gym
+
+from gym_tool_use import policies
+from gym_tool_use import rendering
+from gym_tool_use import trap_tube_env
+
+
+MANIFEST = 'manifest.json'
+
+# Environments are created once per worker process.
+_envs = {}
+
+
+def _make_env(env_id):
+    if env_id not in _envs:
+        _envs[env_id] = gym.make(env_id).unwrapped
+    return _envs[env_id]
+
+
+def shard_path(directory, index):
+    return os.path.join(directory, 'shard_{:05d}.npz'.format(index))
+
+
+def generate_shard(env_id, policy, seed, index, num_steps, directory):
+    """Generate and write one shard of transitions.
+
+    Shard `index` is seeded from `(seed, index)`, so it is identical no
+    matter which worker generates it or how often it is regenerated. The
+    last episode of a shard is cut off once `num_steps` are collected.
+
+    Args:
+        env_id: id of a registered trap tube environment.
+        policy: key of `policies.POLICIES`.
+        seed: base seed of the dataset.
+        index: shard index.
+        num_steps: number of transitions in the shard.
+        directory: output directory.
+
+    Returns:
+        dictionary describing the shard for the manifest.
+    """
+    env = _make_env(env_id)
+    agent = policies.POLICIES[policy]()
+    np_random = np.random.RandomState([seed, index])
+
+    board_shape = env._game_shape[:2]
+    boards = np.zeros([num_steps] + board_shape, np.uint8)
+    next_boards = np.zeros([num_steps] + board_shape, np.uint8)
+    actions = np.zeros([num_steps], np.uint8)
+    rewards = np.zeros([num_steps], np.float32)
+    dones = np.zeros([num_steps], np.bool_)
+    episode_ids = np.zeros([num_steps], np.int32)
+    seeds = []
+    palettes = []
+
+    step = 0
+    while step < num_steps:
+        episode_seed = np_random.randint(2 ** 31 - 1)
+        env.seed(episode_seed)
+        env.reset()
+        agent.reset(env, np_random)
+        seeds.append(episode_seed)
+        palettes.append(rendering.make_palette(env._colors))
+        done = False
+        while not done and step < num_steps:
+            boards[step] = env._last_observations.board
+            action = agent(env)
+            _, reward, done, _ = env.step(trap_tube_env.ACTION_LIST[action])
+            next_boards[step] = env._last_observations.board
+            actions[step] = action
+            rewards[step] = reward
+            dones[step] = done
+            episode_ids[step] = len(seeds) - 1
+            step += 1
+
+    path = shard_path(directory, index)
+    with open(path + '.tmp', 'wb') as fp:
+        np.savez_compressed(
+            fp,
+            boards=boards,
+            next_boards=next_boards,
+            actions=actions,
+            rewards=rewards,
+            dones=dones,
+            episode_ids=episode_ids,
+            seeds=np.array(seeds, np.int64),
+            palettes=np.stack(palettes))
+    os.rename(path + '.tmp', path)
+    return {
+        'index': index,
+        'path': os.path.basename(path),
+        'num_steps': num_steps,
+        'num_episodes': len(seeds),
+        'num_bytes': os.path.getsize(path),
+    }
+
+
+def _generate_shard(kwargs):
+    return generate_shard(**kwargs)
+
+
+def _write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST)
+    with open(path + '.tmp', 'w') as fp:
+        json.dump(manifest, fp, indent=2, sort_keys=True)
+    os.rename(path + '.tmp', path)
+
+
+def generate(env_id, policy, num_steps, directory, num_workers=1,
+             shard_steps=100000, seed=0, on_shard=None):
+    """Generate a sharded dataset, resuming a previous partial run.
+
+    Completed shards are recorded in the manifest as they finish, so an
+    interrupted run only regenerates the shards that were in flight.
+
+    Args:
+        env_id: id of a registered trap tube environment.
+        policy: key of `policies.POLICIES`.
+        num_steps: total number of transitions.
+        directory: output directory.
+        num_workers: number of worker processes.
+        shard_steps: maximum number of transitions per shard.
+        seed: base seed of the dataset.
+        on_shard: optional callable called with the manifest entry of each
+            shard once it is written.
+
+    Returns:
+        the manifest dictionary.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    config = {
+        'env_id': env_id,
+        'policy': policy,
+        'num_steps': num_steps,
+        'shard_steps': shard_steps,
+        'seed': seed,
+    }
+    manifest = {'config': config, 'shards': []}
+    path = os.path.join(directory, MANIFEST)
+    if os.path.exists(path):
+        with open(path, 'r') as fp:
+            manifest = json.load(fp)
+        assert manifest['config'] == config, (
+            '{} was generated with {}.'.format(directory, manifest['config']))
+
+    completed = set(shard['index'] for shard in manifest['shards'])
+    tasks = []
+    for index, start in enumerate(range(0, num_steps, shard_steps)):
+        if index not in completed:
+            tasks.append({
+                'env_id': env_id,
+                'policy': policy,
+                'seed': seed,
+                'index': index,
+                'num_steps': min(shard_steps, num_steps - start),
+                'directory': directory,
+            })
+
+    if num_workers > 1:
+        pool = multiprocessing.Pool(num_workers)
+        results = pool.imap_unordered(_generate_shard, tasks)
+    else:
+        pool = None
+        results = (_generate_shard(task) for task in tasks)
+    try:
+        for shard in results:
+            manifest['shards'].append(shard)
+            manifest['shards'].sort(key=lambda shard: shard['index'])
+            _write_manifest(directory, manifest)
+            if on_shard is not None:
+                on_shard(shard)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return manifest
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(type=str, dest='env_id')
+    parser.add_argument(type=str, dest='directory')
+    parser.add_argument(
+        '--policy', choices=sorted(policies.POLICIES), default='random')
+    parser.add_argument('--steps', type=int, required=True)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--shard-steps', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    def print_shard(shard):
+        print('Wrote {path} ({num_steps} steps).'.format(**shard))
+
+    generate(
+        args.env_id,
+        args.policy,
+        args.steps,
+        args.directory,
+        num_workers=args.workers,
+        shard_steps=args.shard_steps,
+        seed=args.seed,
+        on_shard=print_shard)
@@ -0,0 +1,56 @@
+"""Tests for offline dataset generation."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import json
+import shutil
+import tempfile
+
+import numpy as np
+
+from absl.testing import absltest
+
+from gym_tool_use import generate
+
+
+class GenerateTest(absltest.TestCase):
+
+    def setUp(self):
+        super(GenerateTest, self).setUp()
+        self._directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._directory)
+
+    def testResumeRegeneratesMissingShards(self):
+        manifest = generate.generate(
+            'StructuralTrapTube-v0', 'scripted', 250, self._directory,
+            shard_steps=100, seed=3)
+        self.assertEqual(
+            [shard['num_steps'] for shard in manifest['shards']],
+            [100, 100, 50])
+        with np.load(generate.shard_path(self._directory, 1)) as data:
+            expected = dict((key, data[key]) for key in data.files)
+
+        # Forget the second shard, as if the run was interrupted.
+        manifest['shards'].pop(1)
+        os.remove(generate.shard_path(self._directory, 1))
+        with open(os.path.join(
+                self._directory, generate.MANIFEST), 'w') as fp:
+            json.dump(manifest, fp)
+
+        written = []
+        manifest = generate.generate(
+            'StructuralTrapTube-v0', 'scripted', 250, self._directory,
+            shard_steps=100, seed=3, on_shard=written.append)
+        self.assertEqual(
+            [shard['index'] for shard in manifest['shards']], [0, 1, 2])
+        self.assertEqual([shard['index'] for shard in written], [1])
+        with np.load(generate.shard_path(self._directory, 1)) as data:
+            for key, value in expected.items():
+                np.testing.assert_array_equal(data[key], value)
+
+
+if __name__ == '__main__':
+    absltest.main()
@@ -0,0 +1,109 @@
+"""Full state transition graphs of trap tube levels."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+import numpy as np
+
+from gym_tool_use import dynamics
+from gym_tool_use import trap_tube_env
+
+
+# Transitions of every reachable state in CSR form. `states[i]` is the
+# compact state of node `i` (node 0 is the initial state) and the outgoing
+# edges of node `i` are `indptr[i]:indptr[i + 1]`, one per `ACTION_LIST`
+# entry in order. Terminal nodes, where the food was eaten, have no edges.
+LevelGraph = collections.namedtuple(
+    'LevelGraph',
+    ['states', 'indptr', 'next_states', 'rewards', 'dones'])
+
+
+def state_keys(level, agents, tools, foods):
+    """Encodes arrays of compact states as unique int64 keys."""
+    num_cells = level.height * level.width
+    return ((agents.astype(np.int64) * num_cells + tools) *
+            (num_cells + 1) + foods + 1)
+
+
+def states_from_keys(level, keys):
+    """Inverse of `state_keys`, returns `(agents, tools, foods)`."""
+    num_cells = level.height * level.width
+    agent_tools, foods = np.divmod(keys, num_cells + 1)
+    agents, tools = np.divmod(agent_tools, num_cells)
+    return agents, tools, foods - 1
+
+
+def build_graph(level, state):
+    """Enumerates every state reachable from `state` and all transitions.
+
+    The search expands a whole breadth first frontier at a time with
+    `dynamics.step_batch`, and new states are found with a dense index over
+    all state keys.
+
+    Args:
+        level: dynamics.Level.
+        state: compact initial state tuple.
+
+    Returns:
+        LevelGraph.
+    """
+    batch_level = dynamics.make_batch_level(level)
+    num_actions = len(trap_tube_env.ACTION_LIST)
+    num_movements = len(trap_tube_env.Movements._fields)
+    actions = np.arange(num_actions)
+    num_cells = level.height * level.width
+    node_index = np.full(
+        [num_cells * num_cells * (num_cells + 1)], -1, np.int32)
+
+    start = np.array([state], np.int32)
+    node_index[state_keys(level, *start.T)] = 0
+    states = [start]
+    num_states = 1
+    degrees = []
+    next_states, rewards, dones = [], [], []
+    frontier = start
+    while len(frontier):
+        expandable = frontier[:, 2] != dynamics.NO_FOOD
+        degrees.append(np.where(expandable, num_actions, 0))
+        frontier = frontier[expandable]
+
+        agents, tools, foods, step_rewards, step_dones = dynamics.step_batch(
+            batch_level,
+            np.repeat(frontier[:, 0], num_actions),
+            np.repeat(frontier[:, 1], num_actions),
+            np.repeat(frontier[:, 2], num_actions),
+            np.tile(actions // num_movements, len(frontier)),
+            np.tile(actions % num_movements, len(frontier)))
+        keys = state_keys(level, agents, tools, foods)
+
+        is_new = node_index[keys] < 0
+        new_keys, first = np.unique(keys[is_new], return_index=True)
+        new_states = np.stack(
+            [agents[is_new], tools[is_new], foods[is_new]], axis=-1)[first]
+        node_index[new_keys] = np.arange(
+            num_states, num_states + len(new_keys))
+        num_states += len(new_keys)
+
+        next_states.append(node_index[keys])
+        rewards.append(step_rewards)
+        dones.append(step_dones)
+        states.append(new_states.astype(np.int32))
+        frontier = new_states
+
+    indptr = np.zeros([num_states + 1], np.int64)
+    np.cumsum(np.concatenate(degrees), out=indptr[1:])
+    return LevelGraph(
+        states=np.concatenate(states),
+        indptr=indptr,
+        next_states=np.concatenate(next_states),
+        rewards=np.concatenate(rewards),
+        dones=np.concatenate(dones))
+
+
+def build_config_graph(config):
+    """Builds the LevelGraph of a TrapTubeConfig."""
+    level, state = dynamics.make_level(config)
+    return build_graph(level, state)
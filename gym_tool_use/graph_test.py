@@ -0,0 +1,50 @@
+"""Tests for level transition graphs."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+from absl.testing import absltest
+
+from gym_tool_use import dynamics
+from gym_tool_use import graph
+from gym_tool_use import solver
+from gym_tool_use import testutil
+from gym_tool_use import trap_tube_env
+
+
+class GraphTest(absltest.TestCase):
+
+    def testGraphMatchesStep(self):
+        level, state = dynamics.make_level(testutil.small_config)
+        level_graph = graph.build_graph(level, state)
+        self.assertEqual(tuple(level_graph.states[0]), state)
+        self.assertLen(
+            set(map(tuple, level_graph.states)), len(level_graph.states))
+        is_terminal = level_graph.states[:, 2] == dynamics.NO_FOOD
+        self.assertEqual(
+            np.sum(~is_terminal),
+            solver.count_reachable_states(level, state))
+        self.assertGreater(np.sum(is_terminal), 0)
+
+        for node, node_state in enumerate(level_graph.states):
+            start, end = level_graph.indptr[node:node + 2]
+            if is_terminal[node]:
+                self.assertEqual(start, end)
+                continue
+            self.assertEqual(end - start, len(trap_tube_env.ACTION_LIST))
+            for action, edge in zip(
+                    trap_tube_env.ACTION_LIST, range(start, end)):
+                next_state, reward, done = dynamics.step(
+                    level, tuple(node_state), action)
+                self.assertEqual(
+                    tuple(level_graph.states[level_graph.next_states[edge]]),
+                    next_state)
+                self.assertEqual(level_graph.rewards[edge], reward)
+                self.assertEqual(level_graph.dones[edge], done)
+
+
+if __name__ == '__main__':
+    absltest.main()
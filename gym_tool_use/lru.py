@@ -0,0 +1,51 @@
+"""Bounded caches with least recently used eviction."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+
+class LRUCache(object):
+    """Mapping of at most `max_size` entries, evicting the least recently
+    used, that counts its `hits` and `misses`.
+
+    `None` cannot be stored, since `get` returns it for missing keys.
+    """
+
+    def __init__(self, max_size):
+        """Creates a new LRUCache.
+
+        Args:
+            max_size: maximum number of entries held.
+        """
+        assert max_size > 0, '`max_size` must be > 0.'
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns the value of `key`, or None, marking it recently used."""
+        value = self._entries.pop(key, None)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries[key] = value
+        return value
+
+    def put(self, key, value):
+        """Stores a value, evicting the least recently used entries."""
+        self._entries.pop(key, None)
+        self._entries[key] = value
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def items(self):
+        """Returns the `(key, value)` pairs, least recently used first."""
+        return list(self._entries.items())
@@ -0,0 +1,27 @@
+"""Tests for lru."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from absl.testing import absltest
+
+from gym_tool_use import lru
+
+
+class LRUCacheTest(absltest.TestCase):
+
+    def testEvictsLeastRecentlyUsed(self):
+        cache = lru.LRUCache(max_size=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+        self.assertLen(cache, 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.items(), [('a', 1), ('c', 3)])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+
+if __name__ == '__main__':
+    absltest.main()
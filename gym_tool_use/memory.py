@@ -0,0 +1,135 @@
+"""Memory footprint benchmark of the trap tube environments."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import gc
+import json
+import collections
+
+import gym
+
+from gym_tool_use import benchmark
+from gym_tool_use import trap_tube_env
+
+
+def _tracemalloc():
+    try:
+        import tracemalloc
+    except ImportError:
+        raise RuntimeError('the memory benchmark needs Python 3 tracemalloc.')
+    return tracemalloc
+
+
+def _peak(tracemalloc, fn, *args):
+    """Bytes allocated at the peak of `fn(*args)`.
+
+    Tracing is restarted around the call, which counts only its allocations
+    (`tracemalloc.reset_peak` needs Python 3.9).
+    """
+    tracemalloc.stop()
+    tracemalloc.start()
+    try:
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def measure(env_id, num_envs=100, seed=0, **kwargs):
+    """Measures the memory of `num_envs` environments with `tracemalloc`.
+
+    One environment is created and stepped first so that module level
+    caches are not counted. Traces recorded before the call are cleared.
+
+    Args:
+        env_id: id of a registered trap tube environment.
+        num_envs: number of environments created.
+        seed: seed of the first environment.
+        **kwargs: passed to `gym.make`, e.g. `low_memory=True`.
+
+    Returns:
+        dictionary with the `steady_bytes` per environment after a reset
+            and a step, and the `reset_peak_bytes` and `render_peak_bytes`
+            of a reset and an RGB render above the memory before them.
+    """
+    tracemalloc = _tracemalloc()
+    action = trap_tube_env.ACTIONS.up.up
+
+    def make_env(env_seed):
+        env = gym.make(env_id, **kwargs).unwrapped
+        env.seed(env_seed)
+        env.reset()
+        env.step(action)
+        return env
+
+    started = tracemalloc.is_tracing()
+    if not started:
+        tracemalloc.start()
+    try:
+        warmup = make_env(seed)
+        gc.collect()
+        before, _ = tracemalloc.get_traced_memory()
+        envs = [make_env(seed + 1 + index) for index in range(num_envs)]
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+
+        reset_peak = 0
+        render_peak = 0
+        for env in [warmup] + envs[:10]:
+            reset_peak = max(reset_peak, _peak(tracemalloc, env.reset))
+            render_peak = max(render_peak, _peak(
+                tracemalloc, env.render, 'rgb_array'))
+    finally:
+        if started:
+            tracemalloc.start()
+        else:
+            tracemalloc.stop()
+    return {
+        'steady_bytes': (after - before) / num_envs,
+        'reset_peak_bytes': reset_peak,
+        'render_peak_bytes': render_peak,
+    }
+
+
+def run(env_ids=benchmark.ENV_IDS, num_envs=100, verbose=False):
+    """Measures every environment with the default and low memory configs.
+
+    Returns:
+        dictionary with the run `metadata` and the `results` of each
+            `<env_id>/<config>` by name.
+    """
+    results = collections.OrderedDict()
+    for env_id in env_ids:
+        for config, kwargs in [('default', {}),
+                               ('low_memory', {'low_memory': True})]:
+            name = '{}/{}'.format(env_id, config)
+            results[name] = measure(env_id, num_envs=num_envs, **kwargs)
+            if verbose:
+                print('{:<56} {:>7.0f} B/env {:>7} B reset {:>8} B render'
+                      .format(name, results[name]['steady_bytes'],
+                              results[name]['reset_peak_bytes'],
+                              results[name]['render_peak_bytes']))
+    metadata = benchmark.metadata()
+    metadata.update(num_envs=num_envs)
+    return {'metadata': metadata, 'results': results}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', type=str)
+    parser.add_argument(
+        '--env-ids', nargs='+', choices=benchmark.ENV_IDS,
+        default=list(benchmark.ENV_IDS))
+    parser.add_argument('--envs', type=int, default=100)
+    args = parser.parse_args()
+
+    results = run(env_ids=args.env_ids, num_envs=args.envs, verbose=True)
+    if args.output:
+        benchmark.save(args.output, results)
+    else:
+        print(json.dumps(results, indent=2))
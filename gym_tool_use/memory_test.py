@@ -0,0 +1,64 @@
+"""Tests for the memory benchmark."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import warnings
+
+import numpy as np
+
+from absl.testing import absltest
+
+from gym_tool_use import memory
+from gym_tool_use import transfers
+from gym_tool_use import trap_tube_env
+
+
+class MemoryTest(absltest.TestCase):
+
+    def testLowMemoryMatchesDefault(self):
+        env = transfers.PerceptualSymbolicTrapTubeEnv()
+        low_memory_env = transfers.PerceptualSymbolicTrapTubeEnv(
+            low_memory=True)
+        env.seed(0)
+        low_memory_env.seed(0)
+        np.testing.assert_array_equal(low_memory_env.reset(), env.reset())
+        for action in trap_tube_env.ACTION_LIST:
+            state, reward, done, _ = env.step(action)
+            low_memory_state, low_memory_reward, low_memory_done, _ = (
+                low_memory_env.step(action))
+            np.testing.assert_array_equal(low_memory_state, state)
+            self.assertEqual(low_memory_reward, reward)
+            self.assertEqual(low_memory_done, done)
+        np.testing.assert_array_equal(
+            low_memory_env.render(mode='rgb_array'),
+            env.render(mode='rgb_array'))
+
+        # Spaces share their bounds, but not their random state.
+        space = low_memory_env.observation_space
+        other_space = transfers.PerceptualTrapTubeEnv(
+            low_memory=True).observation_space
+        self.assertIsNot(space, other_space)
+        self.assertIs(space.low, other_space.low)
+        self.assertFalse(space.low.flags.writeable)
+        space.seed(0)
+        first_sample = space.sample()
+        space.seed(0)
+        other_space.sample()
+        np.testing.assert_array_equal(space.sample(), first_sample)
+
+    def testLowMemorySavesMemory(self):
+        # Warnings recorded by the test runner would count as env memory.
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            default = memory.measure('PerceptualTrapTube-v0', num_envs=20)
+            low_memory = memory.measure(
+                'PerceptualTrapTube-v0', num_envs=20, low_memory=True)
+        # Both readings are noisy, so only require a clear relative saving.
+        self.assertLess(
+            low_memory['steady_bytes'], 0.9 * default['steady_bytes'])
+
+
+if __name__ == '__main__':
+    absltest.main()
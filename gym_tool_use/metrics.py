@@ -0,0 +1,130 @@
+"""Environment counters in shared memory, readable across processes."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import multiprocessing
+
+import numpy as np
+
+
+# Counters of each environment, in the order of their columns.
+COUNTERS = (
+    'steps',
+    'episodes',
+    'reward',
+    'reached_food',
+    'move_food_north',
+    'move_food_south',
+    'move_food_east',
+    'move_food_west',
+    'move_tool_north',
+    'move_tool_south',
+    'move_tool_east',
+    'move_tool_west',
+)
+STEPS = COUNTERS.index('steps')
+EPISODES = COUNTERS.index('episodes')
+REWARD = COUNTERS.index('reward')
+REACHED_FOOD = COUNTERS.index('reached_food')
+MOVE_FOOD_NORTH = COUNTERS.index('move_food_north')
+MOVE_FOOD_SOUTH = COUNTERS.index('move_food_south')
+MOVE_FOOD_EAST = COUNTERS.index('move_food_east')
+MOVE_FOOD_WEST = COUNTERS.index('move_food_west')
+MOVE_TOOL_NORTH = COUNTERS.index('move_tool_north')
+MOVE_TOOL_SOUTH = COUNTERS.index('move_tool_south')
+MOVE_TOOL_EAST = COUNTERS.index('move_tool_east')
+MOVE_TOOL_WEST = COUNTERS.index('move_tool_west')
+
+
+def increment(counters, counter, value=1):
+    """Adds `value` to a counter of a `slot`, if there is one."""
+    if counters is not None:
+        counters[counter] += value
+
+
+class SharedMetrics(object):
+    """Counters of many environments in one shared-memory array.
+
+    Each environment writes to its own slot, a row of `COUNTERS`, with plain
+    array updates and no locks, and collectors read every slot at once with
+    `snapshot`. The memory is a `multiprocessing.RawArray`, so passing a
+    SharedMetrics to worker processes when they are created shares it.
+
+    Usage:
+        shared = SharedMetrics(num_slots=64, variants=benchmark.ENV_IDS)
+        # In worker `index`, before `reset`:
+        env.unwrapped.metrics = shared.slot(index, env_id)
+        # In the collector:
+        shared.summary()
+    """
+
+    def __init__(self, num_slots, variants):
+        """Creates a new SharedMetrics.
+
+        Args:
+            num_slots: number of environments that write counters.
+            variants: names of the variants slots are grouped by, e.g.
+                environment ids.
+        """
+        assert num_slots > 0, '`num_slots` must be > 0.'
+        self.num_slots = num_slots
+        self.variants = tuple(variants)
+        self._counters = multiprocessing.RawArray(
+            'd', num_slots * len(COUNTERS))
+        self._variant_ids = multiprocessing.RawArray('i', num_slots)
+        self._variant_ids[:] = [-1] * num_slots
+
+    def counters(self):
+        """Returns a writable [num_slots, len(COUNTERS)] view of the array."""
+        return np.frombuffer(self._counters, dtype=np.float64).reshape(
+            [self.num_slots, len(COUNTERS)])
+
+    def slot(self, index, variant):
+        """Claims slot `index` for an environment of `variant`.
+
+        Returns:
+            np.array view of the slot counters, indexed by the `COUNTERS`
+                constants, for `env.metrics`.
+        """
+        self._variant_ids[index] = self.variants.index(variant)
+        return self.counters()[index]
+
+    def snapshot(self):
+        """Copies every slot at once.
+
+        Returns:
+            (np.array with shape [num_slots, len(COUNTERS)] of counters,
+                np.array with shape [num_slots] of variant indices, -1 for
+                unclaimed slots).
+        """
+        return (
+            self.counters().copy(),
+            np.frombuffer(self._variant_ids, dtype=np.int32).copy())
+
+    def summary(self):
+        """Returns the counters summed per variant from one snapshot.
+
+        Returns:
+            dictionary mapping each variant with claimed slots to the sum of
+                each counter, the `mean_reward` per step and the
+                `reached_food_rate` per episode.
+        """
+        counters, variant_ids = self.snapshot()
+        summary = collections.OrderedDict()
+        for variant_id, variant in enumerate(self.variants):
+            mask = variant_ids == variant_id
+            if not mask.any():
+                continue
+            totals = counters[mask].sum(axis=0)
+            result = collections.OrderedDict(
+                (name, float(value)) for name, value in zip(COUNTERS, totals))
+            result['mean_reward'] = (
+                result['reward'] / result['steps'] if result['steps'] else 0.)
+            result['reached_food_rate'] = (
+                result['reached_food'] / result['episodes']
+                if result['episodes'] else 0.)
+            summary[variant] = result
+        return summary
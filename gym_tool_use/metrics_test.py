@@ -0,0 +1,107 @@
+"""Tests for metrics."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import multiprocessing
+
+import numpy as np
+
+from absl.testing import absltest
+
+from gym_tool_use import metrics
+from gym_tool_use import transfers
+from gym_tool_use import trap_tube_env
+
+
+_ACTIONS = [
+    action for movements in trap_tube_env.ACTIONS for action in movements]
+
+
+def _run_episodes(counters, num_episodes, seed):
+    """Runs random episodes, returning the counts of their `info` events."""
+    env = transfers.TrapTubeEnv(max_iterations=20)
+    env.metrics = counters
+    env.seed(seed)
+    random_state = np.random.RandomState(seed)
+    events = dict.fromkeys(metrics.COUNTERS, 0)
+    for _ in range(num_episodes):
+        env.reset()
+        done = False
+        while not done:
+            action = _ACTIONS[random_state.randint(len(_ACTIONS))]
+            _, reward, done, info = env.step(action)
+            events['steps'] += 1
+            events['reward'] += reward or 0.
+            for name in metrics.COUNTERS[metrics.REACHED_FOOD:]:
+                events[name] += int(bool(info.get(name)))
+        events['episodes'] += 1
+    return events
+
+
+def _worker(shared, index, num_episodes, queue):
+    counters = shared.slot(index, 'TrapTube-v0')
+    queue.put(_run_episodes(counters, num_episodes, seed=index))
+
+
+class MetricsTest(absltest.TestCase):
+
+    def testCountersMatchInfoEvents(self):
+        shared = metrics.SharedMetrics(num_slots=2, variants=['TrapTube-v0'])
+        events = _run_episodes(
+            shared.slot(1, 'TrapTube-v0'), num_episodes=5, seed=0)
+        counters, variant_ids = shared.snapshot()
+        self.assertEqual(variant_ids.tolist(), [-1, 0])
+        self.assertEqual(counters[0].tolist(), [0.] * len(metrics.COUNTERS))
+        for index, name in enumerate(metrics.COUNTERS):
+            self.assertEqual(counters[1, index], events[name], name)
+        self.assertGreater(
+            sum(events[name] for name in metrics.COUNTERS[
+                metrics.MOVE_FOOD_NORTH:]), 0)
+
+    def testStepAfterDoneIsNotCounted(self):
+        shared = metrics.SharedMetrics(num_slots=1, variants=['TrapTube-v0'])
+        env = transfers.TrapTubeEnv(max_iterations=20)
+        env.metrics = shared.slot(0, 'TrapTube-v0')
+        env.seed(0)
+        env.reset()
+        steps = 0
+        done = False
+        while not done:
+            _, _, done, _ = env.step(_ACTIONS[steps % len(_ACTIONS)])
+            steps += 1
+        for action in _ACTIONS[:3]:
+            _, _, done, _ = env.step(action)
+            self.assertTrue(done)
+        counters, _ = shared.snapshot()
+        self.assertEqual(counters[0, metrics.STEPS], steps)
+        self.assertEqual(counters[0, metrics.EPISODES], 1)
+
+    def testSummaryAcrossProcesses(self):
+        shared = metrics.SharedMetrics(
+            num_slots=2, variants=['TrapTube-v0', 'SymbolicTrapTube-v0'])
+        queue = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(
+                target=_worker, args=(shared, index, 3, queue))
+            for index in range(2)]
+        for worker in workers:
+            worker.start()
+        events = [queue.get(timeout=60) for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        summary = shared.summary()
+        self.assertEqual(list(summary), ['TrapTube-v0'])
+        result = summary['TrapTube-v0']
+        for name in metrics.COUNTERS:
+            self.assertEqual(
+                result[name], sum(event[name] for event in events), name)
+        self.assertEqual(result['episodes'], 6)
+        self.assertAlmostEqual(
+            result['mean_reward'], result['reward'] / result['steps'])
+
+
+if __name__ == '__main__':
+    absltest.main()
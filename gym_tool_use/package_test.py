@@ -0,0 +1,45 @@
+"""Tests for the package imports."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import sys
+import subprocess
+
+from absl.testing import absltest
+
+import gym_tool_use
+
+
+class PackageTest(absltest.TestCase):
+
+    def testImportDefersEnvironments(self):
+        code = (
+            'import sys, gym, gym_tool_use; '
+            'print(sorted(name for name in ["pycolab", "gym_pycolab", '
+            '"gym_tool_use.transfers"] if name in sys.modules)); '
+            'gym.make("TrapTube-v0"); '
+            'print("pycolab" in sys.modules)')
+        with open(os.devnull, 'w') as devnull:
+            output = subprocess.check_output(
+                [sys.executable, '-c', code],
+                cwd=os.path.dirname(os.path.dirname(gym_tool_use.__file__)),
+                stderr=devnull)
+        self.assertEqual(output.decode('utf-8').split(), ['[]', 'True'])
+
+    def testLazyAttributes(self):
+        from gym_tool_use import transfers
+        from gym_tool_use import trap_tube_env
+        self.assertIs(
+            gym_tool_use.PerceptualTrapTubeEnv,
+            transfers.PerceptualTrapTubeEnv)
+        self.assertIs(gym_tool_use.ACTIONS, trap_tube_env.ACTIONS)
+        self.assertIn('BaseTrapTubeEnv', dir(gym_tool_use))
+        with self.assertRaises(AttributeError):
+            gym_tool_use.NotAnEnv  # pylint: disable=pointless-statement
+
+
+if __name__ == '__main__':
+    absltest.main()
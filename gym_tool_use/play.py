@@ -7,8 +7,10 @@ from __future__ import print_function
 import random
 import numpy as np
 
+from gym_tool_use import rendering
 from gym_tool_use import trap_tube_env
 from gym_tool_use import transfers
+from gym_tool_use import trials
 
 
 keys_to_actions = {
@@ -42,18 +44,20 @@ def get_action():
     return keys_to_actions[action_str]
 
 
-def record_episode(env):
-    states = []
+def record_episode(env, env_id, seed):
+    boards = []
     actions = []
     rewards = []
     dones = []
     weights = []
-    state = env.reset()
+    env.seed(seed)
+    env.reset()
+    palette = rendering.make_palette(env._colors)
     done = False
     env.render()
     while True:
-        weights.append(~done)
-        states.append(state)
+        weights.append(not done)
+        boards.append(np.copy(env._last_observations.board))
         env.render()
         while True:
             try:
@@ -63,19 +67,22 @@ def record_episode(env):
             except AssertionError:
                 print('Got an error, try again.')
 
-        state, reward, done, _ = env.step(action)
+        _, reward, done, _ = env.step(action)
         actions.append(action)
         rewards.append(reward)
         dones.append(done)
         if done:
             break
     env.close()
-    return (
-        np.stack(states, axis=0),
-        np.stack(actions, axis=0),
-        np.stack(rewards, axis=0).astype(np.float32),
-        np.stack(dones, axis=0),
-        np.stack(weights, axis=0).astype(np.float32))
+    return trials.Episode(
+        env_id=env_id,
+        seed=seed,
+        boards=np.stack(boards, axis=0),
+        palette=palette,
+        actions=np.stack(actions, axis=0),
+        rewards=np.stack(rewards, axis=0).astype(np.float32),
+        dones=np.stack(dones, axis=0),
+        weights=np.stack(weights, axis=0).astype(np.float32))
 
 
 if __name__ == "__main__":
@@ -105,51 +112,38 @@ if __name__ == "__main__":
     transfer = args.transfer
     if transfer == 'p':
         constructor = transfers.PerceptualTrapTubeEnv
+        env_id = 'PerceptualTrapTube-v0'
     elif transfer == 'st':
         constructor = transfers.StructuralTrapTubeEnv
+        env_id = 'StructuralTrapTube-v0'
     elif transfer == 'sy':
         constructor = transfers.SymbolicTrapTubeEnv
+        env_id = 'SymbolicTrapTube-v0'
     elif transfer == 'stsy':
         constructor = transfers.StructuralSymbolicTrapTubeEnv
+        env_id = 'StructuralSymbolicTrapTube-v0'
     elif transfer == 'pst':
         constructor = transfers.PerceptualStructuralTrapTubeEnv
+        env_id = 'PerceptualStructuralTrapTube-v0'
     elif transfer == 'psy':
         constructor = transfers.PerceptualSymbolicTrapTubeEnv
+        env_id = 'PerceptualSymbolicTrapTube-v0'
     elif transfer == 'pstsy':
         constructor = transfers.PerceptualStructuralSymbolicTrapTubeEnv
+        env_id = 'PerceptualStructuralSymbolicTrapTube-v0'
     elif transfer == 'n':
         constructor = transfers.TrapTubeEnv
+        env_id = 'TrapTube-v0'
     env = constructor()
-    env.seed(args.seed)
 
+    # Each finished episode is flushed to the trial directory, and episode
+    # `i` of the trial is seeded with `seed + i` so it can be regenerated.
+    writer = trials.TrialWriter(args.trial_name)
     try:
-        trial_states = []
-        trial_actions = []
-        trial_rewards = []
-        trial_dones = []
-        trial_weights = []
-        save_episode = False
         while True:
-            states, actions, rewards, dones, weights = record_episode(env)
-            save_episode = True
-            trial_states.append(states)
-            trial_actions.append(actions)
-            trial_rewards.append(rewards)
-            trial_dones.append(dones)
-            trial_weights.append(weights)
+            episode = record_episode(
+                env, env_id, args.seed + len(writer))
+            writer.write_episode(episode)
 
     except KeyboardInterrupt:
         print('Exiting.')
-        if save_episode:
-            while True:
-                try:
-                    np.savez(
-                        args.trial_name,
-                        states=trial_states,
-                        actions=trial_actions,
-                        rewards=trial_rewards,
-                        dones=trial_dones,
-                        weights=trial_weights)
-                    break
-                except KeyboardInterrupt:
-                    print('Failed to save, trying again.')
@@ -0,0 +1,71 @@
+"""Policies for generating trap tube data."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from gym_tool_use import solver
+from gym_tool_use import trap_tube_env
+
+
+class RandomPolicy(object):
+    """Samples actions uniformly."""
+
+    def reset(self, env, np_random):
+        """Starts a new episode.
+
+        Args:
+            env: unwrapped BaseTrapTubeEnv, already reset.
+            np_random: np random state.
+        """
+        self._np_random = np_random
+
+    def __call__(self, env):
+        """Returns the next action as an index into `ACTION_LIST`."""
+        return self._np_random.randint(len(trap_tube_env.ACTION_LIST))
+
+
+class ScriptedPolicy(RandomPolicy):
+    """Repeats uniformly sampled actions for a random number of steps.
+
+    Committing to an action pushes the tool and the food much further than
+    uniform random actions, which mostly dither in place.
+    """
+
+    def __init__(self, mean_repeats=4):
+        self._stop_probability = 1. / mean_repeats
+        self._action = None
+
+    def reset(self, env, np_random):
+        super(ScriptedPolicy, self).reset(env, np_random)
+        self._action = None
+
+    def __call__(self, env):
+        if (self._action is None or
+                self._np_random.uniform() < self._stop_probability):
+            self._action = super(ScriptedPolicy, self).__call__(env)
+        return self._action
+
+
+class OraclePolicy(RandomPolicy):
+    """Follows a shortest solution found by `solver.solve_config`.
+
+    Levels without a solution fall back to uniform random actions.
+    """
+
+    def reset(self, env, np_random):
+        super(OraclePolicy, self).reset(env, np_random)
+        self._actions = solver.solve_config(env.config) or []
+        self._actions.reverse()
+
+    def __call__(self, env):
+        if self._actions:
+            return trap_tube_env.action_index(self._actions.pop())
+        return super(OraclePolicy, self).__call__(env)
+
+
+POLICIES = {
+    'random': RandomPolicy,
+    'scripted': ScriptedPolicy,
+    'oracle': OraclePolicy,
+}
@@ -0,0 +1,260 @@
+"""Timing of the pycolab entity updates, board compositing and rendering."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import abc
+import json
+import timeit
+import functools
+import collections
+
+
+class _NullSection(object):
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+# Context manager that records nothing, for code paths without a recorder.
+NULL_SECTION = _NullSection()
+
+
+# Base class with the `abc.ABCMeta` metaclass in both Python 2 and 3.
+_ABC = abc.ABCMeta('_ABC', (object,), {})
+
+
+class Recorder(_ABC):
+    """Abstract base of the recorders of named sections.
+
+    Sections are recorded by `wrap`ped callables or the `section` context
+    manager, with `timeit.default_timer` times, and passed to `record`.
+    Subclasses implement `record` and `to_json`, which `dump` writes.
+    """
+
+    # Indentation of the JSON written by `dump`.
+    json_indent = None
+
+    def __init__(self, path=None, dump_every=None):
+        """Creates a new Recorder.
+
+        Args:
+            path: optional JSON file that `dump` writes to.
+            dump_every: optionally `dump` every this many steps.
+        """
+        assert dump_every is None or path is not None, (
+            '`dump_every` needs a `path`.')
+        self.path = path
+        self.dump_every = dump_every
+        self.steps = 0
+
+    @abc.abstractmethod
+    def record(self, name, start, end):
+        """Records a call of the section `name` from `start` to `end`."""
+
+    def wrap(self, name, fn):
+        """Returns `fn` recording each call as the section `name`."""
+        timer = timeit.default_timer
+        record = self.record
+
+        @functools.wraps(fn)
+        def wrapped(*args, **kwargs):
+            start = timer()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, start, timer())
+        return wrapped
+
+    def section(self, name):
+        """Context manager recording its body as the section `name`."""
+        return _Section(self, name)
+
+    def tick(self):
+        """Counts a step, and dumps every `dump_every` steps."""
+        self.steps += 1
+        if self.dump_every and self.steps % self.dump_every == 0:
+            self.dump()
+
+    def reset(self):
+        self.steps = 0
+
+    @abc.abstractmethod
+    def to_json(self):
+        """Returns what `dump` writes, as JSON serializable values."""
+
+    def dump(self, path=None):
+        """Writes `to_json` as JSON.
+
+        Args:
+            path: JSON file, defaults to the path the recorder was created
+                with.
+        """
+        path = path or self.path
+        assert path is not None, 'no path to dump to.'
+        with open(path + '.tmp', 'w') as fp:
+            json.dump(self.to_json(), fp, indent=self.json_indent)
+        os.rename(path + '.tmp', path)
+
+
+class Profiler(Recorder):
+    """Aggregates the time and call count of named sections.
+
+    Environments created with a profiler (or any other Recorder, like
+    `tracing.Tracer`) record:
+        reset: a whole environment reset.
+        make_game: building the level and the pycolab game.
+        transfer/<function>: each config and color transfer of a level.
+        solvable: checking that a level can be solved.
+        make_colors: choosing the colors of a level.
+        its_showtime: the first update and composite of a new game.
+        step: a whole environment step.
+        update/<entity>: each Drape, Sprite and Backdrop `update`.
+        composite: repainting the board after each update group.
+        composite/<entity>: painting the layer of each entity.
+        paint_board: painting the observation from the layers.
+        render/<mode>: `env.render`.
+    """
+
+    json_indent = 2
+
+    def __init__(self, path=None, dump_every=None):
+        """Creates a new Profiler.
+
+        Args:
+            path: optional JSON file that `dump` writes the summary to.
+            dump_every: optionally `dump` every this many steps.
+        """
+        super(Profiler, self).__init__(path=path, dump_every=dump_every)
+        self._calls = collections.defaultdict(int)
+        self._seconds = collections.defaultdict(float)
+        self._max_seconds = collections.defaultdict(float)
+
+    def record(self, name, start, end):
+        """Records a call of the section `name` from `start` to `end`."""
+        seconds = end - start
+        self._calls[name] += 1
+        self._seconds[name] += seconds
+        if seconds > self._max_seconds[name]:
+            self._max_seconds[name] = seconds
+
+    def reset(self):
+        super(Profiler, self).reset()
+        self._calls.clear()
+        self._seconds.clear()
+        self._max_seconds.clear()
+
+    def summary(self):
+        """Returns the aggregates of each section.
+
+        Returns:
+            dictionary mapping section names to dictionaries with the number
+                of `calls`, the `total_ms`, `mean_us` and `max_us` per call,
+                and the `fraction` of the total `step` time.
+        """
+        step_seconds = self._seconds.get('step', 0.)
+        summary = collections.OrderedDict()
+        for name in sorted(self._calls):
+            calls = self._calls[name]
+            seconds = self._seconds[name]
+            summary[name] = {
+                'calls': calls,
+                'total_ms': 1e3 * seconds,
+                'mean_us': 1e6 * seconds / calls,
+                'max_us': 1e6 * self._max_seconds[name],
+                'fraction': seconds / step_seconds if step_seconds else None,
+            }
+        return summary
+
+    def to_json(self):
+        """Returns the step count and the summary."""
+        return {'steps': self.steps, 'sections': self.summary()}
+
+    def format(self):
+        """Formats the summary as a table, slowest sections first."""
+        summary = self.summary()
+        lines = ['{:<32} {:>9} {:>11} {:>9} {:>7}'.format(
+            'section', 'calls', 'total_ms', 'mean_us', 'step%')]
+        for name, stats in sorted(
+                summary.items(), key=lambda item: -item[1]['total_ms']):
+            fraction = stats['fraction']
+            lines.append('{:<32} {:>9d} {:>11.1f} {:>9.1f} {:>7}'.format(
+                name, stats['calls'], stats['total_ms'], stats['mean_us'],
+                '' if fraction is None else '{:.1f}'.format(100. * fraction)))
+        return '\n'.join(lines)
+
+
+class _Section(object):
+
+    def __init__(self, recorder, name):
+        self._recorder = recorder
+        self._name = name
+        self._start = None
+
+    def __enter__(self):
+        self._start = timeit.default_timer()
+
+    def __exit__(self, *exc_info):
+        self._recorder.record(
+            self._name, self._start, timeit.default_timer())
+
+
+def _entity_name(entity):
+    return type(entity).__name__
+
+
+def instrument_game(game, profiler):
+    """Times the updates and board compositing of a pycolab game.
+
+    The `update` of every entity and the board rendering methods are
+    replaced on the instances, so games that are not instrumented are not
+    slowed down. Must be called before `its_showtime`.
+
+    Args:
+        game: pycolab.Engine.
+        profiler: Recorder, e.g. a Profiler.
+    """
+    for entity in list(game.things.values()) + [game.backdrop]:
+        entity.update = profiler.wrap(
+            'update/' + _entity_name(entity), entity.update)
+
+    names = dict(
+        (character, _entity_name(entity))
+        for character, entity in game.things.items())
+    render = game._render
+
+    def instrumented_render():
+        # The renderer is only created by `its_showtime`.
+        if game._renderer is not None and not getattr(
+                game._renderer, '_profiled', False):
+            _instrument_renderer(game._renderer, names, profiler)
+        render()
+    game._render = profiler.wrap('composite', instrumented_render)
+
+
+def _instrument_renderer(renderer, names, profiler):
+    timer = timeit.default_timer
+    paint_sprite = renderer.paint_sprite
+    paint_drape = renderer.paint_drape
+
+    def instrumented_paint_sprite(character, position):
+        start = timer()
+        paint_sprite(character, position)
+        profiler.record('composite/' + names[character], start, timer())
+
+    def instrumented_paint_drape(character, curtain):
+        start = timer()
+        paint_drape(character, curtain)
+        profiler.record('composite/' + names[character], start, timer())
+
+    renderer.paint_sprite = instrumented_paint_sprite
+    renderer.paint_drape = instrumented_paint_drape
+    renderer.paint_all_of = profiler.wrap(
+        'composite/Backdrop', renderer.paint_all_of)
+    renderer.render = profiler.wrap('composite/board', renderer.render)
+    renderer._profiled = True
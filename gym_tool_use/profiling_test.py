@@ -0,0 +1,92 @@
+"""Tests for profiling."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import json
+import shutil
+import tempfile
+
+import numpy as np
+
+from absl.testing import absltest
+
+from gym_tool_use import profiling
+from gym_tool_use import transfers
+from gym_tool_use import trap_tube_env
+
+
+class ProfilingTest(absltest.TestCase):
+
+    def setUp(self):
+        super(ProfilingTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def testProfiledEnvMatchesEnv(self):
+        path = os.path.join(self.directory, 'profile.json')
+        profiler = profiling.Profiler(path=path, dump_every=5)
+        env = transfers.TrapTubeEnv()
+        profiled_env = transfers.TrapTubeEnv()
+        profiled_env.profiler = profiler
+
+        np.testing.assert_array_equal(profiled_env.reset(), env.reset())
+        np_random = np.random.RandomState(0)
+        for _ in range(12):
+            action = trap_tube_env.ACTION_LIST[np_random.randint(16)]
+            state, reward, done, _ = env.step(action)
+            profiled_state, profiled_reward, profiled_done, _ = (
+                profiled_env.step(action))
+            np.testing.assert_array_equal(profiled_state, state)
+            self.assertEqual(profiled_reward, reward)
+            self.assertEqual(profiled_done, done)
+        profiled_env.render(mode='rgb_array')
+
+        summary = profiler.summary()
+        self.assertEqual(profiler.steps, 12)
+        self.assertEqual(summary['step']['calls'], 12)
+        self.assertEqual(summary['step']['fraction'], 1.)
+        self.assertEqual(summary['render/rgb_array']['calls'], 1)
+        # The first update is `its_showtime` at reset.
+        for name in ['FoodDrape', 'ToolDrape', 'AgentSprite', 'TaskDrape',
+                     'Backdrop']:
+            self.assertEqual(summary['update/' + name]['calls'], 13)
+        # The board is composited after each of the 7 update groups, and
+        # once more before the first update.
+        self.assertEqual(summary['composite']['calls'], 1 + 7 * 13)
+        self.assertEqual(
+            summary['composite/FoodDrape']['calls'], 1 + 7 * 13)
+
+        with open(path) as fp:
+            dumped = json.load(fp)
+        self.assertEqual(dumped['steps'], 10)
+        self.assertIn('composite/AgentSprite', dumped['sections'])
+        self.assertIn('update/AgentSprite', profiler.format())
+
+        profiler.reset()
+        self.assertEqual(profiler.summary(), {})
+
+    def testDisabledByDefault(self):
+        env = transfers.TrapTubeEnv()
+        env.reset()
+        for entity in env.current_game.things.values():
+            self.assertNotIn('update', vars(entity))
+        self.assertNotIn('_render', vars(env.current_game))
+
+    def testRecorderIsAbstract(self):
+        with self.assertRaises(TypeError):
+            profiling.Recorder()
+
+        class PartialRecorder(profiling.Recorder):
+
+            def record(self, name, start, end):
+                pass
+
+        with self.assertRaises(TypeError):
+            PartialRecorder()
+
+
+if __name__ == '__main__':
+    absltest.main()
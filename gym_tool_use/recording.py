@@ -0,0 +1,219 @@
+"""Streaming episode recorders."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import struct
+
+import numpy as np
+
+import gym
+
+from gym_tool_use import rendering
+
+
+# GIF "uncompressed" LZW: every pixel is emitted as a literal code and the
+# code table is cleared before it grows past 9 bit codes.
+_LZW_MIN_CODE_SIZE = 8
+_LZW_CLEAR_CODE = 1 << _LZW_MIN_CODE_SIZE
+_LZW_END_CODE = _LZW_CLEAR_CODE + 1
+_LZW_CODE_BITS = _LZW_MIN_CODE_SIZE + 1
+_LZW_BLOCK_SIZE = (1 << _LZW_MIN_CODE_SIZE) - 2
+
+
+def _lzw_encode(indices):
+    """Encode palette indices as GIF image data sub-blocks.
+
+    Args:
+        indices: np.array (np.uint8) of palette indices.
+
+    Returns:
+        bytes of LZW encoded image data, including the terminator.
+    """
+    indices = indices.ravel().astype(np.uint16)
+    num_blocks = -(-indices.size // _LZW_BLOCK_SIZE)
+    padded = np.full(
+        [num_blocks * _LZW_BLOCK_SIZE], _LZW_CLEAR_CODE, np.uint16)
+    padded[:indices.size] = indices
+    blocks = np.concatenate([
+        np.full([num_blocks, 1], _LZW_CLEAR_CODE, np.uint16),
+        padded.reshape([num_blocks, _LZW_BLOCK_SIZE])], axis=1)
+
+    # Drop the padding clear codes of the last block and terminate.
+    codes = blocks.ravel()[:num_blocks + indices.size]
+    codes = np.append(codes, [_LZW_CLEAR_CODE, _LZW_END_CODE])
+
+    # Pack the codes least significant bit first.
+    bits = (codes[:, None] >> np.arange(_LZW_CODE_BITS)) & 1
+    data = np.packbits(bits.astype(np.uint8).ravel(), bitorder='little')
+
+    # Split into sub-blocks of at most 255 bytes, each prefixed by its size.
+    num_sub_blocks = -(-data.size // 255)
+    sub_blocks = np.zeros([num_sub_blocks, 256], np.uint8)
+    sub_blocks[:, 0] = 255
+    sub_blocks[:, 1:].flat[:data.size] = data
+    sub_blocks[-1, 0] = data.size - (num_sub_blocks - 1) * 255
+    encoded = sub_blocks.ravel()[:num_sub_blocks + data.size]
+    return (struct.pack('<B', _LZW_MIN_CODE_SIZE) + encoded.tobytes() +
+            b'\x00')
+
+
+class GifWriter(object):
+    """Writes symbolic frames to an animated GIF as they arrive."""
+
+    def __init__(self, path, scale=1, delay=250, loop=0):
+        """Creates a new GifWriter.
+
+        Args:
+            path: path of the GIF file.
+            scale: number of pixels per board cell.
+            delay: frame delay in milliseconds.
+            loop: number of animation loops, 0 loops forever.
+        """
+        self.path = path
+        self.scale = scale
+        self.delay = delay
+        self.loop = loop
+        self._fp = None
+        self._shape = None
+
+    def _write_header(self, shape):
+        height, width = shape
+        self._fp = open(self.path, 'wb')
+        self._fp.write(b'GIF89a')
+        self._fp.write(struct.pack('<HHBBB', width, height, 0, 0, 0))
+        self._fp.write(
+            b'\x21\xff\x0bNETSCAPE2.0' +
+            struct.pack('<BBHB', 3, 1, self.loop, 0))
+        self._shape = shape
+
+    def write(self, boards, palettes):
+        """Append frames.
+
+        Args:
+            boards: np.array (np.uint8) with shape [N, H, W].
+            palettes: np.array (np.uint8) with shape [N, 256, 3].
+        """
+        delay = int(round(self.delay / 10.))
+        for board, palette in zip(boards, palettes):
+            if self.scale != 1:
+                board = np.repeat(
+                    np.repeat(board, self.scale, axis=0), self.scale, axis=1)
+            if self._fp is None:
+                self._write_header(board.shape)
+            assert board.shape == self._shape, 'frame shape must not change.'
+            height, width = board.shape
+
+            # Graphic control extension, image descriptor and local palette.
+            self._fp.write(struct.pack(
+                '<BBBBHBB', 0x21, 0xf9, 4, 4, delay, 0, 0))
+            self._fp.write(struct.pack(
+                '<BHHHHB', 0x2c, 0, 0, width, height, 0x87))
+            self._fp.write(palette.tobytes())
+            self._fp.write(_lzw_encode(board))
+        if self._fp is not None:
+            self._fp.flush()
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.write(b'\x3b')
+            self._fp.close()
+            self._fp = None
+
+
+class FrameDirectoryWriter(object):
+    """Writes each rendered frame to its own binary PPM file."""
+
+    def __init__(self, directory, scale=1):
+        """Creates a new FrameDirectoryWriter.
+
+        Args:
+            directory: directory for the `frame_XXXXXX.ppm` files.
+            scale: number of pixels per board cell.
+        """
+        self.directory = directory
+        self.scale = scale
+        self._index = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def write(self, boards, palettes):
+        """Append frames.
+
+        Args:
+            boards: np.array (np.uint8) with shape [N, H, W].
+            palettes: np.array (np.uint8) with shape [N, 256, 3].
+        """
+        for board, palette in zip(boards, palettes):
+            image = rendering.render_board(board, palette, scale=self.scale)
+            path = os.path.join(
+                self.directory, 'frame_{:06d}.ppm'.format(self._index))
+            with open(path, 'wb') as fp:
+                fp.write('P6 {} {} 255\n'.format(
+                    image.shape[1], image.shape[0]).encode('ascii'))
+                fp.write(image.tobytes())
+            self._index += 1
+
+    def close(self):
+        pass
+
+
+class TrapTubeRecorder(gym.Wrapper):
+    """Streams the frames of a trap tube environment to a writer.
+
+    Frames are kept symbolic (board characters plus palette) in a fixed size
+    buffer and only rendered when the buffer is flushed to the writer, so
+    memory use does not grow with the length of the run.
+    """
+
+    def __init__(self, env, writer, buffer_size=64):
+        """Creates a new TrapTubeRecorder.
+
+        Args:
+            env: BaseTrapTubeEnv or a wrapper of one.
+            writer: GifWriter or FrameDirectoryWriter.
+            buffer_size: number of frames held before flushing.
+        """
+        super(TrapTubeRecorder, self).__init__(env)
+        assert buffer_size > 0, '`buffer_size` must be > 0.'
+        self.writer = writer
+        self._boards = None
+        self._palettes = np.zeros([buffer_size, 256, 3], np.uint8)
+        self._palette = None
+        self._size = 0
+
+    def _record(self):
+        board = self.env.unwrapped._last_observations.board
+        if self._boards is None:
+            self._boards = np.zeros(
+                [len(self._palettes)] + list(board.shape), np.uint8)
+        if self._size == len(self._boards):
+            self.flush()
+        self._boards[self._size] = board
+        self._palettes[self._size] = self._palette
+        self._size += 1
+
+    def flush(self):
+        """Render and write all buffered frames."""
+        if self._size:
+            self.writer.write(
+                self._boards[:self._size], self._palettes[:self._size])
+            self._size = 0
+
+    def reset(self, **kwargs):
+        state = self.env.reset(**kwargs)
+        self._palette = rendering.make_palette(self.env.unwrapped._colors)
+        self._record()
+        return state
+
+    def step(self, action):
+        state, reward, done, info = self.env.step(action)
+        self._record()
+        return state, reward, done, info
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+        return self.env.close()
@@ -0,0 +1,135 @@
+"""Tests for episode recorders."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+
+from absl.testing import absltest
+
+from gym_tool_use import recording
+from gym_tool_use import rendering
+from gym_tool_use import transfers
+
+
+def _read_ppm(path):
+    with open(path, 'rb') as fp:
+        header = fp.readline().split()
+        width, height = int(header[1]), int(header[2])
+        return np.frombuffer(fp.read(), np.uint8).reshape([height, width, 3])
+
+
+def _read_sub_blocks(data, offset):
+    """Returns the concatenated sub-blocks at `offset` and the next offset."""
+    chunks = []
+    while data[offset]:
+        size = data[offset]
+        chunks.append(data[offset + 1:offset + 1 + size])
+        offset += 1 + size
+    return b''.join(chunks), offset + 1
+
+
+def _read_gif(path):
+    """Decodes the RGB frames of a GIF written with literal LZW codes."""
+    with open(path, 'rb') as fp:
+        data = fp.read()
+    assert data[:6] == b'GIF89a'
+    offset = 13
+    frames = []
+    while data[offset] != 0x3b:
+        if data[offset] == 0x21:
+            _, offset = _read_sub_blocks(data, offset + 2)
+            continue
+        assert data[offset] == 0x2c
+        _, _, width, height, flags = struct.unpack(
+            '<HHHHB', data[offset + 1:offset + 10])
+        palette_size = 3 << ((flags & 7) + 1)
+        palette = np.frombuffer(
+            data[offset + 10:offset + 10 + palette_size],
+            np.uint8).reshape([-1, 3])
+        min_code_size = data[offset + 10 + palette_size]
+        image_data, offset = _read_sub_blocks(
+            data, offset + 11 + palette_size)
+
+        # Every code has min_code_size + 1 bits, least significant first.
+        code_bits = min_code_size + 1
+        bits = np.unpackbits(
+            np.frombuffer(image_data, np.uint8), bitorder='little')
+        bits = bits[:len(bits) // code_bits * code_bits]
+        codes = bits.reshape([-1, code_bits]).dot(1 << np.arange(code_bits))
+        clear_code = 1 << min_code_size
+        end = np.flatnonzero(codes == clear_code + 1)[0]
+        codes = codes[:end]
+        indices = codes[codes != clear_code]
+        assert np.all(indices < clear_code), 'only literals are expected.'
+        frames.append(palette[indices].reshape([height, width, 3]))
+    return frames
+
+
+class RecordingTest(absltest.TestCase):
+
+    def setUp(self):
+        super(RecordingTest, self).setUp()
+        self._directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._directory)
+
+    def _run(self, env, num_steps):
+        """Returns the rendered frames and the boards with their palettes."""
+        env.seed(42)
+        env.action_space.seed(42)
+        frames = []
+        boards = []
+
+        def record():
+            frames.append(env.unwrapped.render(mode='rgb_array'))
+            boards.append((
+                np.copy(env.unwrapped._last_observations.board),
+                rendering.make_palette(env.unwrapped._colors)))
+
+        env.reset()
+        record()
+        for _ in range(num_steps):
+            _, _, done, _ = env.step(env.action_space.sample())
+            record()
+            if done:
+                break
+        env.close()
+        return frames, boards
+
+    def testFrameDirectoryMatchesRender(self):
+        directory = os.path.join(self._directory, 'frames')
+        env = transfers.PerceptualStructuralTrapTubeEnv()
+        writer = recording.FrameDirectoryWriter(
+            directory, scale=env.resize_scale)
+        env = recording.TrapTubeRecorder(env, writer, buffer_size=3)
+        frames, _ = self._run(env, 10)
+
+        paths = sorted(os.listdir(directory))
+        self.assertLen(paths, len(frames))
+        for path, frame in zip(paths, frames):
+            np.testing.assert_array_equal(
+                _read_ppm(os.path.join(directory, path)), frame)
+
+    def testGifStreamsFrames(self):
+        path = os.path.join(self._directory, 'episode.gif')
+        env = recording.TrapTubeRecorder(
+            transfers.StructuralTrapTubeEnv(),
+            recording.GifWriter(path, scale=2),
+            buffer_size=4)
+        _, boards = self._run(env, 10)
+
+        frames = _read_gif(path)
+        self.assertLen(frames, len(boards))
+        for frame, (board, palette) in zip(frames, boards):
+            np.testing.assert_array_equal(
+                frame, rendering.render_board(board, palette, scale=2))
+
+
+if __name__ == '__main__':
+    absltest.main()
@@ -0,0 +1,243 @@
+"""Performance regression gate against a stored benchmark baseline."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import timeit
+import collections
+
+import numpy as np
+
+from gym_tool_use import benchmark
+
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(__file__), 'benchmark_baseline.json')
+
+# Scenarios whose throughput is gated, matched by name suffix.
+GATED_SUFFIXES = (
+    '/step',
+    '/reset',
+    '/render_rgb_array',
+    'transfer/perceptual_config_transfer',
+)
+
+# Comparison of one scenario against the baseline:
+#   baseline, current: median raw throughput in calls per second.
+#   calibration: throughput of the calibration workload in the current run
+#       relative to the baseline run, or None when compared raw.
+#   change: relative change of the current median, negative when slower,
+#       of the calibrated throughput unless compared raw. It is roughly the
+#       raw change after dividing `current` by `calibration`.
+#   band: allowed relative slowdown.
+#   regressed: whether `change` is below `-band`.
+Comparison = collections.namedtuple(
+    'Comparison',
+    ['name', 'baseline', 'current', 'calibration', 'change', 'band',
+     'regressed'])
+
+
+def is_gated(name):
+    return name.endswith(GATED_SUFFIXES)
+
+
+def _calibration_work():
+    """Fixed Python and NumPy work that does not use the gated packages."""
+    start = timeit.default_timer()
+    board = np.zeros([12, 12], np.uint8)
+    total = 0
+    for index in range(200):
+        board[index % 12, (index * 7) % 12] += 1
+        total += int(board.sum()) + len([x for x in range(20) if x & 1])
+    return timeit.default_timer() - start
+
+
+CALIBRATION = benchmark.Scenario('calibration', _calibration_work)
+
+
+def measure(env_ids=benchmark.ENV_IDS, trials=5, duration=0.25, seed=0):
+    """Measures the throughput of the gated scenarios over several trials.
+
+    Trials of all scenarios are interleaved, so slow drift of the machine
+    (e.g. frequency scaling or other load) spreads over every scenario
+    instead of biasing the last ones. Before each scenario a calibration
+    workload that only uses Python and NumPy is timed, and the scenario
+    throughput divided by the calibration throughput is recorded as its
+    `relative` throughput, which cancels most of the speed difference
+    between machines and between runs on a shared machine.
+
+    Args:
+        env_ids: ids of registered trap tube environments.
+        trials: number of runs of each scenario.
+        duration: wall-clock budget in seconds per scenario and trial.
+        seed: seed of the environments and of the random actions.
+
+    Returns:
+        dictionary with the run `metadata` and, for each scenario by name,
+            its `median` throughput, the throughput of all `trials` and the
+            `relative` throughput of all trials.
+    """
+    scenarios = [
+        scenario for scenario in benchmark.make_scenarios(
+            env_ids=env_ids, seed=seed)
+        if is_gated(scenario.name)]
+    per_second = collections.OrderedDict(
+        (scenario.name, []) for scenario in scenarios)
+    relative = collections.OrderedDict(
+        (scenario.name, []) for scenario in scenarios)
+    for _ in range(trials):
+        for scenario in scenarios:
+            calibration = benchmark.run_scenario(
+                CALIBRATION, duration=duration / 2)
+            result = benchmark.run_scenario(scenario, duration=duration)
+            per_second[scenario.name].append(result['per_second'])
+            relative[scenario.name].append(
+                result['per_second'] / calibration['per_second'])
+
+    metadata = benchmark.metadata()
+    metadata.update(trials=trials, duration=duration, seed=seed)
+    results = collections.OrderedDict(
+        (name, {
+            'median': float(np.median(values)),
+            'trials': values,
+            'relative': relative[name],
+        })
+        for name, values in per_second.items())
+    return {'metadata': metadata, 'results': results}
+
+
+def _calibration_speed(result):
+    """Median throughput of the calibration workload of `result` trials."""
+    return np.median(
+        np.asarray(result['trials']) / np.asarray(result['relative']))
+
+
+def _relative_spread(values):
+    """Median absolute deviation relative to the median."""
+    median = np.median(values)
+    if median <= 0:
+        return 0.
+    return float(np.median(np.abs(np.asarray(values) - median)) / median)
+
+
+def compare(baseline, current, tolerance=0.2, noise_factor=3.,
+            calibrated=True):
+    """Compares measured medians with a baseline.
+
+    The tolerance band of each scenario is `tolerance`, widened to
+    `noise_factor` times the relative median absolute deviation of the
+    baseline or current trials when those are noisier.
+
+    Args:
+        baseline: output of `measure` used as the reference.
+        current: output of `measure` to check.
+        tolerance: minimum allowed relative slowdown.
+        noise_factor: multiple of the trial spread that is still allowed.
+        calibrated: compare the throughput relative to the calibration
+            workload instead of the raw throughput.
+
+    Returns:
+        list of Comparison for the scenarios in both `baseline` and
+            `current`, in the order of `current`.
+    """
+    comparisons = []
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        reference = baseline['results'][name]
+        key = 'relative' if calibrated else 'trials'
+        change = np.median(result[key]) / np.median(reference[key]) - 1.
+        band = max(
+            tolerance,
+            noise_factor * _relative_spread(reference[key]),
+            noise_factor * _relative_spread(result[key]))
+        calibration = None
+        if calibrated:
+            calibration = float(
+                _calibration_speed(result) / _calibration_speed(reference))
+        comparisons.append(Comparison(
+            name=name,
+            baseline=reference['median'],
+            current=result['median'],
+            calibration=calibration,
+            change=float(change),
+            band=band,
+            regressed=change < -band))
+    return comparisons
+
+
+def format_comparisons(comparisons):
+    """Formats comparisons as a table with one line per scenario.
+
+    The baseline and current columns are raw throughput. When compared
+    calibrated, the `calib` column is the speed of the calibration workload
+    relative to the baseline run, and `cal.change` is the change of the raw
+    throughput after dividing out that speed.
+    """
+    calibrated = any(
+        comparison.calibration is not None for comparison in comparisons)
+    lines = ['{:<56} {:>10} {:>10} {:>6} {:>10} {:>7}  {}'.format(
+        'scenario', 'baseline/s', 'current/s', 'calib',
+        'cal.change' if calibrated else 'change', 'band', 'status')]
+    row = '{:<56} {:>10.1f} {:>10.1f} {:>6} {:>+9.1f}% {:>6.1f}%  {}'
+    for comparison in comparisons:
+        if comparison.calibration is None:
+            calibration = '-'
+        else:
+            calibration = 'x{:.2f}'.format(comparison.calibration)
+        lines.append(row.format(
+            comparison.name,
+            comparison.baseline,
+            comparison.current,
+            calibration,
+            100. * comparison.change,
+            100. * comparison.band,
+            'REGRESSED' if comparison.regressed else 'ok'))
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--baseline', type=str, default=BASELINE_PATH)
+    parser.add_argument(
+        '--update', action='store_true',
+        help='write the measurements as the new baseline.')
+    parser.add_argument('--output', type=str)
+    parser.add_argument(
+        '--env-ids', nargs='+', choices=benchmark.ENV_IDS,
+        default=list(benchmark.ENV_IDS))
+    parser.add_argument('--trials', type=int, default=5)
+    parser.add_argument('--duration', type=float, default=0.25)
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--noise-factor', type=float, default=3.)
+    parser.add_argument(
+        '--raw', action='store_true',
+        help='compare raw throughput instead of calibrated throughput.')
+    args = parser.parse_args()
+
+    current = measure(
+        env_ids=args.env_ids, trials=args.trials, duration=args.duration)
+    if args.output:
+        benchmark.save(args.output, current)
+    if args.update:
+        benchmark.save(args.baseline, current)
+        print('Wrote {}.'.format(args.baseline))
+        sys.exit(0)
+
+    comparisons = compare(
+        benchmark.load(args.baseline), current,
+        tolerance=args.tolerance, noise_factor=args.noise_factor,
+        calibrated=not args.raw)
+    print(format_comparisons(comparisons))
+    regressions = [
+        comparison.name for comparison in comparisons
+        if comparison.regressed]
+    if regressions:
+        print('{} of {} scenarios regressed.'.format(
+            len(regressions), len(comparisons)))
+        sys.exit(1)
@@ -0,0 +1,99 @@
+"""Tests for the performance regression gate."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from absl.testing import absltest
+
+from gym_tool_use import benchmark
+from gym_tool_use import regression
+
+
+def _results(**trials):
+    return {
+        'results': dict(
+            (name, {
+                'median': sorted(values)[len(values) // 2],
+                'trials': values,
+                'relative': values,
+            })
+            for name, values in trials.items()),
+    }
+
+
+class RegressionTest(absltest.TestCase):
+
+    def testGatedScenarios(self):
+        names = [
+            scenario.name for scenario in benchmark.make_scenarios(
+                env_ids=['TrapTube-v0'])
+            if regression.is_gated(scenario.name)]
+        self.assertEqual(names, [
+            'TrapTube-v0/step',
+            'TrapTube-v0/reset',
+            'TrapTube-v0/render_rgb_array',
+            'transfer/perceptual_config_transfer',
+        ])
+
+    def testCompare(self):
+        baseline = _results(
+            step=[100., 100., 100.],
+            reset=[100., 100., 100.],
+            noisy=[50., 100., 150.])
+        current = _results(
+            step=[70., 70., 70.],
+            reset=[95., 95., 95.],
+            noisy=[60., 60., 60.],
+            new=[1., 1., 1.])
+        comparisons = dict(
+            (comparison.name, comparison)
+            for comparison in regression.compare(
+                baseline, current, tolerance=0.1))
+        self.assertEqual(sorted(comparisons), ['noisy', 'reset', 'step'])
+        self.assertTrue(comparisons['step'].regressed)
+        self.assertAlmostEqual(comparisons['step'].change, -0.3)
+        self.assertFalse(comparisons['reset'].regressed)
+        # The band widens with the spread of the baseline trials.
+        self.assertFalse(comparisons['noisy'].regressed)
+        self.assertAlmostEqual(comparisons['noisy'].band, 1.5)
+        self.assertIn('REGRESSED', regression.format_comparisons(
+            list(comparisons.values())))
+
+    def testCalibration(self):
+        baseline = {'results': {'step': {
+            'median': 100., 'trials': [100.] * 3, 'relative': [10.] * 3}}}
+        # Half as fast overall, including the calibration workload.
+        current = {'results': {'step': {
+            'median': 50., 'trials': [50.] * 3, 'relative': [10.] * 3}}}
+        comparison, = regression.compare(baseline, current)
+        self.assertAlmostEqual(comparison.calibration, 0.5)
+        self.assertAlmostEqual(comparison.change, 0.)
+        self.assertFalse(comparison.regressed)
+        table = regression.format_comparisons([comparison])
+        self.assertIn('cal.change', table)
+        self.assertIn('x0.50', table)
+
+        comparison, = regression.compare(
+            baseline, current, calibrated=False)
+        self.assertIsNone(comparison.calibration)
+        self.assertAlmostEqual(comparison.change, -0.5)
+        self.assertTrue(comparison.regressed)
+        self.assertNotIn(
+            'cal.change', regression.format_comparisons([comparison]))
+
+    def testMeasure(self):
+        measured = regression.measure(
+            env_ids=['TrapTube-v0'], trials=2, duration=0.01)
+        self.assertEqual(len(measured['results']), 4)
+        for result in measured['results'].values():
+            self.assertLen(result['trials'], 2)
+            self.assertLen(result['relative'], 2)
+            self.assertGreater(result['median'], 0.)
+        comparisons = regression.compare(
+            measured, measured, tolerance=0.)
+        self.assertFalse(any(c.regressed for c in comparisons))
+
+
+if __name__ == '__main__':
+    absltest.main()
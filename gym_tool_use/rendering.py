@@ -0,0 +1,99 @@
+"""Rendering of symbolic trap tube boards."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+
+def make_palette(colors):
+    """Create a color lookup table from a color map.
+
+    Colors are truncated to integers the same way as `gym_pycolab`, so
+    rendering through the palette matches `env.render(mode='rgb_array')`.
+
+    Args:
+        colors: Dictionary mapping key name to `tuple(R, G, B)`.
+
+    Returns:
+        np.array (np.uint8) with shape [256, 3] indexed by board character.
+    """
+    palette = np.zeros([256, 3], np.uint8)
+    for key, color in colors.items():
+        palette[ord(key)] = np.asarray(color).astype(np.uint32)
+    return palette
+
+
+def render_board(board, palette, scale=1):
+    """Render a symbolic board to RGB.
+
+    Args:
+        board: np.array (np.uint8) with shape [H, W] of board characters.
+        palette: np.array (np.uint8) with shape [256, 3].
+        scale: number of pixels per board cell.
+
+    Returns:
+        np.array (np.uint8) with shape [H * scale, W * scale, 3].
+    """
+    image = palette[board]
+    if scale != 1:
+        image = np.repeat(np.repeat(image, scale, axis=0), scale, axis=1)
+    return image
+
+
+def make_palettes(colors):
+    """Create color lookup tables for a batch of color maps.
+
+    Args:
+        colors: list of dictionaries mapping key name to `tuple(R, G, B)`.
+
+    Returns:
+        np.array (np.uint8) with shape [B, 256, 3].
+    """
+    return np.stack([make_palette(color_map) for color_map in colors])
+
+
+def render_boards(boards, colors, scale=1, out=None, chunk_size=256):
+    """Render a batch of symbolic trajectories to RGB.
+
+    Frames are rendered in chunks of `chunk_size` so that temporaries stay
+    bounded, and are upscaled by broadcasting directly into the output.
+
+    Args:
+        boards: np.array (np.uint8) with shape [B, T, H, W].
+        colors: list of B color dictionaries as returned by `make_colors`,
+            or np.array (np.uint8) with shape [B, 256, 3] from `make_palettes`.
+        scale: number of pixels per board cell.
+        out: optional np.array (np.uint8) with shape
+            [B, T, H * scale, W * scale, 3] to render into.
+        chunk_size: number of frames rendered at once.
+
+    Returns:
+        np.array (np.uint8) with shape [B, T, H * scale, W * scale, 3].
+    """
+    boards = np.asarray(boards)
+    batch_size, num_steps, height, width = boards.shape
+    if isinstance(colors, np.ndarray):
+        palettes = colors
+    else:
+        palettes = make_palettes(colors)
+    assert palettes.shape == (batch_size, 256, 3), (
+        '`colors` must have one palette per episode.')
+
+    out_shape = (batch_size, num_steps, height * scale, width * scale, 3)
+    if out is None:
+        out = np.empty(out_shape, np.uint8)
+    assert out.shape == out_shape, '`out` must have shape {}.'.format(
+        out_shape)
+    assert out.dtype == np.uint8, '`out` must be np.uint8.'
+    assert out.flags.c_contiguous, '`out` must be C contiguous.'
+
+    frames = boards.reshape([-1, height, width])
+    palette_ids = np.repeat(np.arange(batch_size), num_steps)
+    blocks = out.reshape([-1, height, scale, width, scale, 3])
+    for start in range(0, len(frames), chunk_size):
+        end = start + chunk_size
+        cells = palettes[palette_ids[start:end, None, None], frames[start:end]]
+        blocks[start:end] = cells[:, :, None, :, None, :]
+    return out
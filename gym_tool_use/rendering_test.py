@@ -0,0 +1,51 @@
+"""Tests for symbolic board rendering."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+from absl.testing import absltest
+
+from gym_tool_use import rendering
+from gym_tool_use import transfers
+
+
+class RenderingTest(absltest.TestCase):
+
+    def _collect(self, num_episodes, num_steps):
+        env = transfers.PerceptualStructuralSymbolicTrapTubeEnv()
+        env.seed(42)
+        env.action_space.seed(42)
+        boards = np.zeros([num_episodes, num_steps, 12, 12], np.uint8)
+        frames = np.zeros([num_episodes, num_steps, 24, 24, 3], np.uint8)
+        env.resize_scale = 2
+        colors = []
+        for episode in range(num_episodes):
+            env.reset()
+            colors.append(dict(env._colors))
+            for step in range(num_steps):
+                boards[episode, step] = env._last_observations.board
+                frames[episode, step] = env.render(mode='rgb_array')
+                if env.current_game is not None:
+                    env.step(env.action_space.sample())
+        return boards, colors, frames
+
+    def testRenderBoardsMatchesRender(self):
+        boards, colors, frames = self._collect(3, 5)
+        np.testing.assert_array_equal(
+            rendering.render_boards(boards, colors, scale=2, chunk_size=4),
+            frames)
+
+    def testRenderBoardsIntoBuffer(self):
+        boards, colors, frames = self._collect(2, 3)
+        out = np.zeros_like(frames)
+        result = rendering.render_boards(
+            boards, rendering.make_palettes(colors), scale=2, out=out)
+        self.assertIs(result, out)
+        np.testing.assert_array_equal(out, frames)
+
+
+if __name__ == '__main__':
+    absltest.main()
@@ -0,0 +1,299 @@
+"""Optimal trap tube solutions by search over compact states."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import heapq
+import itertools
+
+import numpy as np
+
+from gym_tool_use import dynamics
+from gym_tool_use import graph
+
+
+def _manhattan(level, state):
+    """Admissible distance: the agent closes at most one cell per step."""
+    agent_row, agent_col = divmod(state[0], level.width)
+    food_row, food_col = divmod(state[2], level.width)
+    return abs(agent_row - food_row) + abs(agent_col - food_col)
+
+
+def _backtrack(parents, state):
+    actions = []
+    while parents[state] is not None:
+        state, action = parents[state]
+        actions.append(action)
+    return actions[::-1]
+
+
+def solve(level, state, max_steps=None):
+    """Find a shortest action sequence that reaches the food.
+
+    Runs A* with the agent-to-food Manhattan distance, which never
+    overestimates, over the states reachable with `dynamics.step`. Only
+    actions with distinct outcomes are expanded, and the search stops as soon
+    as the food is reached.
+
+    Args:
+        level: dynamics.Level.
+        state: compact initial state tuple.
+        max_steps: optional maximum solution length.
+
+    Returns:
+        list of `ACTIONS` entries, or None if the food cannot be reached.
+    """
+    if state[2] == dynamics.NO_FOOD:
+        return []
+    counter = itertools.count()
+    parents = {state: None}
+    costs = {state: 0}
+    frontier = [(_manhattan(level, state), next(counter), state)]
+    while frontier:
+        _, _, state = heapq.heappop(frontier)
+        cost = costs[state] + 1
+        if max_steps is not None and cost > max_steps:
+            continue
+        for action in dynamics.distinct_actions(level, state):
+            next_state, _, done = dynamics.step(level, state, action)
+            if done:
+                parents[next_state] = (state, action)
+                return _backtrack(parents, next_state)
+            if cost < costs.get(next_state, cost + 1):
+                costs[next_state] = cost
+                parents[next_state] = (state, action)
+                heapq.heappush(
+                    frontier,
+                    (cost + _manhattan(level, next_state), next(counter),
+                     next_state))
+    return None
+
+
+def solve_config(config, max_steps=None):
+    """Find a shortest action sequence for a TrapTubeConfig.
+
+    Args:
+        config: TrapTubeConfig.
+        max_steps: optional maximum solution length.
+
+    Returns:
+        list of `ACTIONS` entries, or None if the food cannot be reached.
+    """
+    level, state = dynamics.make_level(config)
+    return solve(level, state, max_steps=max_steps)
+
+
+def _cells_mask(cells):
+    mask = 0
+    for cell in cells:
+        mask |= 1 << cell
+    return mask
+
+
+def _flood_fill(start, passable, width, not_first_col, not_last_col):
+    """Grows the bitmask `start` to every connected cell of `passable`."""
+    region = start
+    while True:
+        grown = region | _neighbors(
+            region, width, not_first_col, not_last_col) & passable
+        if grown == region:
+            return region
+        region = grown
+
+
+def _neighbors(region, width, not_first_col, not_last_col):
+    return (
+        (region >> width) |
+        (region << width) |
+        ((region >> 1) & not_last_col) |
+        ((region << 1) & not_first_col))
+
+
+def _search_regions(level, state, stop_at_food):
+    """Depth first search over the regions the agent can walk in.
+
+    The agent walks freely within the connected region of cells that the
+    tool, the food and the tubes leave open, so states are only expanded
+    once per region: each node is a tool and food position with the bitmask
+    of cells the agent can reach, found by a bitmask flood fill. Only grasps
+    that move the tool or the food lead to new nodes, and nodes where the
+    food moved are expanded first.
+
+    Args:
+        level: dynamics.Level.
+        state: compact state tuple, with food.
+        stop_at_food: return as soon as the food can be reached.
+
+    Returns:
+        (whether the food can be reached, dictionary mapping `(tool, food)`
+            to the list of bitmasks of the regions reached).
+    """
+    width = level.width
+    num_cells = level.height * width
+    all_cells = (1 << num_cells) - 1
+    not_first_col = all_cells & ~_cells_mask(range(0, num_cells, width))
+    not_last_col = all_cells & ~_cells_mask(
+        range(width - 1, num_cells, width))
+    open_cells = _cells_mask(
+        cell for cell, blocked in enumerate(level.agent_blocked)
+        if not blocked)
+    tool_masks = {}
+
+    reached_food = False
+    regions = {}
+    frontier = [state]
+    while frontier:
+        agent, tool, food = frontier.pop()
+        key = (tool, food)
+        if any(region >> agent & 1 for region in regions.get(key, ())):
+            continue
+        if tool not in tool_masks:
+            tool_masks[tool] = _cells_mask(level.tool_cells[tool])
+        passable = open_cells & ~tool_masks[tool] & ~(1 << food)
+        region = _flood_fill(
+            1 << agent, passable, width, not_first_col, not_last_col)
+        regions.setdefault(key, []).append(region)
+        if _neighbors(region, width, not_first_col, not_last_col) >> food & 1:
+            reached_food = True
+            if stop_at_food:
+                break
+
+        pushes = []
+        for grasp, cells_by_tool in enumerate(level.grasp_cells):
+            for cell in cells_by_tool[tool]:
+                if not region >> cell & 1:
+                    continue
+                for movement in range(len(dynamics.DELTAS)):
+                    next_state, _, done = dynamics.step(
+                        level, (cell, tool, food), (grasp, movement))
+                    if done:
+                        reached_food = True
+                        if stop_at_food:
+                            return reached_food, regions
+                    elif next_state[2] != food:
+                        pushes.append(next_state)
+                    elif next_state[1] != tool:
+                        frontier.append(next_state)
+        frontier.extend(pushes)
+    return reached_food, regions
+
+
+def solvable(level, state):
+    """Whether the food can be reached from `state`.
+
+    Args:
+        level: dynamics.Level.
+        state: compact state tuple.
+
+    Returns:
+        bool.
+    """
+    if state[2] == dynamics.NO_FOOD:
+        return True
+    return _search_regions(level, state, stop_at_food=True)[0]
+
+
+def solvable_config(config):
+    """Whether the food of a TrapTubeConfig can be reached."""
+    level, state = dynamics.make_level(config)
+    return solvable(level, state)
+
+
+def count_reachable_states(level, state):
+    """Counts the distinct states reachable from `state` before the food.
+
+    Args:
+        level: dynamics.Level.
+        state: compact state tuple.
+
+    Returns:
+        number of reachable compact states, excluding terminal states.
+    """
+    if state[2] == dynamics.NO_FOOD:
+        return 1
+    _, regions = _search_regions(level, state, stop_at_food=False)
+    count = 0
+    for key_regions in regions.values():
+        # Regions of the same tool and food positions never overlap.
+        count += sum(bin(region).count('1') for region in key_regions)
+    return count
+
+
+def shortest_lengths(levels, states, max_steps=None):
+    """Breadth first search on many levels at once.
+
+    The frontiers of all levels are stacked into one array of states that is
+    expanded with every distinct action by `dynamics.step_batch`. States
+    are deduplicated as sorted integer keys that combine the level and the
+    state, and a level leaves the search once its food is reached.
+
+    Args:
+        levels: list of dynamics.Level with the same board size.
+        states: list of compact initial state tuples, one per level.
+        max_steps: optional maximum search depth.
+
+    Returns:
+        np.array with shape [len(levels)] of shortest solution lengths, -1
+            where the food cannot be reached (within `max_steps`).
+    """
+    batch_level = dynamics.make_batch_levels(levels)
+    level = levels[0]
+    num_keys = level.height * level.width
+    num_keys = num_keys * num_keys * (num_keys + 1)
+
+    states = np.array(states, np.int64).reshape([-1, 3])
+    lengths = np.where(states[:, 2] == dynamics.NO_FOOD, 0, -1)
+    level_ids = np.flatnonzero(lengths < 0)
+    agents, tools, foods = states[level_ids].T
+    visited = np.sort(
+        level_ids * num_keys + graph.state_keys(level, agents, tools, foods))
+
+    depth = 0
+    while len(level_ids) and (max_steps is None or depth < max_steps):
+        depth += 1
+        indices, grasps, movements = dynamics.distinct_actions_batch(
+            batch_level, agents, tools, level_ids=level_ids)
+        level_ids = level_ids[indices]
+        agents, tools, foods, _, dones = dynamics.step_batch(
+            batch_level, agents[indices], tools[indices], foods[indices],
+            grasps, movements, level_ids=level_ids)
+        solved = np.unique(level_ids[dones])
+        lengths[solved] = depth
+
+        keys = np.unique(
+            (level_ids * num_keys +
+             graph.state_keys(level, agents, tools, foods))[
+                lengths[level_ids] < 0])
+        if len(solved):
+            visited = visited[lengths[visited // num_keys] < 0]
+        positions = np.minimum(
+            np.searchsorted(visited, keys), max(len(visited) - 1, 0))
+        if len(visited):
+            keys = keys[visited[positions] != keys]
+        visited = np.sort(np.concatenate([visited, keys]), kind='stable')
+
+        level_ids, keys = np.divmod(keys, num_keys)
+        agents, tools, foods = graph.states_from_keys(level, keys)
+    return lengths
+
+
+def shortest_config_lengths(configs, batch_size=64, max_steps=None):
+    """Runs `shortest_lengths` on TrapTubeConfigs in batches.
+
+    Args:
+        configs: list of TrapTubeConfig with the same board size.
+        batch_size: number of levels searched together.
+        max_steps: optional maximum search depth.
+
+    Returns:
+        np.array with shape [len(configs)] of shortest solution lengths, -1
+            where the food cannot be reached (within `max_steps`).
+    """
+    lengths = []
+    for start in range(0, len(configs), batch_size):
+        levels, states = zip(*[
+            dynamics.make_level(config)
+            for config in configs[start:start + batch_size]])
+        lengths.append(shortest_lengths(levels, states, max_steps=max_steps))
+    return np.concatenate(lengths) if lengths else np.zeros([0], np.int64)
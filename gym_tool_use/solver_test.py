@@ -0,0 +1,120 @@
+"""Tests for the trap tube solver."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from gym_tool_use import policies
+from gym_tool_use import solver
+from gym_tool_use import trap_tube_env
+from gym_tool_use import transfers
+
+
+class SolverTest(parameterized.TestCase):
+
+    def testBaseLevel(self):
+        env = transfers.TrapTubeEnv()
+        env.seed(0)
+        env.reset()
+        actions = solver.solve_config(env.config)
+        self.assertLen(actions, 11)
+        self.assertIsNone(solver.solve_config(env.config, max_steps=10))
+
+    @parameterized.parameters(
+        (transfers.TrapTubeEnv,),
+        (transfers.PerceptualTrapTubeEnv,),
+        (transfers.StructuralTrapTubeEnv,),
+        (transfers.SymbolicTrapTubeEnv,))
+    def testSolutionReachesFood(self, constructor):
+        env = constructor()
+        for seed in range(3):
+            env.seed(seed)
+            env.reset()
+            actions = solver.solve_config(env.config)
+            self.assertIsNotNone(actions)
+            for t, action in enumerate(actions):
+                _, reward, done, _ = env.step(action)
+                self.assertEqual(done, t == len(actions) - 1)
+            self.assertEqual(reward, 1.)
+
+    def testSolvable(self):
+        env = transfers.PerceptualSymbolicTrapTubeEnv()
+        env.seed(1365)
+        env.reset()
+        # The tool is a single trap cell inside the tube.
+        self.assertFalse(solver.solvable_config(env.config))
+        self.assertIsNone(solver.solve_config(env.config))
+
+        env = transfers.PerceptualSymbolicTrapTubeEnv(solvable_only=True)
+        env.seed(1365)
+        env.reset()
+        self.assertTrue(solver.solvable_config(env.config))
+
+        env = transfers.PerceptualSymbolicTrapTubeEnv(solvable_only=True)
+        env.max_attempts = 3
+        with mock.patch.object(
+                solver, 'solvable_config', return_value=False) as solvable:
+            with self.assertRaisesRegex(
+                    RuntimeError, 'perceptual_config_transfer'):
+                env.reset()
+        self.assertEqual(solvable.call_count, 3)
+
+    @parameterized.parameters(
+        (transfers.TrapTubeEnv,),
+        (transfers.PerceptualTrapTubeEnv,),
+        (transfers.SymbolicTrapTubeEnv,))
+    def testSolvableMatchesSolve(self, constructor):
+        env = constructor()
+        for seed in range(5):
+            env.seed(seed)
+            env.reset()
+            self.assertEqual(
+                solver.solvable_config(env.config),
+                solver.solve_config(env.config) is not None)
+
+    def testShortestLengths(self):
+        configs = []
+        for constructor in [
+                transfers.TrapTubeEnv,
+                transfers.PerceptualTrapTubeEnv,
+                transfers.PerceptualSymbolicTrapTubeEnv]:
+            env = constructor()
+            for seed in [0, 1, 1365]:
+                env.seed(seed)
+                env.reset()
+                configs.append(env.config)
+        expected = []
+        for config in configs:
+            actions = solver.solve_config(config)
+            expected.append(-1 if actions is None else len(actions))
+        self.assertIn(-1, expected)
+        self.assertEqual(
+            list(solver.shortest_config_lengths(configs, batch_size=4)),
+            expected)
+        self.assertEqual(
+            list(solver.shortest_config_lengths(configs[:1], max_steps=10)),
+            [-1])
+
+    def testOraclePolicy(self):
+        env = transfers.TrapTubeEnv()
+        env.seed(1)
+        env.reset()
+        policy = policies.OraclePolicy()
+        policy.reset(env, None)
+        done = False
+        while not done:
+            _, reward, done, _ = env.step(
+                trap_tube_env.ACTION_LIST[policy(env)])
+        self.assertEqual(reward, 1.)
+
+
+if __name__ == '__main__':
+    absltest.main()
@@ -0,0 +1,22 @@
+"""Levels shared by the tests."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from gym_tool_use import trap_tube_env
+
+
+# A level small enough to enumerate every state of.
+small_config = trap_tube_env.TrapTubeConfig(
+    art=['a      ',
+         '       ',
+         '  mmm  ',
+         '  n u  ',
+         '  www  ',
+         '       '],
+    tool_position=(0, 3),
+    tool_size=3,
+    tool_direction=1,
+    food_position=(3, 3),
+    tool_category=trap_tube_env.TOOL)
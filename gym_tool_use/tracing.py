@@ -0,0 +1,120 @@
+"""Timelines of environment phases as Chrome trace events."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import timeit
+import threading
+
+import numpy as np
+
+from gym_tool_use import profiling
+
+
+class Tracer(profiling.Recorder):
+    """Records spans into a preallocated ring buffer.
+
+    A Tracer can be given to an environment as its `profiler` to record the
+    same sections as a timeline. Code around the environment, e.g. the
+    synchronization of a vector environment, can add its own spans with
+    `section` or `wrap`, from any thread: recording and reading the spans
+    are guarded by a lock.
+
+    Once `capacity` spans are recorded, the oldest are overwritten.
+    """
+
+    def __init__(self, capacity=100000, path=None, dump_every=None):
+        """Creates a new Tracer.
+
+        Args:
+            capacity: maximum number of spans kept.
+            path: optional JSON file that `dump` writes the trace to.
+            dump_every: optionally `dump` every this many steps.
+        """
+        assert capacity > 0, '`capacity` must be > 0.'
+        super(Tracer, self).__init__(path=path, dump_every=dump_every)
+        self.capacity = capacity
+        self._starts = np.zeros([capacity], np.float64)
+        self._ends = np.zeros([capacity], np.float64)
+        self._name_ids = np.zeros([capacity], np.int32)
+        self._thread_ids = np.zeros([capacity], np.int64)
+        self._names = []
+        self._name_index = {}
+        self._count = 0
+        self._origin = timeit.default_timer()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def record(self, name, start, end):
+        """Records a span of `name` from `start` to `end`.
+
+        Spans are recorded by the thread that ran them, whose id is kept.
+        """
+        thread_id = threading.current_thread().ident
+        with self._lock:
+            name_id = self._name_index.get(name)
+            if name_id is None:
+                name_id = self._name_index[name] = len(self._names)
+                self._names.append(name)
+            index = self._count % self.capacity
+            self._starts[index] = start
+            self._ends[index] = end
+            self._name_ids[index] = name_id
+            self._thread_ids[index] = thread_id
+            self._count += 1
+
+    def reset(self):
+        super(Tracer, self).reset()
+        with self._lock:
+            self._count = 0
+
+    def events(self):
+        """Returns the kept spans as Chrome trace events, oldest first.
+
+        Returns:
+            list of complete ('X') event dictionaries with microsecond `ts`
+                relative to the creation of the tracer and `dur`.
+        """
+        with self._lock:
+            return self._events()
+
+    def _events(self):
+        size = len(self)
+        order = np.arange(self._count - size, self._count) % self.capacity
+        starts = 1e6 * (self._starts[order] - self._origin)
+        durations = 1e6 * (self._ends[order] - self._starts[order])
+        pid = os.getpid()
+        events = []
+        for start, duration, name_id, thread_id in zip(
+                starts.tolist(), durations.tolist(),
+                self._name_ids[order].tolist(),
+                self._thread_ids[order].tolist()):
+            name = self._names[name_id]
+            events.append({
+                'name': name,
+                'cat': name.split('/')[0],
+                'ph': 'X',
+                'ts': start,
+                'dur': duration,
+                'pid': pid,
+                'tid': thread_id,
+            })
+        return events
+
+    def to_json(self):
+        """Returns the trace in the Chrome trace event format.
+
+        The file written by `dump` opens in Perfetto (ui.perfetto.dev) or
+        `chrome://tracing` without any network access.
+        """
+        with self._lock:
+            return {
+                'traceEvents': self._events(),
+                'displayTimeUnit': 'ms',
+                'otherData': {'steps': self.steps, 'dropped': max(
+                    self._count - self.capacity, 0)},
+            }
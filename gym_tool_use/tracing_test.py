@@ -0,0 +1,108 @@
+"""Tests for tracing."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import json
+import shutil
+import tempfile
+import threading
+
+from absl.testing import absltest
+
+from gym_tool_use import tracing
+from gym_tool_use import transfers
+from gym_tool_use import trap_tube_env
+
+
+class TracingTest(absltest.TestCase):
+
+    def setUp(self):
+        super(TracingTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def testRingBufferKeepsNewestSpans(self):
+        tracer = tracing.Tracer(capacity=3)
+        for index in range(5):
+            tracer.record('span/{}'.format(index), index, index + 0.5)
+        events = tracer.events()
+        self.assertLen(tracer, 3)
+        self.assertEqual(
+            [event['name'] for event in events],
+            ['span/2', 'span/3', 'span/4'])
+        self.assertEqual(events[0]['cat'], 'span')
+        self.assertAlmostEqual(events[0]['dur'], 5e5)
+        self.assertLess(events[0]['ts'], events[1]['ts'])
+
+    def testSpansKeepTheirThread(self):
+        tracer = tracing.Tracer()
+        with tracer.section('main'):
+            pass
+        thread = threading.Thread(
+            target=tracer.wrap('worker', lambda: None))
+        thread.start()
+        thread.join()
+        thread_ids = dict(
+            (event['name'], event['tid']) for event in tracer.events())
+        self.assertEqual(
+            thread_ids['main'], threading.current_thread().ident)
+        self.assertEqual(thread_ids['worker'], thread.ident)
+
+    def testConcurrentSpans(self):
+        tracer = tracing.Tracer(capacity=1000)
+
+        def record(thread_index):
+            for index in range(500):
+                tracer.record(
+                    'thread/{}'.format(thread_index), index, index + 1)
+
+        threads = [
+            threading.Thread(target=record, args=(thread_index,))
+            for thread_index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        trace = tracer.to_json()
+        self.assertLen(trace['traceEvents'], 1000)
+        self.assertEqual(trace['otherData']['dropped'], 1000)
+
+    def testTraceEnvPhases(self):
+        path = os.path.join(self.directory, 'trace.json')
+        tracer = tracing.Tracer(path=path)
+        env = transfers.PerceptualStructuralSymbolicTrapTubeEnv()
+        env.profiler = tracer
+        env.seed(0)
+        env.reset()
+        for _ in range(3):
+            env.step(trap_tube_env.ACTIONS.up.up)
+        env.render(mode='rgb_array')
+        tracer.dump()
+
+        with open(path) as fp:
+            trace = json.load(fp)
+        names = set(event['name'] for event in trace['traceEvents'])
+        for name in ['reset', 'make_game', 'make_colors', 'its_showtime',
+                     'transfer/perceptual_config_transfer',
+                     'transfer/symbolic_config_transfer',
+                     'transfer/structural_color_transfer', 'step',
+                     'update/TaskDrape', 'composite', 'paint_board',
+                     'render/rgb_array']:
+            self.assertIn(name, names)
+
+        # Spans are complete events, and make_game nests inside reset.
+        events = trace['traceEvents']
+        self.assertTrue(all(event['ph'] == 'X' for event in events))
+        reset = [event for event in events if event['name'] == 'reset'][0]
+        make_game = [
+            event for event in events if event['name'] == 'make_game'][0]
+        self.assertGreaterEqual(make_game['ts'], reset['ts'])
+        self.assertLessEqual(
+            make_game['ts'] + make_game['dur'], reset['ts'] + reset['dur'])
+
+
+if __name__ == '__main__':
+    absltest.main()
@@ -0,0 +1,165 @@
+"""Seed-plus-actions trajectories and their reconstruction."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+import numpy as np
+
+import gym
+
+from gym_tool_use import trap_tube_env
+
+
+# A trajectory is fully determined by the level (`env_id` and `seed`) and the
+# actions taken in it. `actions` holds `trap_tube_env.action_index` values.
+Trajectory = collections.namedtuple(
+    'Trajectory', ['env_id', 'seed', 'actions'])
+
+# The result of reconstructing timestep `t`: the observation after `t`
+# actions and the reward, done flag and info of the `t`-th step.
+TimeStep = collections.namedtuple(
+    'TimeStep', ['observation', 'reward', 'done', 'info'])
+
+
+def make_trajectory(env_id, seed, actions):
+    """Creates a Trajectory from a list of `ACTIONS` entries.
+
+    Args:
+        env_id: id of a registered trap tube environment.
+        seed: seed passed to `env.seed` before `reset`.
+        actions: list of `ACTIONS` entries.
+
+    Returns:
+        Trajectory.
+    """
+    return Trajectory(
+        env_id=env_id,
+        seed=int(seed),
+        actions=np.array(
+            [trap_tube_env.action_index(action) for action in actions],
+            np.uint8))
+
+
+def save_trajectories(path, trajectories):
+    """Save trajectories to a single `.npz` file.
+
+    Args:
+        path: file path.
+        trajectories: list of Trajectory.
+    """
+    lengths = [len(trajectory.actions) for trajectory in trajectories]
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    actions = [trajectory.actions for trajectory in trajectories]
+    with open(path, 'wb') as fp:
+        np.savez(
+            fp,
+            env_ids=np.array([t.env_id for t in trajectories]),
+            seeds=np.array([t.seed for t in trajectories], np.int64),
+            offsets=offsets,
+            actions=np.concatenate(actions + [np.zeros([0], np.uint8)]))
+
+
+def load_trajectories(path):
+    """Load trajectories saved with `save_trajectories`.
+
+    Args:
+        path: file path.
+
+    Returns:
+        list of Trajectory.
+    """
+    with np.load(path) as data:
+        env_ids, seeds = data['env_ids'], data['seeds']
+        offsets, actions = data['offsets'], data['actions']
+    return [
+        Trajectory(
+            env_id=str(env_ids[i]),
+            seed=int(seeds[i]),
+            actions=actions[offsets[i]:offsets[i + 1]])
+        for i in range(len(seeds))]
+
+
+class TrajectoryReplayer(object):
+    """Reconstructs timesteps of a trajectory by replaying it.
+
+    The trajectory is replayed once up front, keeping the compact game state
+    every `checkpoint_interval` steps. Indexing is not a lookup: each
+    timestep is reconstructed by restoring the closest earlier checkpoint and
+    replaying up to `checkpoint_interval` actions through the engine. The
+    cost per timestep is therefore bounded by `checkpoint_interval` engine
+    steps, independently of the trajectory length, and iterating over all
+    timesteps costs up to `checkpoint_interval` times a single replay.
+    """
+
+    def __init__(self, trajectory, checkpoint_interval=16, env=None):
+        """Creates a new TrajectoryReplayer.
+
+        Args:
+            trajectory: Trajectory.
+            checkpoint_interval: number of steps between state checkpoints.
+            env: optional unwrapped environment created from
+                `trajectory.env_id`. It is driven by the replayer.
+        """
+        assert checkpoint_interval > 0, '`checkpoint_interval` must be > 0.'
+        self.trajectory = trajectory
+        self.checkpoint_interval = checkpoint_interval
+        if env is None:
+            env = gym.make(trajectory.env_id).unwrapped
+        self.env = env
+
+        self.env.seed(self.trajectory.seed)
+        self.env.reset()
+        self._checkpoints = [self._checkpoint()]
+        rewards = []
+        dones = []
+        for index in trajectory.actions:
+            _, reward, done, _ = self.env.step(
+                trap_tube_env.ACTION_LIST[index])
+            rewards.append(reward)
+            dones.append(done)
+            if done:
+                break
+            if len(rewards) % checkpoint_interval == 0:
+                self._checkpoints.append(self._checkpoint())
+        self.rewards = np.array(rewards, np.float32)
+        self.dones = np.array(dones, np.bool_)
+
+    def _checkpoint(self):
+        return (self.env.get_state(), self.env.current_game.the_plot.frame)
+
+    def _restore(self, checkpoint_index):
+        if self.env.current_game is None:
+            self.env.seed(self.trajectory.seed)
+            self.env.reset()
+        state, frame = self._checkpoints[checkpoint_index]
+        return self.env.set_state(state, frame=frame)
+
+    def __len__(self):
+        """Number of timesteps, including the initial observation."""
+        return len(self.rewards) + 1
+
+    def __getitem__(self, t):
+        """Reconstruct timestep `t`.
+
+        Args:
+            t: int in `[0, len(self))`.
+
+        Returns:
+            TimeStep.
+        """
+        if not 0 <= t < len(self):
+            raise IndexError('timestep {} out of range.'.format(t))
+        if t == 0:
+            observation = self._restore(0)
+            return TimeStep(np.copy(observation), 0., False, {})
+
+        checkpoint_index = (t - 1) // self.checkpoint_interval
+        self._restore(checkpoint_index)
+        start = checkpoint_index * self.checkpoint_interval
+        for index in self.trajectory.actions[start:t]:
+            observation, reward, done, info = self.env.step(
+                trap_tube_env.ACTION_LIST[index])
+        return TimeStep(np.copy(observation), reward, done, info)
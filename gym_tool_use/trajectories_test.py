@@ -0,0 +1,82 @@
+"""Tests for trajectory reconstruction."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+from gym_tool_use import trajectories
+from gym_tool_use import trap_tube_env
+from gym_tool_use import transfers
+
+
+class TrajectoriesTest(parameterized.TestCase):
+
+    def _record(self, env, seed, num_steps):
+        env.seed(seed)
+        np_random = np.random.RandomState(seed)
+        actions = []
+        timesteps = [trajectories.TimeStep(env.reset(), 0., False, {})]
+        for _ in range(num_steps):
+            action = trap_tube_env.ACTION_LIST[np_random.randint(16)]
+            actions.append(action)
+            timesteps.append(trajectories.TimeStep(*env.step(action)))
+            if timesteps[-1].done:
+                break
+        return actions, timesteps
+
+    @parameterized.parameters(
+        ('TrapTube-v0', transfers.TrapTubeEnv),
+        ('PerceptualStructuralSymbolicTrapTube-v0',
+         transfers.PerceptualStructuralSymbolicTrapTubeEnv),
+        ('SymbolicTrapTube-v0', transfers.SymbolicTrapTubeEnv))
+    def testReplayMatchesRecording(self, env_id, constructor):
+        env = constructor()
+        for seed in range(3):
+            actions, timesteps = self._record(env, seed, 60)
+            trajectory = trajectories.make_trajectory(env_id, seed, actions)
+            replayer = trajectories.TrajectoryReplayer(
+                trajectory, checkpoint_interval=4)
+            self.assertLen(replayer, len(timesteps))
+
+            # Access timesteps out of order.
+            for t in np.random.RandomState(seed).permutation(len(timesteps)):
+                expected = timesteps[t]
+                actual = replayer[t]
+                np.testing.assert_array_equal(
+                    actual.observation, expected.observation)
+                self.assertEqual(actual.reward, expected.reward)
+                self.assertEqual(actual.done, expected.done)
+                if t > 0:
+                    self.assertEqual(
+                        actual.info['agent_position'],
+                        expected.info['agent_position'])
+
+    def testSaveAndLoad(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'trajectories.npz')
+        saved = [
+            trajectories.make_trajectory(
+                'TrapTube-v0', 1, trap_tube_env.ACTION_LIST[:5]),
+            trajectories.make_trajectory('SymbolicTrapTube-v0', 2, []),
+        ]
+        trajectories.save_trajectories(path, saved)
+        loaded = trajectories.load_trajectories(path)
+        self.assertLen(loaded, 2)
+        for expected, actual in zip(saved, loaded):
+            self.assertEqual(actual.env_id, expected.env_id)
+            self.assertEqual(actual.seed, expected.seed)
+            np.testing.assert_array_equal(actual.actions, expected.actions)
+
+
+if __name__ == '__main__':
+    absltest.main()
@@ -8,6 +8,7 @@ import math
 import itertools
 import numpy as np
 
+from gym_tool_use import solver
 from gym_tool_use import trap_tube_env
 
 
@@ -91,6 +92,7 @@ def structural_color_transfer(colors, np_random):
 
     new_colors = dict(zip(color_keys, color_values))
     new_colors[trap_tube_env.TUBE2] = new_colors[trap_tube_env.TUBE1]
+    colors = dict(colors)
     colors.update(new_colors)
     return colors
 
@@ -370,7 +372,10 @@ class BaseTransferTrapTubeEnv(trap_tube_env.BaseTrapTubeEnv):
                  color_transfers,
                  initial_config,
                  initial_colors,
-                 max_iterations=100):
+                 max_iterations=100,
+                 solvable_only=False,
+                 low_memory=False,
+                 max_attempts=1000):
         """Creates a new BaseTransferTrapTubeEnv.
 
         Forms a base for all trap transfer environments.
@@ -381,28 +386,56 @@ class BaseTransferTrapTubeEnv(trap_tube_env.BaseTrapTubeEnv):
             initial_config: TrapTubeConfig.
             initial_colors: Dictionary mapping key name to `tuple(R, G, B)`.
             max_iterations: maximum number of steps allowed.
+            solvable_only: regenerate levels where the food cannot be
+                reached.
+            low_memory: share the bounds of the observation space between
+                environments, see `memory.py`.
+            max_attempts: maximum number of levels generated per reset with
+                `solvable_only`, after which a RuntimeError is raised.
         """
+        assert max_attempts > 0, '`max_attempts` must be > 0.'
+        self._solvable_only = solvable_only
+        self.max_attempts = max_attempts
         self._config_transfers = config_transfers
         self._color_transfers = color_transfers
         self._initial_config = initial_config
         self._initial_colors = initial_colors
         self._tool_category = trap_tube_env.TOOL
         super(BaseTransferTrapTubeEnv, self).__init__(
-            max_iterations=max_iterations)
+            max_iterations=max_iterations,
+            low_memory=low_memory)
 
     def _make_trap_tube_config(self):
         np_random = self.np_random if self.np_random else np.random
-        config = self._initial_config
-        for transfer in self._config_transfers:
-            config = transfer(config, np_random)
+        for _ in range(self.max_attempts if self._solvable_only else 1):
+            config = self._initial_config
+            for transfer in self._config_transfers:
+                with self._section('transfer/' + transfer.__name__):
+                    config = transfer(config, np_random)
+            if not self._solvable_only:
+                break
+            with self._section('solvable'):
+                if solver.solvable_config(config):
+                    break
+        else:
+            raise RuntimeError(
+                'no solvable level in {} attempts of {}.'.format(
+                    self.max_attempts, ', '.join(
+                        transfer.__name__
+                        for transfer in self._config_transfers) or
+                    'the initial config'))
         self._tool_category = config.tool_category
         return config
 
     def make_colors(self):
         np_random = self.np_random if self.np_random else np.random
-        colors = self._initial_colors
+        # Work on a copy: the tool color swap below would otherwise be
+        # applied to `_initial_colors` on every reset, making the colors of a
+        # seed depend on the earlier resets of the env.
+        colors = dict(self._initial_colors)
         for transfer in self._color_transfers:
-            colors = transfer(colors, np_random)
+            with self._section('transfer/' + transfer.__name__):
+                colors = transfer(colors, np_random)
         # swap tool colors.
         if self._tool_category is not trap_tube_env.TOOL:
             new_tool_color = colors[self._tool_category]
@@ -413,75 +446,94 @@ class BaseTransferTrapTubeEnv(trap_tube_env.BaseTrapTubeEnv):
 
 class PerceptualTrapTubeEnv(BaseTransferTrapTubeEnv):
 
-    def __init__(self, max_iterations=100):
+    def __init__(self, max_iterations=100, solvable_only=False,
+                 low_memory=False):
         super(PerceptualTrapTubeEnv, self).__init__(
             config_transfers=[perceptual_config_transfer],
             color_transfers=[],
             initial_config=trap_tube_env.base_config,
             initial_colors=dict(trap_tube_env.base_colors),
-            max_iterations=max_iterations)
+            max_iterations=max_iterations,
+            solvable_only=solvable_only,
+            low_memory=low_memory)
 
 
 class StructuralTrapTubeEnv(BaseTransferTrapTubeEnv):
 
-    def __init__(self, max_iterations=100):
+    def __init__(self, max_iterations=100, solvable_only=False,
+                 low_memory=False):
         super(StructuralTrapTubeEnv, self).__init__(
             config_transfers=[],
             color_transfers=[structural_color_transfer],
             initial_config=trap_tube_env.base_config,
             initial_colors=dict(trap_tube_env.base_colors),
-            max_iterations=max_iterations)
+            max_iterations=max_iterations,
+            solvable_only=solvable_only,
+            low_memory=low_memory)
 
 
 class SymbolicTrapTubeEnv(BaseTransferTrapTubeEnv):
 
-    def __init__(self, max_iterations=100):
+    def __init__(self, max_iterations=100, solvable_only=False,
+                 low_memory=False):
         super(SymbolicTrapTubeEnv, self).__init__(
             config_transfers=[symbolic_config_transfer],
             color_transfers=[],
             initial_config=trap_tube_env.base_config,
             initial_colors=dict(trap_tube_env.base_colors),
-            max_iterations=max_iterations)
+            max_iterations=max_iterations,
+            solvable_only=solvable_only,
+            low_memory=low_memory)
 
 
 class StructuralSymbolicTrapTubeEnv(BaseTransferTrapTubeEnv):
 
-    def __init__(self, max_iterations=100):
+    def __init__(self, max_iterations=100, solvable_only=False,
+                 low_memory=False):
         super(StructuralSymbolicTrapTubeEnv, self).__init__(
             config_transfers=[symbolic_config_transfer],
             color_transfers=[
                 structural_color_transfer],
             initial_config=trap_tube_env.base_config,
             initial_colors=dict(trap_tube_env.base_colors),
-            max_iterations=max_iterations)
+            max_iterations=max_iterations,
+            solvable_only=solvable_only,
+            low_memory=low_memory)
 
 
 class PerceptualStructuralTrapTubeEnv(BaseTransferTrapTubeEnv):
 
-    def __init__(self, max_iterations=100):
+    def __init__(self, max_iterations=100, solvable_only=False,
+                 low_memory=False):
         super(PerceptualStructuralTrapTubeEnv, self).__init__(
             config_transfers=[perceptual_config_transfer],
             color_transfers=[structural_color_transfer],
             initial_config=trap_tube_env.base_config,
             initial_colors=dict(trap_tube_env.base_colors),
-            max_iterations=max_iterations)
+            max_iterations=max_iterations,
+            solvable_only=solvable_only,
+            low_memory=low_memory)
 
 
 class PerceptualSymbolicTrapTubeEnv(BaseTransferTrapTubeEnv):
 
-    def __init__(self, max_iterations=100):
+    def __init__(self, max_iterations=100, solvable_only=False,
+                 low_memory=False):
         super(PerceptualSymbolicTrapTubeEnv, self).__init__(
             config_transfers=[
                 perceptual_config_transfer, symbolic_config_transfer],
             color_transfers=[],
             initial_config=trap_tube_env.base_config,
             initial_colors=dict(trap_tube_env.base_colors),
-            max_iterations=max_iterations)
+            max_iterations=max_iterations,
+            solvable_only=solvable_only,
+            low_memory=low_memory)
 
 
 class PerceptualStructuralSymbolicTrapTubeEnv(BaseTransferTrapTubeEnv):
 
-    def __init__(self, max_iterations=100):
+    def __init__(self, max_iterations=100, solvable_only=False,
+                 low_memory=False):
         super(PerceptualStructuralSymbolicTrapTubeEnv, self).__init__(
             config_transfers=[
                 perceptual_config_transfer, symbolic_config_transfer],
@@ -489,7 +541,9 @@ class PerceptualStructuralSymbolicTrapTubeEnv(BaseTransferTrapTubeEnv):
                 structural_color_transfer],
             initial_config=trap_tube_env.base_config,
             initial_colors=dict(trap_tube_env.base_colors),
-            max_iterations=max_iterations)
+            max_iterations=max_iterations,
+            solvable_only=solvable_only,
+            low_memory=low_memory)
 
 
 class TrapTubeEnv(trap_tube_env.BaseTrapTubeEnv):
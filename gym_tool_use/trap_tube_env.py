@@ -5,6 +5,11 @@ from __future__ import division
 from __future__ import print_function
 
 import abc
+import copy
+import json
+import time
+import hashlib
+import numbers
 
 import collections
 
@@ -18,6 +23,10 @@ from pycolab import things as plab_things
 from pycolab import ascii_art
 from pycolab.prefab_parts import sprites as prefab_sprites
 
+from gym_tool_use import lru
+from gym_tool_use import metrics as metrics_lib
+from gym_tool_use import profiling
+
 
 TOOL = 'p'
 AGENT = 'a'
@@ -72,6 +81,45 @@ ACTIONS = Grasps(
         right=[EAST, EAST]))
 
 
+# Flat list of `ACTIONS`, indexed by `action_index`.
+ACTION_LIST = [movement for grasp in ACTIONS for movement in grasp]
+
+
+def action_index(action):
+    """Returns the index of an `ACTIONS` entry in `ACTION_LIST`."""
+    return action[0] * len(Movements._fields) + action[1]
+
+
+# Zobrist keys, one random 64-bit integer per (agent, tool, food) and cell,
+# cached per board shape. The hash of a state XORs the keys of the agent
+# cell, the first tool cell and the food cell.
+_ZOBRIST_SEED = 0
+_zobrist_keys = {}
+
+
+def zobrist_keys(shape):
+    """Returns `(agent_keys, tool_keys, food_keys)`, indexed `[row][col]`."""
+    shape = tuple(shape)
+    if shape not in _zobrist_keys:
+        num_keys = 3 * shape[0] * shape[1]
+        keys = np.frombuffer(
+            np.random.RandomState(_ZOBRIST_SEED).bytes(8 * num_keys),
+            dtype=np.uint64)
+        _zobrist_keys[shape] = tuple(
+            keys.reshape([3] + list(shape)).tolist())
+    return _zobrist_keys[shape]
+
+
+def zobrist_hash(shape, state):
+    """Computes the Zobrist hash of a TrapTubeState from scratch."""
+    agent_keys, tool_keys, food_keys = zobrist_keys(shape)
+    value = agent_keys[state.agent_position[0]][state.agent_position[1]]
+    value ^= tool_keys[state.tool_position[0]][state.tool_position[1]]
+    if state.food_position is not None:
+        value ^= food_keys[state.food_position[0]][state.food_position[1]]
+    return value
+
+
 def _invert_direction(direction):
     if direction == NORTH:
         return SOUTH
@@ -142,16 +190,32 @@ class ExitDrape(plab_things.Drape):
 
 class FoodDrape(plab_things.Drape):
 
-    def __init__(self, curtain, character, position):
+    def __init__(self, curtain, character, position, counters=None):
         curtain[position] = True
         self._row, self._col = position
         self.has_moved = False
+        self._counters = counters
+        self._zobrist_keys = zobrist_keys(curtain.shape)[2]
+        self.zobrist_hash = 0
+        self._toggle_zobrist_hash()
         super(FoodDrape, self).__init__(curtain, character)
 
+    def _toggle_zobrist_hash(self):
+        self.zobrist_hash ^= self._zobrist_keys[self._row][self._col]
+
     @property
     def position(self):
         return (self._row, self._col)
 
+    def set_position(self, position):
+        """Moves the food to `position`, or removes it if `None`."""
+        self.curtain[:] = False
+        self.zobrist_hash = 0
+        if position is not None:
+            self._row, self._col = position
+            self.curtain[self.position] = True
+            self._toggle_zobrist_hash()
+
     def can_move(self, actions, board, things, the_plot):
         agent = things[AGENT]
         tool = things[TOOL]
@@ -194,8 +258,12 @@ class FoodDrape(plab_things.Drape):
     def _north(self, actions, board, things, the_plot):
         if self.can_move(actions, board, things, the_plot):
             the_plot.info['move_food_north'] = True
+            metrics_lib.increment(
+                self._counters, metrics_lib.MOVE_FOOD_NORTH)
             self.curtain[self.position] = False
+            self._toggle_zobrist_hash()
             self._row -= 1
+            self._toggle_zobrist_hash()
             self.curtain[self.position] = True
             self.has_moved = True
         else:
@@ -204,8 +272,12 @@ class FoodDrape(plab_things.Drape):
     def _south(self, actions, board, things, the_plot):
         if self.can_move(actions, board, things, the_plot):
             the_plot.info['move_food_south'] = True
+            metrics_lib.increment(
+                self._counters, metrics_lib.MOVE_FOOD_SOUTH)
             self.curtain[self.position] = False
+            self._toggle_zobrist_hash()
             self._row += 1
+            self._toggle_zobrist_hash()
             self.curtain[self.position] = True
             self.has_moved = True
         else:
@@ -214,8 +286,12 @@ class FoodDrape(plab_things.Drape):
     def _east(self, actions, board, things, the_plot):
         if self.can_move(actions, board, things, the_plot):
             the_plot.info['move_food_east'] = True
+            metrics_lib.increment(
+                self._counters, metrics_lib.MOVE_FOOD_EAST)
             self.curtain[self.position] = False
+            self._toggle_zobrist_hash()
             self._col += 1
+            self._toggle_zobrist_hash()
             self.curtain[self.position] = True
             self.has_moved = True
         else:
@@ -224,8 +300,12 @@ class FoodDrape(plab_things.Drape):
     def _west(self, actions, board, things, the_plot):
         if self.can_move(actions, board, things, the_plot):
             the_plot.info['move_food_west'] = True
+            metrics_lib.increment(
+                self._counters, metrics_lib.MOVE_FOOD_WEST)
             self.curtain[self.position] = False
+            self._toggle_zobrist_hash()
             self._col -= 1
+            self._toggle_zobrist_hash()
             self.curtain[self.position] = True
             self.has_moved = True
         else:
@@ -243,10 +323,12 @@ class ToolDrape(plab_things.Drape):
                  character,
                  position,
                  tool_size=4,
-                 tool_direction=0):
+                 tool_direction=0,
+                 counters=None):
         w, h = curtain.shape[0], curtain.shape[1]
         self._row, self._col = position
         self.has_moved = False
+        self._counters = counters
 
         assert tool_direction in [0, 1], '`tool_direction` must be 0 or 1.'
         assert tool_size >= 0, '`tool_size` must be >= 0.'
@@ -273,8 +355,27 @@ class ToolDrape(plab_things.Drape):
             for position in zip(s0, s1):
                 curtain[position] = True
 
+        self._zobrist_keys = zobrist_keys(curtain.shape)[1]
+        self.zobrist_hash = 0
+        self._toggle_zobrist_hash()
         super(ToolDrape, self).__init__(curtain, character)
 
+    def _toggle_zobrist_hash(self):
+        self.zobrist_hash ^= self._zobrist_keys[self._row][self._col]
+
+    def set_position(self, position):
+        """Moves the tool so that its first cell is at `position`."""
+        self.curtain[:] = False
+        self._toggle_zobrist_hash()
+        self._row, self._col = position
+        self._toggle_zobrist_hash()
+        if self._tool_direction == 0:
+            self.curtain[
+                self._row:self._row + self._tool_size, self._col] = True
+        else:
+            self.curtain[
+                self._row, self._col:self._col + self._tool_size] = True
+
     def is_south_of_tool(self, row, col):
         row_offset = self._tool_size if self._tool_direction == 0 else 1
         return row == (self._row + row_offset)
@@ -369,9 +470,13 @@ class ToolDrape(plab_things.Drape):
                 return
 
             the_plot.info['move_tool_north'] = True
+            metrics_lib.increment(
+                self._counters, metrics_lib.MOVE_TOOL_NORTH)
             curtain = np.roll(self.curtain, -1, axis=0)
             np.copyto(self.curtain, curtain)
+            self._toggle_zobrist_hash()
             self._row -= 1
+            self._toggle_zobrist_hash()
             self.has_moved = True
 
     def _south(self, actions, board, things, the_plot):
@@ -383,9 +488,13 @@ class ToolDrape(plab_things.Drape):
                 return
 
             the_plot.info['move_tool_south'] = True
+            metrics_lib.increment(
+                self._counters, metrics_lib.MOVE_TOOL_SOUTH)
             curtain = np.roll(self.curtain, 1, axis=0)
             np.copyto(self.curtain, curtain)
+            self._toggle_zobrist_hash()
             self._row += 1
+            self._toggle_zobrist_hash()
             self.has_moved = True
 
     def _east(self, actions, board, things, the_plot):
@@ -397,9 +506,13 @@ class ToolDrape(plab_things.Drape):
                 return
 
             the_plot.info['move_tool_east'] = True
+            metrics_lib.increment(
+                self._counters, metrics_lib.MOVE_TOOL_EAST)
             curtain = np.roll(self.curtain, 1, axis=1)
             np.copyto(self.curtain, curtain)
+            self._toggle_zobrist_hash()
             self._col += 1
+            self._toggle_zobrist_hash()
             self.has_moved = True
 
     def _west(self, actions, board, things, the_plot):
@@ -410,9 +523,13 @@ class ToolDrape(plab_things.Drape):
                 return
 
             the_plot.info['move_tool_west'] = True
+            metrics_lib.increment(
+                self._counters, metrics_lib.MOVE_TOOL_WEST)
             curtain = np.roll(self.curtain, -1, axis=1)
             np.copyto(self.curtain, curtain)
+            self._toggle_zobrist_hash()
             self._col -= 1
+            self._toggle_zobrist_hash()
             self.has_moved = True
 
     def _stay(self, actions, board, things, the_plot):
@@ -446,9 +563,17 @@ class AgentSprite(prefab_sprites.MazeWalker):
             character,
             impassible,
             confined_to_board=True)
+        self._zobrist_keys = zobrist_keys(corner)[0]
+        self.zobrist_hash = self._zobrist_keys[position[0]][position[1]]
+
+    def teleport(self, position):
+        """Moves the agent to `position`, ignoring impassables."""
+        self.zobrist_hash ^= self._zobrist_keys[self.position[0]][
+            self.position[1]]
+        self._teleport(position)
+        self.zobrist_hash ^= self._zobrist_keys[position[0]][position[1]]
 
     def update(self, actions, board, layers, backdrop, things, the_plot):
-        tool = things[TOOL]
         rows, cols = self.position
 
         if actions is None:
@@ -457,9 +582,7 @@ class AgentSprite(prefab_sprites.MazeWalker):
         if self.dont_move:
             self.dont_move = False
             self._stay(board, the_plot)
-            return
-
-        if action_movement_equal(actions, NORTH):
+        elif action_movement_equal(actions, NORTH):
             self._north(board, the_plot)
         elif action_movement_equal(actions, SOUTH):
             self._south(board, the_plot)
@@ -470,10 +593,19 @@ class AgentSprite(prefab_sprites.MazeWalker):
         else:
             self._stay(board, the_plot)
 
+        if self.position != (rows, cols):
+            self.zobrist_hash ^= (
+                self._zobrist_keys[rows][cols] ^
+                self._zobrist_keys[self.position[0]][self.position[1]])
+
 
 class TaskDrape(plab_things.Drape):
     """Handles task logic."""
 
+    def __init__(self, curtain, character, counters=None):
+        self._counters = counters
+        super(TaskDrape, self).__init__(curtain, character)
+
     def update(self, actions, board, layers, backdrop, things, the_plot):
         agent = things[AGENT]
         food = things[FOOD]
@@ -484,8 +616,12 @@ class TaskDrape(plab_things.Drape):
 
         if food.curtain[agent.position]:
             the_plot.info['reached_food'] = True
+            metrics_lib.increment(
+                self._counters, metrics_lib.REACHED_FOOD)
             the_plot.add_reward(REWARD)
-            food.curtain[agent.position] = False
+            food.set_position(None)
+
+        the_plot.info['state_hash'] = _state_hash(things)
 
         if np.sum(food.curtain) == 0.:
             the_plot.terminate_episode()
@@ -497,6 +633,78 @@ TrapTubeConfig = collections.namedtuple(
     ['art', 'tool_position', 'tool_size', 'tool_direction', 'food_position',
      'tool_category'])
 
+# Compact state of a game within its level. Positions are `(row, col)`; the
+# tool position is its first cell and the food position is `None` once eaten.
+TrapTubeState = collections.namedtuple(
+    'TrapTubeState', ['agent_position', 'tool_position', 'food_position'])
+
+
+def _state_hash(things):
+    return (
+        things[AGENT].zobrist_hash ^
+        things[TOOL].zobrist_hash ^
+        things[FOOD].zobrist_hash)
+
+
+def _first_position(layer):
+    positions = np.argwhere(layer)
+    if len(positions) == 0:
+        return None
+    return tuple(int(index) for index in positions[0])
+
+
+def config_key(config):
+    """Returns a stable string key identifying a TrapTubeConfig."""
+    description = json.dumps([
+        list(config.art),
+        [int(x) for x in config.tool_position],
+        int(config.tool_size),
+        int(config.tool_direction),
+        [int(x) for x in config.food_position],
+        str(config.tool_category),
+    ])
+    return hashlib.sha1(description.encode('utf-8')).hexdigest()
+
+
+class TransitionCache(lru.LRUCache):
+    """Bounded LRU cache of transitions between compact states.
+
+    Entries are keyed by `(config key, state hash, action index)` and hold
+    `(next TrapTubeState, reward, whether the food was eaten, info)`.
+    """
+
+    def __init__(self, max_size=100000):
+        """Creates a new TransitionCache.
+
+        Args:
+            max_size: maximum number of transitions held.
+        """
+        super(TransitionCache, self).__init__(max_size)
+
+
+# Layers that change during an episode, in `z_order`. They are above every
+# other layer, so the others can be painted once per game.
+DYNAMIC_LAYERS = (FOOD, TOOL, AGENT)
+
+# Unused observation spaces whose bounds low memory environments share, by
+# shape.
+_observation_spaces = {}
+
+
+def _shared_observation_space(space):
+    """Returns a copy of `space` with bounds shared by every copy.
+
+    The bounds are made read-only. Each copy is a separate space with its own
+    random state, created when it is first seeded or sampled.
+    """
+    key = tuple(space.shape)
+    if key not in _observation_spaces:
+        for bounds in [space.low, space.high,
+                       space.bounded_below, space.bounded_above]:
+            bounds.flags.writeable = False
+        _observation_spaces[key] = space
+    return copy.copy(_observation_spaces[key])
+
 
 class BaseTrapTubeEnv(gym_pycolab.PyColabEnv):
     """Trap Tube environment."""
@@ -505,7 +713,42 @@ class BaseTrapTubeEnv(gym_pycolab.PyColabEnv):
                  max_iterations=50,
                  delay=250,
                  resize_scale=32,
-                 default_reward=0.):
+                 default_reward=0.,
+                 transition_cache=None,
+                 profiler=None,
+                 metrics=None,
+                 precompose=False,
+                 incremental_render=False,
+                 observation_buffers=None,
+                 low_memory=False):
+        # TrapTubeConfig of the current level, set by `make_game`.
+        self.config = None
+        self._level_key = None
+        self._state_hash = None
+        # Optional TransitionCache, can also be set after construction.
+        self.transition_cache = transition_cache
+        # Optional profiling.Profiler or tracing.Tracer, games created while
+        # it is set are instrumented.
+        self.profiler = profiler
+        # Optional counters of a `metrics.SharedMetrics` slot, games created
+        # while they are set count their events into them.
+        self.metrics = metrics
+        # Whether boards are painted over a background of the static layers,
+        # which `make_game` clears and the first paint of a game creates.
+        self.precompose = precompose
+        self._background = None
+        self._dynamic_colors = None
+        self._board_buffer = None
+        # Whether `render` only repaints the cells that changed since the
+        # last render into a persistent frame.
+        self.incremental_render = incremental_render
+        self._frame = None
+        self._frame_board = None
+        # Buffers observations are painted into, see
+        # `set_observation_buffers`.
+        self._observation_buffers = None
+        self._observation_views = None
+        self._observation_index = 0
         super(BaseTrapTubeEnv, self).__init__(
             max_iterations=max_iterations,
             default_reward=default_reward,
@@ -513,6 +756,13 @@ class BaseTrapTubeEnv(gym_pycolab.PyColabEnv):
                 [len(Grasps._fields), len(Movements._fields)]),
             resize_scale=resize_scale,
             delay=delay)
+        self.low_memory = low_memory
+        if low_memory:
+            # The bounds arrays of a Box cost more than the observation, so
+            # every environment with the same shape shares them.
+            self.observation_space = _shared_observation_space(
+                self.observation_space)
+        self.set_observation_buffers(observation_buffers)
 
     @abc.abstractmethod
     def _make_trap_tube_config(self):
@@ -523,6 +773,31 @@ class BaseTrapTubeEnv(gym_pycolab.PyColabEnv):
         """
         pass
 
+    def _section(self, name):
+        """Context manager recording `name` with the profiler, if any."""
+        if self.profiler is None:
+            return profiling.NULL_SECTION
+        return self.profiler.section(name)
+
+    def reset(self):
+        """Start a new episode."""
+        if self.profiler is None:
+            return super(BaseTrapTubeEnv, self).reset()
+        # Same as `PyColabEnv.reset`, with each phase recorded.
+        with self.profiler.section('reset'):
+            with self.profiler.section('make_game'):
+                self.current_game = self.make_game()
+            with self.profiler.section('make_colors'):
+                self._colors = self.make_colors()
+            self.current_game.the_plot.info = {}
+            self._game_over = None
+            self._last_observations = None
+            self._last_reward = None
+            with self.profiler.section('its_showtime'):
+                observations, reward, _ = self.current_game.its_showtime()
+            self._update_for_game_step(observations, reward)
+        return self._last_state
+
     def make_game(self):
         """Builds a trap tube game.
 
@@ -530,6 +805,9 @@ class BaseTrapTubeEnv(gym_pycolab.PyColabEnv):
             pycolab.Engine
         """
         config = self._make_trap_tube_config()
+        self.config = config
+        self._level_key = config_key(config)
+        self._background = None
 
         sprites = {
             AGENT: ascii_art.Partial(
@@ -538,7 +816,8 @@ class BaseTrapTubeEnv(gym_pycolab.PyColabEnv):
         drapes = {
             FOOD: ascii_art.Partial(
                 FoodDrape,
-                config.food_position),
+                config.food_position,
+                counters=self.metrics),
             TRAP: TrapDrape,
             EXIT: ExitDrape,
             TUBE1: Tube1Drape,
@@ -547,8 +826,9 @@ class BaseTrapTubeEnv(gym_pycolab.PyColabEnv):
                 ToolDrape,
                 config.tool_position,
                 tool_size=config.tool_size,
-                tool_direction=config.tool_direction),
-            TASK: TaskDrape}
+                tool_direction=config.tool_direction,
+                counters=self.metrics),
+            TASK: ascii_art.Partial(TaskDrape, counters=self.metrics)}
         update_schedule = [
             [FOOD], [TOOL], [EXIT], [AGENT], [TUBE1, TUBE2], [TRAP], [TASK]]
         z_order = [
@@ -561,11 +841,288 @@ class BaseTrapTubeEnv(gym_pycolab.PyColabEnv):
             update_schedule=update_schedule,
             z_order=z_order,
             occlusion_in_layers=False)
+        if self.profiler is not None:
+            profiling.instrument_game(game, self.profiler)
         return game
 
     def make_colors(self):
         return {}
 
+    def set_observation_buffers(self, buffers):
+        """Makes `reset` and `step` paint observations into `buffers`.
+
+        Observations are then returned as read-only views of the buffers,
+        used in turn, so an observation is overwritten once every buffer
+        has been used again and must be copied to be kept longer.
+
+        Args:
+            buffers: `None` to allocate every observation, a number of
+                buffers to allocate, or a np.array (np.float32) with the
+                observation shape [H, W, C] or [K, H, W, C], e.g. the row of
+                an environment in the [N, H, W, C] array of a vector
+                environment.
+        """
+        if buffers is None:
+            self._observation_buffers = None
+            self._observation_views = None
+            return
+        shape = tuple(self.observation_space.shape)
+        if isinstance(buffers, numbers.Integral):
+            assert buffers > 0, '`buffers` must be > 0.'
+            buffers = np.zeros((buffers,) + shape, np.float32)
+        if buffers.shape == shape:
+            buffers = buffers[None]
+        assert buffers.shape[1:] == shape, (
+            '`buffers` must have shape [K] + {}.'.format(list(shape)))
+        assert buffers.dtype == np.float32, '`buffers` must be np.float32.'
+        self._observation_buffers = list(buffers)
+        self._observation_views = []
+        for buffer in self._observation_buffers:
+            view = buffer.view()
+            view.flags.writeable = False
+            self._observation_views.append(view)
+        self._observation_index = 0
+
+    def _update_for_game_step(self, observations, reward):
+        if self._observation_buffers is None:
+            super(BaseTrapTubeEnv, self)._update_for_game_step(
+                observations, reward)
+        else:
+            # Same as `PyColabEnv._update_for_game_step`, painting into the
+            # next buffer instead of a new array.
+            index = self._observation_index
+            self._observation_index = (index + 1) % len(
+                self._observation_buffers)
+            self._last_observations = observations
+            if self._empty_board is None:
+                self._empty_board = np.zeros_like(observations.board)
+            np.copyto(
+                self._observation_buffers[index],
+                self._paint_board(observations.layers))
+            self._last_state = self._observation_views[index]
+            self._last_reward = (
+                reward if reward is not None else self._default_reward)
+            self._game_over = self.current_game.game_over
+            if self.current_game.the_plot.frame >= self._max_iterations:
+                self._game_over = True
+        self._state_hash = _state_hash(self.current_game.things)
+
+    def state_hash(self):
+        """Returns the 64-bit Zobrist hash of the last observation.
+
+        The hash only depends on the agent, tool and food positions, so it is
+        independent of rendering and colors, and it is updated incrementally
+        as they move. It is also reported as `info['state_hash']`.
+        """
+        return self._state_hash
+
+    def step(self, action):
+        """Apply action, step the world forward, and return observations.
+
+        Args:
+            action: `ACTIONS` entry.
+
+        Returns:
+            state, reward, done, info.
+        """
+        # Steps after the episode ended replay the last transition, so they
+        # are not counted in `metrics`.
+        live = self.current_game is not None
+        if self.profiler is None:
+            result = self._step(action)
+        else:
+            with self.profiler.section('step'):
+                result = self._step(action)
+            self.profiler.tick()
+        if self.metrics is not None and live:
+            _, reward, done, _ = result
+            self.metrics[metrics_lib.STEPS] += 1
+            self.metrics[metrics_lib.REWARD] += reward or 0.
+            if done:
+                self.metrics[metrics_lib.EPISODES] += 1
+        return result
+
+    def _step(self, action):
+        """Steps the engine, or the `transition_cache` when it is set.
+
+        With a `transition_cache`, transitions seen before in the same level
+        jump straight to the cached state instead of updating the engine.
+        The `info` of cached steps is a copy of the `info` of the step that
+        was cached, and `info['cached']` tells whether a step was cached.
+
+        Args:
+            action: `ACTIONS` entry.
+
+        Returns:
+            state, reward, done, info.
+        """
+        cache = self.transition_cache
+        if cache is None or self.current_game is None:
+            return super(BaseTrapTubeEnv, self).step(action)
+
+        key = (self._level_key, self._state_hash, action_index(action))
+        frame = self.current_game.the_plot.frame
+        transition = cache.get(key)
+        if transition is None:
+            state, reward, done, info = super(BaseTrapTubeEnv, self).step(
+                action)
+            next_state = self.get_state()
+            cache.put(key, (
+                next_state, reward, next_state.food_position is None,
+                dict(info)))
+            info['cached'] = False
+            return state, reward, done, info
+
+        next_state, reward, terminal, info = transition
+        self.set_state(next_state, frame=frame + 1)
+        self._last_reward = reward
+        self._game_over = self._game_over or terminal
+        if self._game_over:
+            self.current_game = None
+        if self.metrics is not None:
+            # The drapes were skipped, so count their events from `info`.
+            for counter in range(
+                    metrics_lib.REACHED_FOOD, len(metrics_lib.COUNTERS)):
+                if info.get(metrics_lib.COUNTERS[counter]):
+                    self.metrics[counter] += 1
+        info = dict(info)
+        info['cached'] = True
+        return self._last_state, reward, self._game_over, info
+
+    def _paint_board(self, layers):
+        if self.precompose:
+            paint = self._paint_over_background
+        else:
+            paint = super(BaseTrapTubeEnv, self)._paint_board
+        if self.profiler is None:
+            return paint(layers)
+        with self.profiler.section('paint_board'):
+            return paint(layers)
+
+    def _paint_over_background(self, layers):
+        """Paints the `DYNAMIC_LAYERS` over the background of the game.
+
+        The first call of each game paints the other layers, which do not
+        change until the next `make_game`, into the background.
+
+        Args:
+            layers: a dictionary mapping a character to the respective curtain.
+
+        Returns:
+            3D np.array (np.uint32) of the RGB board, a buffer that is
+                overwritten by the next call.
+        """
+        if self._background is None:
+            static_layers = dict(layers)
+            for key in DYNAMIC_LAYERS:
+                static_layers[key] = np.zeros_like(layers[key])
+            self._background = super(BaseTrapTubeEnv, self)._paint_board(
+                static_layers)
+            self._dynamic_colors = [
+                np.asarray(self._colors.get(key, (0, 0, 0))).astype(np.uint32)
+                for key in DYNAMIC_LAYERS]
+            if (self._board_buffer is None or
+                    self._board_buffer.shape != self._background.shape):
+                self._board_buffer = np.empty_like(self._background)
+        board = self._board_buffer
+        np.copyto(board, self._background)
+        for key, color in zip(DYNAMIC_LAYERS, self._dynamic_colors):
+            board[layers[key]] = color
+        return board
+
+    def render(self, mode='human'):
+        if self.incremental_render:
+            render = self._render_incremental
+        else:
+            render = super(BaseTrapTubeEnv, self).render
+        if self.profiler is None:
+            return render(mode=mode)
+        with self.profiler.section('render/' + mode):
+            return render(mode=mode)
+
+    def _render_incremental(self, mode='human'):
+        """Renders by repainting the changed cells of a persistent frame.
+
+        The board is compared with the board of the last render, so every
+        change is found, whether from moves, `set_state` or new colors, and
+        only the pixel blocks of changed cells are written.
+
+        Args:
+            mode: 'human' or 'rgb_array', as for `render`.
+
+        Returns:
+            copy of the frame (np.uint8) or the `viewer.isopen`.
+        """
+        if self._last_observations is None or not self._colors:
+            return super(BaseTrapTubeEnv, self).render(mode=mode)
+
+        board = self._paint_board(self._last_observations.layers)
+        height, width = board.shape[:2]
+        scale = self.resize_scale
+        frame_shape = (height * scale, width * scale, 3)
+        if self._frame is None or self._frame.shape != frame_shape:
+            self._frame = np.empty(frame_shape, np.uint8)
+            self._frame_board = None
+        blocks = self._frame.reshape([height, scale, width, scale, 3])
+        if self._frame_board is None:
+            blocks[...] = board[:, None, :, None, :]
+            self._frame_board = board.copy()
+        else:
+            rows, cols = np.nonzero(np.any(board != self._frame_board, -1))
+            blocks[rows, :, cols] = board[rows, cols][:, None, None, :]
+            self._frame_board[rows, cols] = board[rows, cols]
+
+        if mode == 'rgb_array':
+            return self._frame.copy()
+        elif mode == 'human':
+            if self.viewer is None:
+                from gym.envs.classic_control.rendering import (
+                    SimpleImageViewer)
+                self.viewer = SimpleImageViewer()
+            self.viewer.imshow(self._frame)
+            time.sleep(self.delay / 1e3)
+            return self.viewer.isopen
+
+    def get_state(self):
+        """Returns the compact state of the last observation.
+
+        Returns:
+            TrapTubeState.
+        """
+        layers = self._last_observations.layers
+        return TrapTubeState(
+            agent_position=_first_position(layers[AGENT]),
+            tool_position=_first_position(layers[TOOL]),
+            food_position=_first_position(layers[FOOD]))
+
+    def set_state(self, state, frame=None):
+        """Moves the agent, tool and food of the current game to `state`.
+
+        The level (art, tool size and direction) is left unchanged, so `state`
+        must come from the level created by the last `reset`.
+
+        Args:
+            state: TrapTubeState.
+            frame: optional pycolab frame number to restore, which decides
+                when `max_iterations` ends the episode.
+
+        Returns:
+            the observation of the new state.
+        """
+        assert self.current_game is not None, 'call `reset` first.'
+        things = self.current_game.things
+        things[AGENT].teleport(state.agent_position)
+        things[TOOL].set_position(state.tool_position)
+        things[FOOD].set_position(state.food_position)
+        if frame is not None:
+            # The public setter only allows incrementing the frame.
+            self.current_game.the_plot._frame = frame
+
+        # pycolab only repaints the board while playing, so do it by hand.
+        self.current_game._render()
+        self._update_for_game_step(self.current_game._board, None)
+        return self._last_state
+
 
 # Base config option.
 base_config = TrapTubeConfig(
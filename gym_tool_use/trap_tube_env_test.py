@@ -11,6 +11,8 @@ import unittest
 from absl.testing import absltest
 from absl.testing import parameterized
 
+from gym_tool_use import solver
+from gym_tool_use import transfers
 from gym_tool_use import trap_tube_env
 
 
@@ -1252,6 +1254,182 @@ class TrapTubeEnvTest(parameterized.TestCase):
             food_position=(5, 7))
         self.assertTransition(env, ll, render=self._render)
 
+    def testStateHashMatchesState(self):
+        env = TestEnv(
+            art=trap_tube_env.base_config.art,
+            tool_position=trap_tube_env.base_config.tool_position,
+            tool_size=trap_tube_env.base_config.tool_size,
+            tool_direction=trap_tube_env.base_config.tool_direction,
+            food_position=trap_tube_env.base_config.food_position)
+        shape = env._game_shape[:2]
+        np_random = np.random.RandomState(0)
+        hashes = {}
+        states = {}
+        for _ in range(5):
+            env.reset()
+            done = False
+            while not done:
+                state = env.get_state()
+                self.assertEqual(
+                    env.state_hash(),
+                    trap_tube_env.zobrist_hash(shape, state))
+                # Equal hashes only come from equal states, i.e. there are
+                # no collisions, and equal states always have equal hashes.
+                self.assertEqual(
+                    hashes.setdefault(env.state_hash(), state), state)
+                self.assertEqual(
+                    states.setdefault(state, env.state_hash()),
+                    env.state_hash())
+                action = trap_tube_env.ACTION_LIST[np_random.randint(16)]
+                _, _, done, info = env.step(action)
+                self.assertEqual(info['state_hash'], env.state_hash())
+
+        state = trap_tube_env.TrapTubeState(
+            agent_position=(0, 0), tool_position=(0, 3), food_position=None)
+        env.reset()
+        env.set_state(state)
+        self.assertEqual(
+            env.state_hash(), trap_tube_env.zobrist_hash(shape, state))
+
+    def testTransitionCacheMatchesEngine(self):
+        def make_env():
+            return TestEnv(
+                art=trap_tube_env.base_config.art,
+                tool_position=trap_tube_env.base_config.tool_position,
+                tool_size=trap_tube_env.base_config.tool_size,
+                tool_direction=trap_tube_env.base_config.tool_direction,
+                food_position=trap_tube_env.base_config.food_position)
+        env = make_env()
+        cached_env = make_env()
+        cache = trap_tube_env.TransitionCache(max_size=64)
+        cached_env.transition_cache = cache
+
+        np_random = np.random.RandomState(0)
+        solution = solver.solve_config(trap_tube_env.base_config)
+        episodes = [
+            [trap_tube_env.ACTION_LIST[np_random.randint(16)]
+             for _ in range(100)]
+            for _ in range(3)] + [solution, solution]
+        for actions in episodes:
+            np.testing.assert_array_equal(cached_env.reset(), env.reset())
+            for action in actions:
+                state, reward, done, expected_info = env.step(action)
+                cached_state, cached_reward, cached_done, info = (
+                    cached_env.step(action))
+                np.testing.assert_array_equal(cached_state, state)
+                self.assertEqual(cached_reward, reward)
+                self.assertEqual(cached_done, done)
+                self.assertEqual(info['state_hash'], env.state_hash())
+                self.assertEqual(sorted(info), sorted(
+                    list(expected_info) + ['cached']))
+                for name, value in expected_info.items():
+                    np.testing.assert_array_equal(info[name], value)
+                if done:
+                    break
+            self.assertTrue(done)
+
+        self.assertLessEqual(len(cache), 64)
+        self.assertEqual(
+            cache.hits + cache.misses, 300 + 2 * len(solution))
+        self.assertGreaterEqual(cache.hits, len(solution))
+
+    def testPrecomposedBoardsMatchEngine(self):
+        env = transfers.PerceptualStructuralSymbolicTrapTubeEnv()
+        precomposed_env = transfers.PerceptualStructuralSymbolicTrapTubeEnv()
+        precomposed_env.precompose = True
+        env.seed(0)
+        precomposed_env.seed(0)
+
+        np_random = np.random.RandomState(0)
+        for _ in range(5):
+            np.testing.assert_array_equal(
+                precomposed_env.reset(), env.reset())
+            background = precomposed_env._background
+            for _ in range(30):
+                action = trap_tube_env.ACTION_LIST[np_random.randint(16)]
+                state, _, done, _ = env.step(action)
+                precomposed_state, _, _, _ = precomposed_env.step(action)
+                np.testing.assert_array_equal(precomposed_state, state)
+                if done:
+                    break
+            self.assertIs(precomposed_env._background, background)
+            np.testing.assert_array_equal(
+                precomposed_env.render(mode='rgb_array'),
+                env.render(mode='rgb_array'))
+
+    def testIncrementalRenderMatchesRender(self):
+        env = transfers.PerceptualStructuralSymbolicTrapTubeEnv()
+        incremental_env = transfers.PerceptualStructuralSymbolicTrapTubeEnv()
+        incremental_env.incremental_render = True
+        incremental_env.precompose = True
+        env.seed(0)
+        incremental_env.seed(0)
+
+        np_random = np.random.RandomState(0)
+        for _ in range(5):
+            env.reset()
+            incremental_env.reset()
+            for _ in range(30):
+                image = incremental_env.render(mode='rgb_array')
+                np.testing.assert_array_equal(
+                    image, env.render(mode='rgb_array'))
+                # Rendered frames are not overwritten by later renders.
+                image[...] = 0
+                action = trap_tube_env.ACTION_LIST[np_random.randint(16)]
+                _, _, done, _ = env.step(action)
+                incremental_env.step(action)
+                if done:
+                    break
+
+    def testObservationBuffers(self):
+        envs = [transfers.PerceptualStructuralSymbolicTrapTubeEnv()
+                for _ in range(3)]
+        shape = envs[0].observation_space.shape
+        observations = np.zeros([len(envs)] + list(shape), np.float32)
+        for index, env in enumerate(envs):
+            env.set_observation_buffers(observations[index])
+            env.seed(index)
+        ring_env = transfers.PerceptualStructuralSymbolicTrapTubeEnv()
+        ring_env.set_observation_buffers(2)
+        ring_env.seed(0)
+        expected_env = transfers.PerceptualStructuralSymbolicTrapTubeEnv()
+        expected_env.seed(0)
+
+        np.testing.assert_array_equal(ring_env.reset(), expected_env.reset())
+        for index, env in enumerate(envs):
+            state = env.reset()
+            self.assertFalse(state.flags.writeable)
+            self.assertTrue(np.shares_memory(state, observations[index]))
+        np.testing.assert_array_equal(
+            observations[0], expected_env._last_state)
+
+        np_random = np.random.RandomState(0)
+        last_state = ring_env._last_state
+        for _ in range(10):
+            action = trap_tube_env.ACTION_LIST[np_random.randint(16)]
+            expected_state, _, done, _ = expected_env.step(action)
+            state, _, _, _ = ring_env.step(action)
+            env_state, _, _, _ = envs[0].step(action)
+            np.testing.assert_array_equal(state, expected_state)
+            np.testing.assert_array_equal(observations[0], expected_state)
+            self.assertIs(env_state, envs[0]._observation_views[0])
+            # The two buffers of the ring are used in turn.
+            self.assertFalse(np.shares_memory(state, last_state))
+            last_state = state
+            if done:
+                break
+
+    def testSymbolicResetsKeepInitialColors(self):
+        env = transfers.SymbolicTrapTubeEnv()
+        initial_colors = dict(env._initial_colors)
+        env.seed(0)
+        swapped = 0
+        for _ in range(10):
+            env.reset()
+            swapped += env._tool_category is not trap_tube_env.TOOL
+            self.assertEqual(env._initial_colors, initial_colors)
+        self.assertGreater(swapped, 0)
+
 
 if __name__ == '__main__':
     absltest.main()
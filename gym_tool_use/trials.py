@@ -0,0 +1,98 @@
+"""Append-only storage for recorded trials."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import re
+import collections
+
+import numpy as np
+
+
+# A single recorded episode. `boards[t]` is the symbolic board seen before
+# `actions[t]`; `palette` renders it with `rendering.render_board`.
+Episode = collections.namedtuple(
+    'Episode',
+    ['env_id', 'seed', 'boards', 'palette', 'actions', 'rewards', 'dones',
+     'weights'])
+
+_EPISODE_PATTERN = re.compile(r'^episode_(\d{6})\.npz$')
+
+
+def _episode_paths(directory):
+    names = sorted(
+        name for name in os.listdir(directory) if _EPISODE_PATTERN.match(name))
+    return [os.path.join(directory, name) for name in names]
+
+
+class TrialWriter(object):
+    """Writes each finished episode of a trial to its own file.
+
+    Episodes are written to a temporary file and renamed into place, so a
+    crash never leaves a partially written episode behind and every episode
+    finished before the crash is kept. Reopening an existing trial appends to
+    it.
+    """
+
+    def __init__(self, directory):
+        """Creates a new TrialWriter.
+
+        Args:
+            directory: directory of the trial, created if missing.
+        """
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._num_episodes = len(_episode_paths(directory))
+
+    def __len__(self):
+        return self._num_episodes
+
+    def write_episode(self, episode):
+        """Append an episode to the trial.
+
+        Args:
+            episode: Episode.
+
+        Returns:
+            path of the written episode file.
+        """
+        path = os.path.join(
+            self.directory, 'episode_{:06d}.npz'.format(self._num_episodes))
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as fp:
+            np.savez(fp, **episode._asdict())
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.rename(temp_path, path)
+        self._num_episodes += 1
+        return path
+
+
+class TrialReader(object):
+    """Lazily reads the episodes of a trial, one episode at a time."""
+
+    def __init__(self, directory):
+        """Creates a new TrialReader.
+
+        Args:
+            directory: directory of the trial.
+        """
+        self.directory = directory
+        self._paths = _episode_paths(directory)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __getitem__(self, index):
+        with np.load(self._paths[index]) as data:
+            fields = dict((key, data[key]) for key in Episode._fields)
+        fields['env_id'] = str(fields['env_id'])
+        fields['seed'] = int(fields['seed'])
+        return Episode(**fields)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
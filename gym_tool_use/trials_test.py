@@ -0,0 +1,62 @@
+"""Tests for trial storage."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from absl.testing import absltest
+
+from gym_tool_use import trials
+
+
+def _make_episode(seed, num_steps):
+    return trials.Episode(
+        env_id='TrapTube-v0',
+        seed=seed,
+        boards=np.full([num_steps, 12, 12], ord(' '), np.uint8),
+        palette=np.zeros([256, 3], np.uint8),
+        actions=np.zeros([num_steps, 2], np.int64),
+        rewards=np.zeros([num_steps], np.float32),
+        dones=np.arange(num_steps) == (num_steps - 1),
+        weights=np.ones([num_steps], np.float32))
+
+
+class TrialsTest(absltest.TestCase):
+
+    def setUp(self):
+        super(TrialsTest, self).setUp()
+        self._directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._directory)
+
+    def testAppendAndReadBack(self):
+        writer = trials.TrialWriter(self._directory)
+        writer.write_episode(_make_episode(3, 4))
+        writer.write_episode(_make_episode(4, 2))
+
+        # Reopening appends after the existing episodes.
+        writer = trials.TrialWriter(self._directory)
+        self.assertLen(writer, 2)
+        writer.write_episode(_make_episode(5, 7))
+
+        # Leftovers of an interrupted write are ignored.
+        open(os.path.join(
+            self._directory, 'episode_000003.npz.tmp'), 'wb').close()
+
+        reader = trials.TrialReader(self._directory)
+        self.assertLen(reader, 3)
+        episodes = list(reader)
+        self.assertEqual([episode.seed for episode in episodes], [3, 4, 5])
+        self.assertEqual(episodes[2].env_id, 'TrapTube-v0')
+        self.assertEqual(episodes[2].boards.shape, (7, 12, 12))
+        np.testing.assert_array_equal(
+            episodes[0].dones, [False, False, False, True])
+
+
+if __name__ == '__main__':
+    absltest.main()
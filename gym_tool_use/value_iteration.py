@@ -0,0 +1,188 @@
+"""Exact Q-values of trap tube levels by value iteration."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import warnings
+
+import numpy as np
+
+import gym
+
+from gym_tool_use import graph
+from gym_tool_use import trap_tube_env
+
+
+def q_values(level_graphs, discount=0.99, tolerance=1e-6,
+             max_iterations=1000):
+    """Run value iteration on several level graphs at once.
+
+    The graphs are stacked into one CSR graph, so each Bellman backup is a
+    single gather over all edges followed by a segmented max.
+
+    Args:
+        level_graphs: list of graph.LevelGraph.
+        discount: discount factor.
+        tolerance: stop once no state value changes by more than this.
+        max_iterations: maximum number of backups.
+
+    Returns:
+        list of np.array with shape [num_states, num_actions] of Q-values
+            per level, zero for terminal states. A warning is emitted if the
+            values did not converge within `max_iterations`.
+    """
+    tables, _, _ = _value_iteration(
+        level_graphs, discount, tolerance, max_iterations)
+    return tables
+
+
+def _value_iteration(level_graphs, discount, tolerance, max_iterations):
+    """Returns the Q-tables of `q_values`, the iterations and last delta."""
+    node_offsets = np.cumsum([0] + [len(g.states) for g in level_graphs])
+    edge_offsets = np.cumsum([0] + [len(g.next_states) for g in level_graphs])
+    next_states = np.concatenate([
+        level_graph.next_states.astype(np.int64) + offset
+        for level_graph, offset in zip(level_graphs, node_offsets)])
+    rewards = np.concatenate([g.rewards for g in level_graphs])
+    continues = (discount * ~np.concatenate(
+        [g.dones for g in level_graphs])).astype(np.float32)
+    indptr = np.concatenate([
+        level_graph.indptr[:-1] + offset
+        for level_graph, offset in zip(level_graphs, edge_offsets)])
+    degrees = np.diff(np.concatenate([indptr, edge_offsets[-1:]]))
+    expandable = np.flatnonzero(degrees > 0)
+
+    values = np.zeros([node_offsets[-1]], np.float32)
+    q = rewards
+    delta = 0.
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        q = rewards + continues * values[next_states]
+        new_values = np.zeros_like(values)
+        new_values[expandable] = np.maximum.reduceat(q, indptr[expandable])
+        delta = float(
+            np.max(np.abs(new_values - values)) if len(values) else 0.)
+        values = new_values
+        if delta <= tolerance:
+            break
+    else:
+        warnings.warn(
+            'value iteration did not converge in {} iterations, the last '
+            'change was {:g} > {:g}.'.format(
+                max_iterations, delta, tolerance))
+
+    num_actions = len(trap_tube_env.ACTION_LIST)
+    tables = []
+    for index, level_graph in enumerate(level_graphs):
+        table = np.zeros([len(level_graph.states), num_actions], np.float32)
+        level_expandable = np.diff(level_graph.indptr) > 0
+        table[level_expandable] = q[
+            edge_offsets[index]:edge_offsets[index + 1]].reshape(
+                [-1, num_actions])
+        tables.append(table)
+    return tables, iterations, delta
+
+
+def save_q_table(path, level_graph, q_table):
+    """Write the Q-table of a level with its states.
+
+    Args:
+        path: output `.npz` path.
+        level_graph: graph.LevelGraph.
+        q_table: np.array with shape [num_states, num_actions].
+    """
+    assert len(q_table) == len(level_graph.states)
+    with open(path + '.tmp', 'wb') as fp:
+        np.savez_compressed(
+            fp,
+            states=level_graph.states.astype(np.int16),
+            q_values=q_table.astype(np.float32))
+    os.rename(path + '.tmp', path)
+
+
+def load_q_table(path):
+    """Returns `(states, q_values)` written by `save_q_table`."""
+    with np.load(path) as data:
+        return data['states'].astype(np.int32), data['q_values']
+
+
+def level_path(directory, seed):
+    return os.path.join(directory, 'level_{:06d}.npz'.format(seed))
+
+
+def solve_levels(env_id, seeds, directory, batch_size=8, discount=0.99,
+                 tolerance=1e-6, max_iterations=1000):
+    """Write Q-tables for the levels generated from `seeds`.
+
+    Levels whose Q-table already exists are skipped, so interrupted runs
+    resume where they stopped.
+
+    Args:
+        env_id: id of a registered trap tube environment.
+        seeds: seeds passed to `env.seed` before `env.reset`.
+        directory: output directory.
+        batch_size: number of levels per value iteration batch.
+        discount: discount factor.
+        tolerance: convergence threshold.
+        max_iterations: maximum number of backups per batch.
+
+    Returns:
+        list of dictionaries with the `seed` and `path` of each written
+            level, and the `iterations` and last `delta` of its batch.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    env = gym.make(env_id).unwrapped
+    seeds = [
+        seed for seed in seeds
+        if not os.path.exists(level_path(directory, seed))]
+    written = []
+    for start in range(0, len(seeds), batch_size):
+        batch_seeds = seeds[start:start + batch_size]
+        level_graphs = []
+        for seed in batch_seeds:
+            env.seed(seed)
+            env.reset()
+            level_graphs.append(graph.build_config_graph(env.config))
+        tables, iterations, delta = _value_iteration(
+            level_graphs, discount, tolerance, max_iterations)
+        for seed, level_graph, table in zip(
+                batch_seeds, level_graphs, tables):
+            path = level_path(directory, seed)
+            save_q_table(path, level_graph, table)
+            written.append({
+                'seed': seed,
+                'path': path,
+                'iterations': iterations,
+                'delta': delta,
+            })
+    return written
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(type=str, dest='env_id')
+    parser.add_argument(type=str, dest='directory')
+    parser.add_argument('--levels', type=int, required=True)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--discount', type=float, default=0.99)
+    parser.add_argument('--tolerance', type=float, default=1e-6)
+    parser.add_argument('--max-iterations', type=int, default=1000)
+    args = parser.parse_args()
+
+    written = solve_levels(
+        args.env_id,
+        range(args.seed, args.seed + args.levels),
+        args.directory,
+        batch_size=args.batch_size,
+        discount=args.discount,
+        tolerance=args.tolerance,
+        max_iterations=args.max_iterations)
+    for level in written:
+        print('Wrote {path} ({iterations} iterations, delta {delta:g}).'
+              .format(**level))
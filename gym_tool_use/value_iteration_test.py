@@ -0,0 +1,79 @@
+"""Tests for value iteration on level graphs."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import warnings
+
+import numpy as np
+
+from absl.testing import absltest
+
+from gym_tool_use import dynamics
+from gym_tool_use import graph
+from gym_tool_use import solver
+from gym_tool_use import testutil
+from gym_tool_use import value_iteration
+
+
+class ValueIterationTest(absltest.TestCase):
+
+    def testGreedyPolicyIsOptimal(self):
+        level, state = dynamics.make_level(testutil.small_config)
+        level_graph = graph.build_graph(level, state)
+        q_table, = value_iteration.q_values([level_graph], discount=0.9)
+        optimal_length = len(solver.solve(level, state))
+        self.assertAlmostEqual(
+            q_table[0].max(), 0.9 ** (optimal_length - 1), places=5)
+
+        node = 0
+        for _ in range(optimal_length):
+            action = np.argmax(q_table[node])
+            edge = level_graph.indptr[node] + action
+            node = level_graph.next_states[edge]
+        self.assertTrue(level_graph.dones[edge])
+
+    def testBatchMatchesSingleLevels(self):
+        level_graphs = []
+        for food_position in [(3, 3), (3, 4)]:
+            config = testutil.small_config._replace(
+                food_position=food_position)
+            level_graphs.append(graph.build_config_graph(config))
+        batched = value_iteration.q_values(level_graphs)
+        for level_graph, q_table in zip(level_graphs, batched):
+            expected, = value_iteration.q_values([level_graph])
+            np.testing.assert_allclose(q_table, expected, atol=1e-6)
+
+    def testWarnsWithoutConvergence(self):
+        level_graph = graph.build_config_graph(testutil.small_config)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            value_iteration.q_values([level_graph], max_iterations=2)
+        self.assertLen(caught, 1)
+        self.assertIn('did not converge', str(caught[0].message))
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            value_iteration.q_values([level_graph])
+        self.assertEmpty([
+            warning for warning in caught
+            if 'did not converge' in str(warning.message)])
+
+    def testSaveLoad(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        level_graph = graph.build_config_graph(testutil.small_config)
+        q_table, = value_iteration.q_values([level_graph])
+        path = os.path.join(directory, 'level.npz')
+        value_iteration.save_q_table(path, level_graph, q_table)
+        states, loaded = value_iteration.load_q_table(path)
+        np.testing.assert_array_equal(states, level_graph.states)
+        np.testing.assert_array_equal(loaded, q_table)
+
+
+if __name__ == '__main__':
+    absltest.main()